@@ -0,0 +1,144 @@
+"""
+Compares memory held by discord.py state cache with full and lean gateway options. Synthetic gateway payloads of
+one large guild are fed into the client state: guild create with online members, member list chunks when guilds
+are chunked at startup and a stream of messages.
+
+Usage: python benchmarks/gateway_memory.py
+"""
+import gc
+import tracemalloc
+import typing
+
+import discord
+from discord.state import ConnectionState
+
+from dbot.dscrd.client import gateway_options
+
+GUILD_ID = 1000
+USER_ID = 10**6
+MEMBERS = 100000
+ONLINE = 10000
+IN_VOICE = 500
+VOICE_CHANNELS = 20
+TEXT_CHANNEL_ID = GUILD_ID + VOICE_CHANNELS + 1
+MESSAGES = 5000
+
+
+def _user(index: int) -> dict[str, typing.Any]:
+    return {"id": str(USER_ID + index), "username": f"user{index}", "discriminator": "0", "avatar": None}
+
+
+def _member(index: int) -> dict[str, typing.Any]:
+    return {
+        "user": _user(index),
+        "roles": [],
+        "joined_at": "2024-01-01T00:00:00+00:00",
+        "deaf": False,
+        "mute": False,
+        "flags": 0,
+    }
+
+
+def _channel(channel_id: int, channel_type: int) -> dict[str, typing.Any]:
+    return {
+        "id": str(channel_id),
+        "type": channel_type,
+        "name": str(channel_id),
+        "position": 0,
+        "permission_overwrites": [],
+        "bitrate": 64000,
+        "user_limit": 0,
+    }
+
+
+def _guild_create() -> dict[str, typing.Any]:
+    # large guilds are sent with online and voice members only, the rest is requested by chunking
+    return {
+        "id": str(GUILD_ID),
+        "name": "guild",
+        "owner_id": "1",
+        "member_count": MEMBERS,
+        "large": True,
+        "roles": [],
+        "emojis": [],
+        "stickers": [],
+        "features": [],
+        "threads": [],
+        "channels": [_channel(GUILD_ID + 1 + index, 2) for index in range(VOICE_CHANNELS)]
+        + [_channel(TEXT_CHANNEL_ID, 0)],
+        "voice_states": [
+            {
+                "user_id": str(USER_ID + index),
+                "channel_id": str(GUILD_ID + 1 + index % VOICE_CHANNELS),
+                "session_id": "session",
+                "deaf": False,
+                "mute": False,
+                "self_deaf": False,
+                "self_mute": False,
+                "self_video": False,
+                "suppress": False,
+            }
+            for index in range(IN_VOICE)
+        ],
+        "members": [_member(index) for index in range(ONLINE)],
+        "presences": [
+            {
+                "user": {"id": str(USER_ID + index)},
+                "status": "online",
+                "activities": [{"name": "game", "type": 0}],
+                "client_status": {"desktop": "online"},
+            }
+            for index in range(ONLINE)
+        ],
+    }
+
+
+def _message(index: int) -> dict[str, typing.Any]:
+    return {
+        "id": str(10**9 + index),
+        "channel_id": str(TEXT_CHANNEL_ID),
+        "guild_id": str(GUILD_ID),
+        "author": _user(index % MEMBERS),
+        "content": "message " * 10,
+        "timestamp": "2024-01-01T00:00:00+00:00",
+        "edited_timestamp": None,
+        "tts": False,
+        "mention_everyone": False,
+        "mentions": [],
+        "mention_roles": [],
+        "attachments": [],
+        "embeds": [],
+        "pinned": False,
+        "type": 0,
+    }
+
+
+def _measure(options: dict[str, typing.Any]) -> tuple[int, int, float]:
+    gc.collect()
+    tracemalloc.start()
+
+    state = ConnectionState(dispatch=lambda *args: None, handlers={}, hooks={}, http=None, **options)
+    guild = state._add_guild_from_data(_guild_create())
+    if state._guild_needs_chunking(guild):
+        for index in range(ONLINE, MEMBERS):
+            guild._add_member(discord.Member(data=_member(index), guild=guild, state=state))
+    for index in range(MESSAGES):
+        state.parse_message_create(_message(index))
+
+    gc.collect()
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return len(guild.members), len(state._messages or []), memory / 2**20
+
+
+def main() -> None:
+    print(f"guild: {MEMBERS:,} members, {ONLINE:,} online, {IN_VOICE:,} in voice channels, {MESSAGES:,} messages")
+    print(f"{'mode':<6} {'cached members':>15} {'cached messages':>16} {'memory, MiB':>12}")
+    for mode, lean in (("full", False), ("lean", True)):
+        members, messages, memory = _measure(gateway_options(lean))
+        print(f"{mode:<6} {members:>15,} {messages:>16,} {memory:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
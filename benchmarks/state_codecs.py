@@ -0,0 +1,63 @@
+"""
+Compares channel state codecs: encode/decode time and stored bytes per channel.
+
+Usage: python benchmarks/state_codecs.py
+"""
+import random
+import string
+import timeit
+from typing import Callable
+
+from dbot.model import User
+from dbot.storage.codecs import (
+    CompactChannelStateCodec,
+    IChannelStateCodec,
+    JSONChannelStateCodec,
+)
+from dbot.storage.state import ChannelState
+
+CHANNEL_SIZES = (0, 10, 100, 1000, 5000)
+REPEATS = 5
+
+
+def _generate_state(users_count: int) -> ChannelState:
+    rnd = random.Random(users_count)
+    users = [
+        User(
+            id=rnd.randint(10**17, 10**18),
+            username="".join(rnd.choices(string.ascii_lowercase + string.digits + "_.", k=rnd.randint(3, 32))),
+        )
+        for _ in range(users_count)
+    ]
+    return ChannelState(id=rnd.randint(10**17, 10**18), ts=1700000000, users=users)
+
+
+def _measure(func: Callable[[], object], number: int) -> float:
+    timer = timeit.Timer(func)
+    return min(timer.repeat(repeat=REPEATS, number=number)) / number
+
+
+def main() -> None:
+    codecs: list[tuple[str, IChannelStateCodec]] = [
+        ("v2 json", JSONChannelStateCodec()),
+        ("v3 compact", CompactChannelStateCodec()),
+    ]
+
+    print(f"{'users':>6} {'codec':<11} {'bytes':>9} {'encode, us':>11} {'decode, us':>11}")
+    for users_count in CHANNEL_SIZES:
+        state = _generate_state(users_count)
+        number = max(10, 20000 // max(users_count, 1))
+
+        for name, codec in codecs:
+            data = codec.encode(state)
+            assert codec.decode(data) == state
+
+            encode_time = _measure(lambda: codec.encode(state), number)  # noqa: B023
+            decode_time = _measure(lambda: codec.decode(data), number)  # noqa: B023
+            size = len(data.encode() if isinstance(data, str) else data)
+
+            print(f"{users_count:>6} {name:<11} {size:>9} {encode_time * 1e6:>11.1f} {decode_time * 1e6:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+import asyncio
+import bisect
+import hashlib
+import time
+import typing
+
+import redis
+import structlog
+
+from dbot.infrastructure.monitoring import Monitoring
+
+logger = structlog.getLogger()
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """
+    Consistent hash ring: when a node joins or leaves, only channels of the neighbouring ring segments move.
+    """
+
+    def __init__(self, nodes: typing.Iterable[str], virtual_nodes: int = 64) -> None:
+        points = sorted((_hash(f"{node}#{i}"), node) for node in nodes for i in range(virtual_nodes))
+        self._hashes = [point[0] for point in points]
+        self._nodes = [point[1] for point in points]
+
+    def owner(self, channel_id: int) -> str | None:
+        if not self._nodes:
+            return None
+
+        index = bisect.bisect(self._hashes, _hash(str(channel_id))) % len(self._hashes)
+        return self._nodes[index]
+
+
+class ClusterMembership:
+    """
+    Replicas register in a Redis sorted set scored by their last heartbeat time. Replicas whose heartbeat
+    is older than `node_ttl` are removed, and every replica owns the channels the hash ring assigns to it.
+    Channels taken over from another replica are processed only after `node_ttl`, by then the previous owner
+    has seen the new ring on its own heartbeat or has expired, so a channel is never processed by two replicas.
+    A replica whose last successful heartbeat is older than `node_ttl` has expired for the others and releases
+    all its channels. Heartbeat times are taken from the Redis clock, so clock skew between replicas does not
+    shorten or extend the TTL.
+    """
+
+    NODES_KEY = "dbot_cluster_nodes"
+
+    def __init__(
+        self,
+        redis_client: redis.asyncio.Redis,
+        node_id: str,
+        channels: set[int],
+        monitoring: Monitoring,
+        heartbeat_interval: float = 5.0,
+        node_ttl: float = 15.0,
+        virtual_nodes: int = 64,
+    ) -> None:
+        self.redis_client = redis_client
+        self.node_id = node_id
+        self.channels = channels
+        self.monitoring = monitoring
+        self.heartbeat_interval = heartbeat_interval
+        self.node_ttl = node_ttl
+        self.virtual_nodes = virtual_nodes
+
+        self.owned_channels: set[int] = set()
+        # channels assigned by the ring and waiting for the handoff grace period, by the time they were assigned
+        self.pending_channels: dict[int, float] = {}
+        self._assigned: set[int] = set()
+        self._nodes: list[str] = []
+        # monotonic time of the last successful heartbeat
+        self._last_heartbeat: float | None = None
+        self._on_gained: list[typing.Callable[[set[int]], None]] = []
+        self._task: asyncio.Task[None] | None = None
+
+    def owns(self, channel_id: int) -> bool:
+        return channel_id in self.owned()
+
+    def owned(self) -> set[int]:
+        self._release_if_expired()
+        return self.owned_channels
+
+    def on_gained(self, callback: typing.Callable[[set[int]], None]) -> None:
+        self._on_gained.append(callback)
+
+    async def heartbeat(self) -> None:
+        started_at = time.monotonic()
+        seconds, microseconds = await self.redis_client.time()
+        now = seconds + microseconds / 1_000_000
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            pipe.zadd(self.NODES_KEY, {self.node_id: now})
+            pipe.zremrangebyscore(self.NODES_KEY, "-inf", now - self.node_ttl)
+            pipe.zrange(self.NODES_KEY, 0, -1)
+            _, _, raw_nodes = await pipe.execute()
+        self._last_heartbeat = started_at
+
+        nodes = sorted(node.decode() if isinstance(node, bytes) else node for node in raw_nodes)
+        changed = nodes != self._nodes
+        if changed:
+            self._rebalance(nodes)
+
+        if self._activate_pending() or changed:
+            await self.monitoring.fire_owned_channels(self.node_id, len(self.owned_channels))
+
+    def _rebalance(self, nodes: list[str]) -> None:
+        ring = HashRing(nodes, self.virtual_nodes)
+        assigned = {channel_id for channel_id in self.channels if ring.owner(channel_id) == self.node_id}
+
+        gained = assigned - self._assigned
+        lost = self._assigned - assigned
+        logger.info(
+            "cluster.rebalanced",
+            node_id=self.node_id,
+            nodes=nodes,
+            assigned=len(assigned),
+            gained=len(gained),
+            lost=len(lost),
+        )
+
+        self._nodes = nodes
+        self._assigned = assigned
+        # lost channels are released at once, the new owner waits for the grace period before taking them
+        self.owned_channels = self.owned_channels - lost
+        for channel_id in lost:
+            self.pending_channels.pop(channel_id, None)
+
+        now = time.monotonic()
+        for channel_id in gained:
+            self.pending_channels[channel_id] = now
+
+        # the only replica takes nothing over from live replicas, dead ones have already expired by node_ttl
+        if nodes == [self.node_id]:
+            for channel_id in self.pending_channels:
+                self.pending_channels[channel_id] = now - self.node_ttl
+
+    def _release_if_expired(self) -> bool:
+        if self._last_heartbeat is None or time.monotonic() - self._last_heartbeat < self.node_ttl:
+            return False
+        if not self._assigned:
+            return False
+
+        # other replicas have removed this one and taken its channels over, the next successful heartbeat
+        # rebalances from scratch and waits for the grace period again
+        logger.warning("cluster.heartbeat_expired", node_id=self.node_id, released=len(self.owned_channels))
+        self.owned_channels = set()
+        self.pending_channels = {}
+        self._assigned = set()
+        self._nodes = []
+        return True
+
+    def _activate_pending(self) -> bool:
+        now = time.monotonic()
+        activated = {
+            channel_id for channel_id, gained_at in self.pending_channels.items() if now - gained_at >= self.node_ttl
+        }
+        if not activated:
+            return False
+
+        for channel_id in activated:
+            del self.pending_channels[channel_id]
+        self.owned_channels = self.owned_channels | activated
+        logger.info("cluster.channels_activated", node_id=self.node_id, activated=len(activated))
+
+        for callback in self._on_gained:
+            callback(activated)
+        return True
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+        # leave at once instead of waiting for the heartbeat to expire, so other replicas take the channels over
+        await self.redis_client.zrem(self.NODES_KEY, self.node_id)
+        logger.info("cluster.left", node_id=self.node_id)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await self.heartbeat()
+            except Exception as e:
+                logger.error(e)
+                if self._release_if_expired():
+                    await self.monitoring.fire_owned_channels(self.node_id, 0)
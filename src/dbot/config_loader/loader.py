@@ -2,8 +2,10 @@ import structlog
 from pydantic import BaseModel
 
 from dbot.model.config import (
+    BatchWebhookTargetConfig,
     ChannelMonitorConfig,
     MonitorConfig,
+    RedisStreamTargetConfig,
     RedisTargetConfig,
     WebhooksTargetConfig,
 )
@@ -26,6 +28,19 @@ class WebhooksTargetConfigSerializer(BaseModel):
         )
 
 
+class BatchWebhookTargetConfigSerializer(BaseModel):
+    url: str
+    max_batch_size: int = 100
+    max_delay: float = 0.0
+
+    def to_model(self) -> BatchWebhookTargetConfig:
+        return BatchWebhookTargetConfig(
+            url=self.url,
+            max_batch_size=self.max_batch_size,
+            max_delay=self.max_delay,
+        )
+
+
 class RedisTargetConfigSerializer(BaseModel):
     queue: str
 
@@ -35,16 +50,33 @@ class RedisTargetConfigSerializer(BaseModel):
         )
 
 
+class RedisStreamTargetConfigSerializer(BaseModel):
+    stream: str
+    maxlen: int = 10000
+
+    def to_model(self) -> RedisStreamTargetConfig:
+        return RedisStreamTargetConfig(
+            stream=self.stream,
+            maxlen=self.maxlen,
+        )
+
+
 class ChannelMonitorConfigSerializer(BaseModel):
     channel_id: int
     webhooks: WebhooksTargetConfigSerializer | None = None
     redis_queues: list[RedisTargetConfigSerializer] | None = None
+    redis_streams: list[RedisStreamTargetConfigSerializer] | None = None
+    batch_webhooks: list[BatchWebhookTargetConfigSerializer] | None = None
+    debounce_seconds: float = 0.0
 
     def to_model(self) -> ChannelMonitorConfig:
         return ChannelMonitorConfig(
             channel_id=self.channel_id,
             webhooks=self.webhooks.to_model() if self.webhooks else None,
             redis_queues=[item.to_model() for item in self.redis_queues] if self.redis_queues else [],
+            redis_streams=[item.to_model() for item in self.redis_streams] if self.redis_streams else [],
+            batch_webhooks=[item.to_model() for item in self.batch_webhooks] if self.batch_webhooks else [],
+            debounce_seconds=self.debounce_seconds,
         )
 
 
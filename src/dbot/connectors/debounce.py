@@ -0,0 +1,158 @@
+import asyncio
+import dataclasses
+from dataclasses import dataclass
+
+import structlog
+
+from dbot.connectors.router import INotificationRouter
+from dbot.infrastructure.monitoring import Monitoring
+from dbot.model.config import MonitorConfig
+from dbot.model.notifications import (
+    NewUserInChannelNotification,
+    Notification,
+    UserLeftChannelNotification,
+    UsersConnectedToChannelNotification,
+    UsersLeftChannelNotification,
+)
+
+logger = structlog.getLogger()
+
+# user notifications are debounced per (channel, user), channel notifications per (channel, None)
+DebounceKey = tuple[int, int | None]
+
+OPPOSITE_NOTIFICATIONS: dict[type[Notification], type[Notification]] = {
+    NewUserInChannelNotification: UserLeftChannelNotification,
+    UserLeftChannelNotification: NewUserInChannelNotification,
+    UsersConnectedToChannelNotification: UsersLeftChannelNotification,
+    UsersLeftChannelNotification: UsersConnectedToChannelNotification,
+}
+
+
+@dataclass
+class PendingNotification:
+    notification: Notification
+    handle: asyncio.TimerHandle
+
+
+class DebouncingNotificationRouter(INotificationRouter):
+    """
+    Holds notifications of channels with a debounce window. When the opposite notification of the same user
+    (or of the channel for channel-wide notifications) arrives inside the window, both are dropped.
+    Held notifications are sent when their window ends, a held `users_connected` follows joins and leaves of the
+    channel inside the window. Held notifications that fail to be sent are held again for another window.
+    """
+
+    def __init__(self, router: INotificationRouter, config: MonitorConfig, monitoring: Monitoring) -> None:
+        self._router = router
+        self._monitoring = monitoring
+        self._windows: dict[int, float] = {
+            channel.channel_id: channel.debounce_seconds for channel in config.channels if channel.debounce_seconds > 0
+        }
+
+        self._pending: dict[DebounceKey, PendingNotification] = {}
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    async def send(self, notifications: list[Notification]) -> None:
+        immediate: list[Notification] = []
+        released: list[Notification] = []
+
+        for notification in notifications:
+            window = self._windows.get(notification.channel_id)
+            if window is None:
+                immediate.append(notification)
+                continue
+
+            self._refresh_held_users(notification)
+
+            key = self._get_key(notification)
+            pending = self._pending.get(key)
+            if pending is not None:
+                if isinstance(pending.notification, OPPOSITE_NOTIFICATIONS[type(notification)]):
+                    await self._cancel(key, pending, notification)
+                    continue
+
+                # not a flap, nothing to cancel: send the held notification now to keep the order
+                self._pending.pop(key).handle.cancel()
+                released.append(pending.notification)
+
+            self._hold(key, notification, window)
+
+        # released notifications were accepted on previous calls, their failure must not fail this one
+        if released:
+            await self._send_released(released)
+        if immediate:
+            await self._router.send(immediate)
+
+    async def flush(self) -> None:
+        notifications = [pending.notification for pending in self._pending.values()]
+        for pending in self._pending.values():
+            pending.handle.cancel()
+        self._pending.clear()
+
+        if notifications:
+            # nothing is held after shutdown, notifications failed here are lost
+            await self._send_released(notifications, rehold=False)
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    @staticmethod
+    def _get_key(notification: Notification) -> DebounceKey:
+        if isinstance(notification, (NewUserInChannelNotification, UserLeftChannelNotification)):
+            return notification.channel_id, notification.user.id
+        return notification.channel_id, None
+
+    def _refresh_held_users(self, notification: Notification) -> None:
+        if not isinstance(notification, (NewUserInChannelNotification, UserLeftChannelNotification)):
+            return
+
+        pending = self._pending.get((notification.channel_id, None))
+        if pending is None or not isinstance(pending.notification, UsersConnectedToChannelNotification):
+            return
+
+        users = [user for user in pending.notification.users if user.id != notification.user.id]
+        if isinstance(notification, NewUserInChannelNotification):
+            users.append(notification.user)
+        pending.notification = dataclasses.replace(pending.notification, users=users)
+
+    def _hold(self, key: DebounceKey, notification: Notification, window: float) -> None:
+        handle = asyncio.get_running_loop().call_later(window, self._release, key)
+        self._pending[key] = PendingNotification(notification=notification, handle=handle)
+
+    async def _cancel(self, key: DebounceKey, pending: PendingNotification, notification: Notification) -> None:
+        pending.handle.cancel()
+        del self._pending[key]
+
+        logger.info("notifications.debounced", held=pending.notification, cancelled_by=notification)
+        await self._monitoring.fire_notifications_suppressed_count(notification.channel_id, 2)
+
+    def _release(self, key: DebounceKey) -> None:
+        pending = self._pending.pop(key, None)
+        if pending is None:
+            return
+
+        task = asyncio.create_task(self._send_released([pending.notification]))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send_released(self, notifications: list[Notification], rehold: bool = True) -> None:
+        try:
+            await self._router.send(notifications)
+        except Exception as e:
+            logger.error("notifications.release_failed", notifications=notifications, error=e)
+            if not rehold:
+                return
+
+            # the state is already saved, so the notifications are not generated again and are held for another window
+            for notification in notifications:
+                await self._rehold(notification)
+
+    async def _rehold(self, notification: Notification) -> None:
+        key = self._get_key(notification)
+        pending = self._pending.get(key)
+        if pending is None:
+            self._hold(key, notification, self._windows[notification.channel_id])
+        elif isinstance(pending.notification, OPPOSITE_NOTIFICATIONS[type(notification)]):
+            await self._cancel(key, pending, notification)
+        else:
+            # a newer notification of the same kind is held and supersedes the failed one
+            logger.info("notifications.superseded", failed=notification, held=pending.notification)
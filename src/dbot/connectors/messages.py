@@ -0,0 +1,71 @@
+import datetime
+from functools import singledispatch
+from typing import Any
+
+from pydantic import BaseModel
+
+from dbot.connectors.abstract import NotificationTypesEnum
+from dbot.model.notifications import (
+    NewUserInChannelNotification,
+    Notification,
+    UserLeftChannelNotification,
+    UsersConnectedToChannelNotification,
+    UsersLeftChannelNotification,
+)
+
+
+class Message(BaseModel):
+    version: int
+    type: NotificationTypesEnum
+    data: dict[str, Any]
+    channel_id: int
+    happened_at: datetime.datetime
+
+
+def _create_message(channel_id: int, data: dict[str, Any], _type: NotificationTypesEnum, version: int) -> Message:
+    happened_at = datetime.datetime.now(tz=datetime.timezone.utc)
+    return Message(version=version, type=_type, data=data, happened_at=happened_at, channel_id=channel_id)
+
+
+@singledispatch
+def build_message(notification: Notification) -> Message:
+    raise NotImplementedError()
+
+
+@build_message.register
+def _(notification: NewUserInChannelNotification) -> Message:
+    data = {
+        "id": notification.user.id,
+        "username": notification.user.username,
+    }
+    return _create_message(notification.channel_id, data, NotificationTypesEnum.NEW_USER, 1)
+
+
+@build_message.register
+def _(notification: UserLeftChannelNotification) -> Message:
+    data = {
+        "id": notification.user.id,
+        "username": notification.user.username,
+    }
+    return _create_message(notification.channel_id, data, NotificationTypesEnum.USER_LEFT, 1)
+
+
+@build_message.register
+def _(notification: UsersConnectedToChannelNotification) -> Message:
+    data = {
+        "usernames": [user.username for user in notification.users],
+        "users": [
+            {
+                "id": user.id,
+                "username": user.username,
+            }
+            for user in notification.users
+        ],
+    }
+    return _create_message(notification.channel_id, data, NotificationTypesEnum.USERS_CONNECTED, 1)
+
+
+@build_message.register
+def _(notification: UsersLeftChannelNotification) -> Message:
+    data: dict[Any, Any] = {}
+    return _create_message(notification.channel_id, data, NotificationTypesEnum.USERS_LEFT, 1)
@@ -1,11 +1,14 @@
 import abc
+import asyncio
 import time
+from collections import defaultdict
 
 import structlog
 
 from dbot.connectors.abstract import IConnector
+from dbot.connectors.routing import RoutingTable
 from dbot.infrastructure.monitoring import Monitoring
-from dbot.model.config import ChannelMonitorConfig, MonitorConfig, TargetTypeEnum
+from dbot.model.config import MonitorConfig, TargetTypeEnum
 from dbot.model.notifications import Notification
 
 logger = structlog.getLogger()
@@ -18,37 +21,74 @@ class INotificationRouter(abc.ABC):
 
 
 class NotificationRouter(INotificationRouter):
-    def __init__(self, configs: MonitorConfig) -> None:
-        self._by_channel_id: dict[int, ChannelMonitorConfig] = {
-            config.channel_id: config for config in configs.channels
-        }
+    def __init__(self, configs: MonitorConfig, routing_table: RoutingTable | None = None) -> None:
+        self._routing_table = routing_table or RoutingTable.compile(configs)
         self._connectors: dict[TargetTypeEnum, IConnector] = {}
 
     def register_connector(self, route_type: TargetTypeEnum, connector: IConnector) -> None:
         self._connectors[route_type] = connector
 
     async def send(self, notifications: list[Notification]) -> None:
+        batches: dict[TargetTypeEnum, list[Notification]] = defaultdict(list)
+
         for notification in notifications:
-            config: ChannelMonitorConfig | None = self._by_channel_id.get(notification.channel_id)
+            route = self._routing_table.route(notification)
 
-            if not config:
+            if not route:
                 continue
 
-            for target_type in config.available_target_types:
-                connector = self._get_connector(target_type)
-                if not connector:
-                    continue
-                await connector.send([notification])
+            for target_type in route.target_types:
+                if self._get_connector(target_type):
+                    batches[target_type].append(notification)
+
+        if not batches:
+            return
+
+        # every connector gets all its notifications at once, connectors are called concurrently
+        # and a failed connector does not stop the others
+        target_types = list(batches)
+        results = await asyncio.gather(
+            *[self._connectors[target_type].send(batches[target_type]) for target_type in target_types],
+            return_exceptions=True,
+        )
+
+        errors = []
+        for target_type, result in zip(target_types, results):
+            if isinstance(result, BaseException):
+                logger.error("connector.failed", connector=target_type.value, error=result)
+                errors.append(result)
+
+        if errors:
+            raise errors[0]
 
     def _get_connector(self, target_type: TargetTypeEnum) -> IConnector | None:
         return self._connectors.get(target_type, None)
 
 
+class ConnectorInstrumentation(IConnector):
+    def __init__(self, connector: IConnector, target_type: TargetTypeEnum, monitoring: Monitoring) -> None:
+        self._connector = connector
+        self._target_type = target_type
+        self._monitoring = monitoring
+
+    async def send(self, notifications: list[Notification]) -> None:
+        start = time.monotonic()
+        try:
+            await self._connector.send(notifications)
+        finally:
+            send_time = time.monotonic() - start
+            logger.debug("connector.sent", connector=self._target_type.value, processing_time=send_time)
+            await self._monitoring.fire_connector_processing(self._target_type.value, send_time)
+
+
 class NotificationRouterInstrumentation(INotificationRouter):
     def __init__(self, router: NotificationRouter, monitoring: Monitoring) -> None:
         self._router = router
         self._monitoring = monitoring
 
+    def register_connector(self, route_type: TargetTypeEnum, connector: IConnector) -> None:
+        self._router.register_connector(route_type, ConnectorInstrumentation(connector, route_type, self._monitoring))
+
     async def send(self, notifications: list[Notification]) -> None:
         logger.debug("notifications.sending", notifications=notifications)
         start = time.monotonic()
@@ -0,0 +1,104 @@
+import operator
+import types
+import typing
+from dataclasses import dataclass
+
+from dbot.connectors.abstract import NotificationTypesEnum
+from dbot.model.config import (
+    BatchWebhookTargetConfig,
+    ChannelMonitorConfig,
+    MonitorConfig,
+    RedisStreamTargetConfig,
+    TargetTypeEnum,
+    WebhooksTargetConfig,
+)
+from dbot.model.notifications import (
+    NewUserInChannelNotification,
+    Notification,
+    UserLeftChannelNotification,
+    UsersConnectedToChannelNotification,
+    UsersLeftChannelNotification,
+)
+
+NOTIFICATION_TYPES: dict[type[Notification], NotificationTypesEnum] = {
+    NewUserInChannelNotification: NotificationTypesEnum.NEW_USER,
+    UserLeftChannelNotification: NotificationTypesEnum.USER_LEFT,
+    UsersConnectedToChannelNotification: NotificationTypesEnum.USERS_CONNECTED,
+    UsersLeftChannelNotification: NotificationTypesEnum.USERS_LEFT,
+}
+
+WEBHOOKS_BY_TYPE: dict[NotificationTypesEnum, typing.Callable[[WebhooksTargetConfig], list[str]]] = {
+    NotificationTypesEnum.NEW_USER: operator.attrgetter("new_user_webhooks"),
+    NotificationTypesEnum.USER_LEFT: operator.attrgetter("user_left_webhooks"),
+    NotificationTypesEnum.USERS_CONNECTED: operator.attrgetter("users_connected_webhooks"),
+    NotificationTypesEnum.USERS_LEFT: operator.attrgetter("users_left_webhooks"),
+}
+
+RouteKey = tuple[int, NotificationTypesEnum]
+
+
+@dataclass(frozen=True)
+class Route:
+    target_types: tuple[TargetTypeEnum, ...]
+    webhooks: tuple[str, ...] = ()
+    batch_webhooks: tuple[BatchWebhookTargetConfig, ...] = ()
+    redis_queues: tuple[str, ...] = ()
+    redis_streams: tuple[RedisStreamTargetConfig, ...] = ()
+
+
+class RoutingTable:
+    """
+    Targets of every (channel, notification type) compiled once from the monitor config.
+    Pairs without targets are not in the table, so their notifications are dropped before any payload is built.
+    """
+
+    def __init__(self, routes: typing.Mapping[RouteKey, Route]) -> None:
+        self._routes = types.MappingProxyType(dict(routes))
+
+    @classmethod
+    def compile(cls, config: MonitorConfig) -> "RoutingTable":
+        routes = {}
+        for channel in config.channels:
+            for notification_type in NotificationTypesEnum:
+                route = cls._compile_route(channel, notification_type)
+                if route.target_types:
+                    routes[(channel.channel_id, notification_type)] = route
+
+        return cls(routes)
+
+    @staticmethod
+    def _compile_route(channel: ChannelMonitorConfig, notification_type: NotificationTypesEnum) -> Route:
+        webhooks: tuple[str, ...] = ()
+        if channel.webhooks is not None:
+            webhooks = tuple(WEBHOOKS_BY_TYPE[notification_type](channel.webhooks))
+
+        batch_webhooks = tuple(channel.batch_webhooks)
+        redis_queues = tuple(target.queue for target in channel.redis_queues or [])
+        redis_streams = tuple(channel.redis_streams)
+
+        target_types = []
+        if webhooks:
+            target_types.append(TargetTypeEnum.WEBHOOKS)
+        if batch_webhooks:
+            target_types.append(TargetTypeEnum.WEBHOOKS_BATCH)
+        if redis_queues:
+            target_types.append(TargetTypeEnum.REDIS)
+        if redis_streams:
+            target_types.append(TargetTypeEnum.REDIS_STREAM)
+
+        return Route(
+            target_types=tuple(target_types),
+            webhooks=webhooks,
+            batch_webhooks=batch_webhooks,
+            redis_queues=redis_queues,
+            redis_streams=redis_streams,
+        )
+
+    def get(self, channel_id: int, notification_type: NotificationTypesEnum) -> Route | None:
+        return self._routes.get((channel_id, notification_type))
+
+    def route(self, notification: Notification) -> Route | None:
+        return self._routes.get((notification.channel_id, NOTIFICATION_TYPES[type(notification)]))
+
+    def routes(self) -> typing.Iterable[Route]:
+        return self._routes.values()
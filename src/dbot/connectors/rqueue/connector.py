@@ -1,117 +1,49 @@
-import asyncio
-import datetime
-import inspect
 from collections import defaultdict
-from functools import singledispatchmethod
-from typing import Any
 
 import redis
-from pydantic import BaseModel
 
-from dbot.connectors.abstract import IConnector, NotificationTypesEnum
+from dbot.connectors.abstract import IConnector
+from dbot.connectors.messages import build_message
+from dbot.connectors.routing import RoutingTable
 from dbot.infrastructure.monitoring import Monitoring
 from dbot.model import MonitorConfig
-from dbot.model.notifications import (
-    NewUserInChannelNotification,
-    Notification,
-    UserLeftChannelNotification,
-    UsersConnectedToChannelNotification,
-    UsersLeftChannelNotification,
-)
-
-
-class Message(BaseModel):
-    version: int
-    type: NotificationTypesEnum
-    data: dict[str, Any]
-    channel_id: int
-    happened_at: datetime.datetime
+from dbot.model.notifications import Notification
 
 
 class RedisConnector(IConnector):
-    def __init__(self, client: redis.asyncio.Redis, config: MonitorConfig, monitoring: Monitoring) -> None:
+    def __init__(
+        self,
+        client: redis.asyncio.Redis,
+        config: MonitorConfig,
+        monitoring: Monitoring,
+        routing_table: RoutingTable | None = None,
+    ) -> None:
         self.client = client
         self.config = config
         self.monitoring = monitoring
-
-        self.channel_queue_map: dict[int, list[str]] = self._prepare_queues_for_channels(config)
-
-    def _prepare_queues_for_channels(self, config: MonitorConfig) -> dict[int, list[str]]:
-        channel_queue_map = defaultdict(list)
-
-        for channel in config.channels:
-            if channel.redis_queues is None:
-                continue
-
-            for target in channel.redis_queues:
-                channel_queue_map[channel.channel_id].append(target.queue)
-
-        return channel_queue_map
-
-    def _get_queue(self, channel_id: int) -> list[str] | None:
-        return self.channel_queue_map.get(channel_id)
+        self.routing_table = routing_table or RoutingTable.compile(config)
 
     async def send(self, notifications: list[Notification]) -> None:
-        for notification in notifications:
-            await self._send_one(notification)
+        queues_messages: dict[str, list[str]] = defaultdict(list)
+        messages_count = 0
 
-    @singledispatchmethod
-    async def _send_one(self, notification: Notification) -> None:
-        raise NotImplementedError()
-
-    @_send_one.register
-    async def _(self, notification: NewUserInChannelNotification) -> None:
-        data = {
-            "id": notification.user.id,
-            "username": notification.user.username,
-        }
-        await self._send(notification.channel_id, data, NotificationTypesEnum.NEW_USER, 1)
-
-    @_send_one.register
-    async def _(self, notification: UserLeftChannelNotification) -> None:
-        data = {
-            "id": notification.user.id,
-            "username": notification.user.username,
-        }
-        await self._send(notification.channel_id, data, NotificationTypesEnum.USER_LEFT, 1)
-
-    @_send_one.register
-    async def _(self, notification: UsersConnectedToChannelNotification) -> None:
-        data = {
-            "usernames": [user.username for user in notification.users],
-            "users": [
-                {
-                    "id": user.id,
-                    "username": user.username,
-                }
-                for user in notification.users
-            ],
-        }
-        await self._send(notification.channel_id, data, NotificationTypesEnum.USERS_CONNECTED, 1)
+        for notification in notifications:
+            route = self.routing_table.route(notification)
+            if route is None or not route.redis_queues:
+                continue
 
-    @_send_one.register
-    async def _(self, notification: UsersLeftChannelNotification) -> None:
-        data: dict[Any, Any] = {}
-        await self._send(notification.channel_id, data, NotificationTypesEnum.USERS_LEFT, 1)
+            raw = build_message(notification).model_dump_json()
+            for queue in route.redis_queues:
+                queues_messages[queue].append(raw)
+            messages_count += 1
 
-    async def _send(self, channel_id: int, data: dict[str, Any], _type: NotificationTypesEnum, version: int) -> None:
-        queues = self._get_queue(channel_id)
-        if not queues:
+        if not queues_messages:
             return
 
-        happened_at = datetime.datetime.now(tz=datetime.timezone.utc)
-        message = Message(version=version, type=_type, data=data, happened_at=happened_at, channel_id=channel_id)
-        raw = message.model_dump_json()
-
-        futures = []
-        for queue in queues:
-            future = self.client.rpush(queue, raw)
-
-            if not inspect.isawaitable(future):
-                raise TypeError(f"Expected awaitable, got {type(future)}")
-
-            futures.append(future)
-
-        await asyncio.gather(*futures)
+        # all messages of a queue are pushed with one command, all queues are pushed in one round trip
+        async with self.client.pipeline(transaction=False) as pipe:
+            for queue, messages in queues_messages.items():
+                pipe.rpush(queue, *messages)
+            await pipe.execute()
 
-        await self.monitoring.fire_redis_events_count()
+        await self.monitoring.fire_redis_events_count(messages_count)
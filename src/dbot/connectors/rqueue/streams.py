@@ -0,0 +1,55 @@
+from collections import defaultdict
+
+import redis
+
+from dbot.connectors.abstract import IConnector
+from dbot.connectors.messages import build_message
+from dbot.connectors.routing import RoutingTable
+from dbot.infrastructure.monitoring import Monitoring
+from dbot.model import MonitorConfig
+from dbot.model.notifications import Notification
+
+MESSAGE_FIELD = "message"
+
+
+class RedisStreamConnector(IConnector):
+    def __init__(
+        self,
+        client: redis.asyncio.Redis,
+        config: MonitorConfig,
+        monitoring: Monitoring,
+        routing_table: RoutingTable | None = None,
+    ) -> None:
+        self.client = client
+        self.config = config
+        self.monitoring = monitoring
+        self.routing_table = routing_table or RoutingTable.compile(config)
+
+    async def send(self, notifications: list[Notification]) -> None:
+        streams_messages: dict[str, list[str]] = defaultdict(list)
+        streams_maxlen: dict[str, int] = {}
+        messages_count = 0
+
+        for notification in notifications:
+            route = self.routing_table.route(notification)
+            if route is None or not route.redis_streams:
+                continue
+
+            raw = build_message(notification).model_dump_json()
+            for target in route.redis_streams:
+                streams_messages[target.stream].append(raw)
+                # the same stream can be configured for several channels, keep the most generous cap
+                streams_maxlen[target.stream] = max(streams_maxlen.get(target.stream, 0), target.maxlen)
+            messages_count += 1
+
+        if not streams_messages:
+            return
+
+        # streams are capped with approximate trimming, so redis trims whole macro nodes instead of single entries
+        async with self.client.pipeline(transaction=False) as pipe:
+            for stream, messages in streams_messages.items():
+                for raw in messages:
+                    pipe.xadd(stream, {MESSAGE_FIELD: raw}, maxlen=streams_maxlen[stream], approximate=True)
+            await pipe.execute()
+
+        await self.monitoring.fire_redis_stream_events_count(messages_count)
@@ -0,0 +1,120 @@
+import asyncio
+from dataclasses import dataclass, field
+
+import structlog
+
+from dbot.connectors.abstract import IConnector
+from dbot.connectors.messages import build_message
+from dbot.connectors.routing import RoutingTable
+from dbot.connectors.webhooks.transport import WebhooksTransport
+from dbot.infrastructure.monitoring import Monitoring
+from dbot.model.config import MonitorConfig
+from dbot.model.notifications import Notification
+
+logger = structlog.getLogger()
+
+
+@dataclass
+class BatchBuffer:
+    max_batch_size: int
+    max_delay: float
+    messages: list[str] = field(default_factory=list)
+    flush_handle: asyncio.TimerHandle | None = None
+
+
+class BatchWebhooksConnector(IConnector):
+    """
+    POSTs notifications as a JSON array in the Redis message format. Notifications of all channels targeting the same URL
+    share one buffer, which is sent when it reaches `max_batch_size` or `max_delay` seconds after its first message.
+    With zero `max_delay` the buffer is sent at the end of every `send`.
+    """
+
+    def __init__(
+        self,
+        transport: WebhooksTransport,
+        config: MonitorConfig,
+        monitoring: Monitoring,
+        routing_table: RoutingTable | None = None,
+    ) -> None:
+        self.transport = transport
+        self.monitoring = monitoring
+        self.routing_table = routing_table or RoutingTable.compile(config)
+
+        self._buffers: dict[str, BatchBuffer] = {}
+        self._tasks: set[asyncio.Task[None]] = set()
+
+        for route in self.routing_table.routes():
+            for target in route.batch_webhooks:
+                buffer = self._buffers.get(target.url)
+                if buffer is None:
+                    self._buffers[target.url] = BatchBuffer(target.max_batch_size, target.max_delay)
+                else:
+                    # the strictest limits win when channels configure the same URL differently
+                    buffer.max_batch_size = min(buffer.max_batch_size, target.max_batch_size)
+                    buffer.max_delay = min(buffer.max_delay, target.max_delay)
+
+    async def send(self, notifications: list[Notification]) -> None:
+        ready: list[tuple[str, list[str]]] = []
+        touched: set[str] = set()
+
+        for notification in notifications:
+            route = self.routing_table.route(notification)
+            if route is None or not route.batch_webhooks:
+                continue
+
+            raw = build_message(notification).model_dump_json()
+            for target in route.batch_webhooks:
+                url = target.url
+                buffer = self._buffers[url]
+                buffer.messages.append(raw)
+                touched.add(url)
+                if len(buffer.messages) >= buffer.max_batch_size:
+                    ready.append((url, self._take(url)))
+
+        for url in touched:
+            buffer = self._buffers[url]
+            if not buffer.messages:
+                continue
+            if buffer.max_delay <= 0:
+                ready.append((url, self._take(url)))
+            elif buffer.flush_handle is None:
+                buffer.flush_handle = asyncio.get_running_loop().call_later(buffer.max_delay, self._flush_later, url)
+
+        for url, messages in ready:
+            await self._post(url, messages)
+
+    async def flush(self) -> None:
+        for url, buffer in self._buffers.items():
+            if buffer.messages:
+                await self._post(url, self._take(url))
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _take(self, url: str) -> list[str]:
+        buffer = self._buffers[url]
+        if buffer.flush_handle is not None:
+            buffer.flush_handle.cancel()
+            buffer.flush_handle = None
+
+        messages, buffer.messages = buffer.messages, []
+        return messages
+
+    def _flush_later(self, url: str) -> None:
+        self._buffers[url].flush_handle = None
+        messages = self._take(url)
+        if not messages:
+            return
+
+        task = asyncio.create_task(self._post_logged(url, messages))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _post_logged(self, url: str, messages: list[str]) -> None:
+        try:
+            await self._post(url, messages)
+        except Exception as e:
+            logger.error(e)
+
+    async def _post(self, url: str, messages: list[str]) -> None:
+        await self.transport.post_json(url, "[" + ",".join(messages) + "]")
+        await self.monitoring.fire_webhooks_batch(len(messages))
@@ -0,0 +1,82 @@
+import time
+from dataclasses import dataclass
+from enum import Enum
+
+import structlog
+
+from dbot.infrastructure.monitoring import Monitoring
+
+logger = structlog.getLogger()
+
+
+class CircuitStateEnum(Enum):
+    CLOSED = 0
+    HALF_OPEN = 1
+    OPEN = 2
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, host: str) -> None:
+        super().__init__(f"Circuit is open for host {host}")
+        self.host = host
+
+
+@dataclass
+class HostCircuit:
+    state: CircuitStateEnum = CircuitStateEnum.CLOSED
+    failures: int = 0
+    opened_at: float = 0.0
+    probe_in_flight: bool = False
+
+
+class CircuitBreaker:
+    """
+    Per-host circuit breaker. After `failure_threshold` consecutive failures calls to the host fail fast
+    for `recovery_timeout` seconds, then one probe call decides whether the circuit closes or opens again.
+    """
+
+    def __init__(self, monitoring: Monitoring, failure_threshold: int = 5, recovery_timeout: float = 30.0) -> None:
+        self.monitoring = monitoring
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+
+        self._circuits: dict[str, HostCircuit] = {}
+
+    def state(self, host: str) -> CircuitStateEnum:
+        return self._circuits.get(host, HostCircuit()).state
+
+    async def before_call(self, host: str) -> None:
+        circuit = self._circuits.setdefault(host, HostCircuit())
+
+        if circuit.state == CircuitStateEnum.OPEN:
+            if time.monotonic() - circuit.opened_at < self.recovery_timeout:
+                raise CircuitOpenError(host)
+            await self._set_state(host, circuit, CircuitStateEnum.HALF_OPEN)
+
+        if circuit.state == CircuitStateEnum.HALF_OPEN:
+            if circuit.probe_in_flight:
+                raise CircuitOpenError(host)
+            circuit.probe_in_flight = True
+
+    async def record_success(self, host: str) -> None:
+        circuit = self._circuits.setdefault(host, HostCircuit())
+        circuit.failures = 0
+        circuit.probe_in_flight = False
+
+        if circuit.state != CircuitStateEnum.CLOSED:
+            await self._set_state(host, circuit, CircuitStateEnum.CLOSED)
+
+    async def record_failure(self, host: str) -> None:
+        circuit = self._circuits.setdefault(host, HostCircuit())
+        circuit.failures += 1
+        circuit.probe_in_flight = False
+
+        if circuit.state == CircuitStateEnum.HALF_OPEN or circuit.failures >= self.failure_threshold:
+            circuit.opened_at = time.monotonic()
+            if circuit.state != CircuitStateEnum.OPEN:
+                await self._set_state(host, circuit, CircuitStateEnum.OPEN)
+
+    async def _set_state(self, host: str, circuit: HostCircuit, state: CircuitStateEnum) -> None:
+        logger.warning("circuit_breaker.state_changed", host=host, previous=circuit.state.name, state=state.name)
+        circuit.state = state
+        await self.monitoring.fire_webhooks_circuit_state(host, state.value)
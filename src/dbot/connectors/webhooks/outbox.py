@@ -0,0 +1,247 @@
+import asyncio
+import random
+import time
+import uuid
+
+import redis
+import structlog
+from pydantic import BaseModel, Field
+from sentry_sdk import capture_exception
+
+from dbot.connectors.webhooks.breaker import CircuitOpenError
+from dbot.connectors.webhooks.transport import IWebhooksTransport, WebhooksTransport
+from dbot.infrastructure.monitoring import Monitoring
+
+logger = structlog.getLogger()
+
+# KEYS[1] - scheduled, KEYS[2] - in-flight, ARGV[1] - now, ARGV[2] - limit, ARGV[3] - lease expiration time.
+# Due entries are moved to in-flight set in one step, so a crash during delivery never loses them.
+CLAIM_DUE_SCRIPT = """
+local entries = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+for _, entry in ipairs(entries) do
+    redis.call('ZREM', KEYS[1], entry)
+    redis.call('ZADD', KEYS[2], ARGV[3], entry)
+end
+return entries
+"""
+
+# KEYS[1] - in-flight, KEYS[2] - scheduled, ARGV[1] - now
+REQUEUE_EXPIRED_SCRIPT = """
+local entries = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+for _, entry in ipairs(entries) do
+    redis.call('ZREM', KEYS[1], entry)
+    redis.call('ZADD', KEYS[2], ARGV[1], entry)
+end
+return #entries
+"""
+
+# KEYS[1] - dead-letter list, KEYS[2] - scheduled, ARGV[1] - now, ARGV[2] - limit, negative for no limit
+REDRIVE_SCRIPT = """
+local limit = tonumber(ARGV[2])
+local count = 0
+while limit < 0 or count < limit do
+    local raw = redis.call('RPOP', KEYS[1])
+    if not raw then
+        break
+    end
+    local entry = cjson.decode(raw)
+    entry['attempts'] = 0
+    redis.call('ZADD', KEYS[2], ARGV[1], cjson.encode(entry))
+    count = count + 1
+end
+return count
+"""
+
+
+class OutboxEntry(BaseModel):
+    id: str
+    link: str
+    attempts: int = 0
+    last_error: str = ""
+    # stored form of a claimed entry, used to remove it from the in-flight set
+    claim: str = Field(default="", exclude=True, repr=False)
+
+
+class WebhooksOutbox:
+    """
+    Failed webhook deliveries stored in Redis: a sorted set scored by the next attempt time
+    and a dead-letter list for deliveries that ran out of attempts.
+    Claimed entries are kept in an in-flight sorted set scored by the lease expiration time until they are
+    delivered or rescheduled, entries with expired leases are scheduled again.
+    """
+
+    SCHEDULED_KEY = "webhooks_outbox_scheduled"
+    INFLIGHT_KEY = "webhooks_outbox_inflight"
+    DEAD_KEY = "webhooks_outbox_dead"
+
+    def __init__(
+        self,
+        redis_client: redis.asyncio.Redis,
+        max_attempts: int = 8,
+        base_delay: float = 1.0,
+        max_delay: float = 3600.0,
+        lease_timeout: float = 300.0,
+    ) -> None:
+        self.redis_client = redis_client
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.lease_timeout = lease_timeout
+
+        self._claim_due_script = redis_client.register_script(CLAIM_DUE_SCRIPT)
+        self._requeue_expired_script = redis_client.register_script(REQUEUE_EXPIRED_SCRIPT)
+        self._redrive_script = redis_client.register_script(REDRIVE_SCRIPT)
+
+    async def add(self, link: str, error: str, count_attempt: bool = True) -> bool:
+        entry = OutboxEntry(id=uuid.uuid4().hex, link=link)
+        return await self.reschedule(entry, error, count_attempt)
+
+    async def reschedule(self, entry: OutboxEntry, error: str, count_attempt: bool = True) -> bool:
+        """
+        Returns False when the delivery ran out of attempts and was moved to the dead-letter list.
+        Calls skipped by an open circuit are rescheduled without counting an attempt.
+        """
+        attempts = entry.attempts + 1 if count_attempt else entry.attempts
+        updated = entry.model_copy(update={"attempts": attempts, "last_error": error})
+
+        # the claimed entry leaves in-flight set in the same transaction, so it is never lost or duplicated
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            if entry.claim:
+                pipe.zrem(self.INFLIGHT_KEY, entry.claim)
+            if updated.attempts >= self.max_attempts:
+                pipe.lpush(self.DEAD_KEY, updated.model_dump_json())
+            else:
+                pipe.zadd(self.SCHEDULED_KEY, {updated.model_dump_json(): self._next_attempt_at(updated)})
+            await pipe.execute()
+
+        return updated.attempts < self.max_attempts
+
+    async def claim_due(self, limit: int) -> list[OutboxEntry]:
+        now = time.time()
+        raw_entries = await self._claim_due_script(
+            keys=[self.SCHEDULED_KEY, self.INFLIGHT_KEY], args=[now, limit, now + self.lease_timeout]
+        )
+
+        entries = []
+        for raw in raw_entries:
+            entry = OutboxEntry.model_validate_json(raw)
+            entry.claim = raw.decode() if isinstance(raw, bytes) else raw
+            entries.append(entry)
+        return entries
+
+    async def ack(self, entry: OutboxEntry) -> None:
+        await self.redis_client.zrem(self.INFLIGHT_KEY, entry.claim)
+
+    async def requeue_expired(self) -> int:
+        """
+        Schedules again entries claimed by an instance which crashed or hung during delivery
+        """
+        return await self._requeue_expired_script(keys=[self.INFLIGHT_KEY, self.SCHEDULED_KEY], args=[time.time()])
+
+    async def redrive(self, limit: int | None = None) -> int:
+        return await self._redrive_script(
+            keys=[self.DEAD_KEY, self.SCHEDULED_KEY], args=[time.time(), -1 if limit is None else limit]
+        )
+
+    async def size(self) -> tuple[int, int]:
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            pipe.zcard(self.SCHEDULED_KEY)
+            pipe.llen(self.DEAD_KEY)
+            scheduled, dead = await pipe.execute()
+        return scheduled, dead
+
+    def _next_attempt_at(self, entry: OutboxEntry) -> float:
+        delay = min(self.max_delay, self.base_delay * 2 ** max(entry.attempts - 1, 0))
+        return time.time() + random.uniform(delay / 2, delay)
+
+
+async def _report_failure(monitoring: Monitoring, scheduled: bool, link: str, error: Exception) -> None:
+    if scheduled:
+        await monitoring.fire_webhooks_outbox_retries_count()
+        return
+
+    logger.error("webhooks_outbox.dead_lettered", link=link, error=str(error))
+    capture_exception(error)
+    await monitoring.fire_webhooks_outbox_dead_letters_count()
+
+
+class OutboxWebhooksTransport(IWebhooksTransport):
+    """
+    Makes a single delivery attempt and records failed deliveries in the outbox instead of retrying inline.
+    """
+
+    def __init__(self, transport: WebhooksTransport, outbox: WebhooksOutbox, monitoring: Monitoring) -> None:
+        self.transport = transport
+        self.outbox = outbox
+        self.monitoring = monitoring
+
+    async def call(self, link: str) -> None:
+        try:
+            await self.transport.call_once(link)
+        except Exception as e:
+            logger.warning("webhooks_outbox.delivery_failed", link=link, error=str(e))
+            scheduled = await self.outbox.add(link, str(e), count_attempt=not isinstance(e, CircuitOpenError))
+            await _report_failure(self.monitoring, scheduled, link, e)
+
+
+class OutboxScheduler:
+    def __init__(
+        self,
+        outbox: WebhooksOutbox,
+        transport: WebhooksTransport,
+        monitoring: Monitoring,
+        interval: float = 1.0,
+        batch_size: int = 100,
+    ) -> None:
+        self.outbox = outbox
+        self.transport = transport
+        self.monitoring = monitoring
+        self.interval = interval
+        self.batch_size = batch_size
+
+        self._task: asyncio.Task[None] | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info("webhooks_outbox_scheduler.started", interval=self.interval)
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        logger.info("webhooks_outbox_scheduler.stopped")
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.process_due()
+            except Exception as e:
+                logger.error(e)
+            await asyncio.sleep(self.interval)
+
+    async def process_due(self) -> None:
+        requeued = await self.outbox.requeue_expired()
+        if requeued:
+            logger.warning("webhooks_outbox.leases_expired", count=requeued)
+
+        entries = await self.outbox.claim_due(self.batch_size)
+        if entries:
+            await asyncio.gather(*[self._retry(entry) for entry in entries])
+
+        scheduled, dead = await self.outbox.size()
+        await self.monitoring.fire_webhooks_outbox_size(scheduled, dead)
+
+    async def _retry(self, entry: OutboxEntry) -> None:
+        try:
+            await self.transport.call_once(entry.link)
+        except Exception as e:
+            scheduled = await self.outbox.reschedule(entry, str(e), count_attempt=not isinstance(e, CircuitOpenError))
+            await _report_failure(self.monitoring, scheduled, entry.link, e)
+            return
+
+        await self.outbox.ack(entry)
+        logger.info("webhooks_outbox.delivered", link=entry.link, attempts=entry.attempts + 1)
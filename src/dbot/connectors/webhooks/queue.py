@@ -0,0 +1,88 @@
+import asyncio
+import time
+from dataclasses import dataclass
+
+import structlog
+
+from dbot.connectors.webhooks.transport import IWebhooksTransport
+from dbot.infrastructure.monitoring import Monitoring
+
+logger = structlog.getLogger()
+
+
+@dataclass
+class WebhookDelivery:
+    link: str
+    enqueued_at: float
+
+
+class WebhooksDeliveryQueue(IWebhooksTransport):
+    """
+    Decouples webhook delivery from channel processing: `call` only enqueues the link,
+    delivery with retries happens in a pool of worker tasks.
+    When the queue is full new webhooks are dropped, so a slow receiver can never block detection.
+    """
+
+    def __init__(
+        self,
+        transport: IWebhooksTransport,
+        monitoring: Monitoring,
+        size: int = 1000,
+        workers: int = 4,
+    ) -> None:
+        self.transport = transport
+        self.monitoring = monitoring
+        self.workers_count = workers
+
+        self._queue: asyncio.Queue[WebhookDelivery] = asyncio.Queue(maxsize=size)
+        self._workers: list[asyncio.Task[None]] = []
+        self._busy_workers = 0
+
+    def start(self) -> None:
+        if self._workers:
+            return
+
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.workers_count)]
+        logger.info("webhooks_queue.started", workers=self.workers_count, size=self._queue.maxsize)
+
+    async def stop(self, drain: bool = True, timeout: float | None = None) -> None:
+        if drain:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout=timeout)
+            except asyncio.TimeoutError:
+                logger.warning("webhooks_queue.drain_timeout", left=self._queue.qsize())
+
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+        logger.info("webhooks_queue.stopped", dropped=self._queue.qsize())
+
+    async def call(self, link: str) -> None:
+        try:
+            self._queue.put_nowait(WebhookDelivery(link=link, enqueued_at=time.monotonic()))
+        except asyncio.QueueFull:
+            logger.error("webhooks_queue.full", link=link)
+            await self.monitoring.fire_webhooks_dropped_count()
+            return
+
+        await self.monitoring.fire_webhooks_queue_depth(self._queue.qsize())
+
+    async def _worker(self) -> None:
+        while True:
+            delivery = await self._queue.get()
+            await self._set_busy(1)
+            try:
+                await self.monitoring.fire_webhooks_queue_wait(time.monotonic() - delivery.enqueued_at)
+                await self.transport.call(delivery.link)
+            except Exception as e:
+                logger.error(e)
+            finally:
+                self._queue.task_done()
+                await self._set_busy(-1)
+                await self.monitoring.fire_webhooks_queue_depth(self._queue.qsize())
+
+    async def _set_busy(self, delta: int) -> None:
+        self._busy_workers += delta
+        await self.monitoring.fire_webhooks_workers_utilization(self._busy_workers / self.workers_count)
@@ -0,0 +1,92 @@
+import re
+import typing
+from abc import ABC, abstractmethod
+
+from jinja2 import Template
+from jinja2.defaults import DEFAULT_NAMESPACE
+
+VARIABLE_RE = re.compile(r"\{\{\s*([A-Za-z_][A-Za-z0-9_]*)\s*\}\}")
+JINJA_SYNTAX_MARKERS = ("{{", "}}", "{%", "%}", "{#", "#}")
+# names Jinja does not look up in the context: literals, keywords and globals like `range`
+JINJA_RESERVED_NAMES = frozenset(
+    {"true", "false", "none", "True", "False", "None", "and", "or", "not", "in", "is", "if", "else"}
+) | frozenset(DEFAULT_NAMESPACE)
+
+
+class IWebhookTemplate(ABC):
+    @abstractmethod
+    def render(self, **data: typing.Any) -> str:
+        pass
+
+
+class ConstantTemplate(IWebhookTemplate):
+    def __init__(self, source: str) -> None:
+        self.source = source
+
+    def render(self, **data: typing.Any) -> str:
+        return self.source
+
+
+class SubstitutionTemplate(IWebhookTemplate):
+    """
+    Template with only plain `{{ name }}` variables. Renders like Jinja: missing variables are empty strings.
+    """
+
+    def __init__(self, literals: list[str], variables: list[str]) -> None:
+        # literals[i] goes before variables[i], the last literal closes the template
+        self.literals = literals
+        self.variables = variables
+
+    def render(self, **data: typing.Any) -> str:
+        parts = []
+        for literal, variable in zip(self.literals, self.variables):
+            parts.append(literal)
+            parts.append(str(data[variable]) if variable in data else "")
+        parts.append(self.literals[-1])
+        return "".join(parts)
+
+
+class JinjaTemplate(IWebhookTemplate):
+    def __init__(self, source: str) -> None:
+        self.template = Template(source)
+
+    def render(self, **data: typing.Any) -> str:
+        return self.template.render(**data)
+
+
+class TemplateCompiler:
+    """
+    Compiles webhook templates once per distinct string. Constant strings and plain variable substitutions
+    are rendered without the Jinja runtime, everything else falls back to Jinja.
+    """
+
+    def __init__(self) -> None:
+        self._templates: dict[str, IWebhookTemplate] = {}
+
+    def compile(self, source: str) -> IWebhookTemplate:
+        template = self._templates.get(source)
+        if template is None:
+            template = self._compile(source)
+            self._templates[source] = template
+        return template
+
+    @staticmethod
+    def _compile(source: str) -> IWebhookTemplate:
+        # Jinja drops a single trailing newline, keep its exact output for such templates
+        if source.endswith("\n"):
+            return JinjaTemplate(source)
+
+        literals = VARIABLE_RE.split(source)[::2]
+        variables = VARIABLE_RE.findall(source)
+        if any(marker in literal for literal in literals for marker in JINJA_SYNTAX_MARKERS):
+            return JinjaTemplate(source)
+        if any(variable in JINJA_RESERVED_NAMES for variable in variables):
+            return JinjaTemplate(source)
+
+        if not variables:
+            return ConstantTemplate(source)
+
+        return SubstitutionTemplate(literals, variables)
+
+    def __len__(self) -> int:
+        return len(self._templates)
@@ -1,47 +1,228 @@
+import types
+from abc import ABC, abstractmethod
+
 import aiohttp
 import structlog
 import tenacity
+from pydantic_settings import BaseSettings, SettingsConfigDict
 from sentry_sdk import capture_exception
+from yarl import URL
+
+from dbot.connectors.webhooks.breaker import CircuitBreaker, CircuitOpenError
+from dbot.infrastructure.monitoring import Monitoring
 
 logger = structlog.getLogger()
 
 
-async def initialize_session() -> aiohttp.ClientSession:
-    timeout = aiohttp.ClientTimeout(total=15.0, connect=5.0, sock_connect=5.0, sock_read=5.0)
-    return aiohttp.ClientSession(timeout=timeout)
+class TransportConfiguration(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="dbot_webhooks_transport_", case_sensitive=False)
+
+    connections_limit: int = 100
+    # 0 does not limit connections to one host
+    connections_limit_per_host: int = 0
+    keepalive_timeout: float = 60.0
+    dns_cache_ttl: int = 300
+
+    breaker_enabled: bool = False
+    breaker_failure_threshold: int = 5
+    breaker_recovery_timeout: float = 30.0
+
+    total_timeout: float = 15.0
+    connect_timeout: float = 5.0
+    read_timeout: float = 5.0
+
+
+class TransportInstrumentation:
+    """
+    Reports connection pool usage of a session through aiohttp tracing hooks.
+    """
+
+    def __init__(self, monitoring: Monitoring) -> None:
+        self.monitoring = monitoring
+        self.waiting = 0
+        self.active = 0
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_connection_queued_start.append(self._on_connection_queued_start)
+        trace_config.on_connection_queued_end.append(self._on_connection_queued_end)
+        trace_config.on_connection_create_end.append(self._on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(self._on_connection_reuseconn)
+        trace_config.on_request_end.append(self._on_request_finished)
+        trace_config.on_request_exception.append(self._on_request_finished)
+        return trace_config
+
+    async def _on_connection_queued_start(
+        self, session: aiohttp.ClientSession, context: types.SimpleNamespace, params: object
+    ) -> None:
+        self.waiting += 1
+        await self.monitoring.fire_webhooks_connections_waiting(self.waiting)
+
+    async def _on_connection_queued_end(
+        self, session: aiohttp.ClientSession, context: types.SimpleNamespace, params: object
+    ) -> None:
+        self.waiting -= 1
+        await self.monitoring.fire_webhooks_connections_waiting(self.waiting)
+
+    async def _on_connection_create_end(
+        self, session: aiohttp.ClientSession, context: types.SimpleNamespace, params: object
+    ) -> None:
+        context.connection_acquired = True
+        await self.monitoring.fire_webhooks_connections_created_count()
+        await self._set_active(1)
+
+    async def _on_connection_reuseconn(
+        self, session: aiohttp.ClientSession, context: types.SimpleNamespace, params: object
+    ) -> None:
+        context.connection_acquired = True
+        await self.monitoring.fire_webhooks_connections_reused_count()
+        await self._set_active(1)
+
+    async def _on_request_finished(
+        self, session: aiohttp.ClientSession, context: types.SimpleNamespace, params: object
+    ) -> None:
+        # every redirect is a separate request with its own connection
+        if getattr(context, "connection_acquired", False):
+            context.connection_acquired = False
+            await self._set_active(-1)
+
+    async def _set_active(self, delta: int) -> None:
+        self.active += delta
+        await self.monitoring.fire_webhooks_connections_active(self.active)
+
+
+async def initialize_session(
+    config: TransportConfiguration | None = None, monitoring: Monitoring | None = None
+) -> aiohttp.ClientSession:
+    config = config or TransportConfiguration()
+
+    timeout = aiohttp.ClientTimeout(
+        total=config.total_timeout,
+        connect=config.connect_timeout,
+        sock_connect=config.connect_timeout,
+        sock_read=config.read_timeout,
+    )
+    connector = aiohttp.TCPConnector(
+        limit=config.connections_limit,
+        limit_per_host=config.connections_limit_per_host,
+        keepalive_timeout=config.keepalive_timeout,
+        use_dns_cache=True,
+        ttl_dns_cache=config.dns_cache_ttl,
+    )
+    trace_configs = [TransportInstrumentation(monitoring).trace_config()] if monitoring else None
+
+    return aiohttp.ClientSession(timeout=timeout, connector=connector, trace_configs=trace_configs)
+
+
+class IWebhooksTransport(ABC):
+    @abstractmethod
+    async def call(self, link: str) -> None:
+        pass
 
 
-class WebhooksTransport:
-    def __init__(self, session: aiohttp.ClientSession, raise_errors: bool = False) -> None:
+class WebhooksTransport(IWebhooksTransport):
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        raise_errors: bool = False,
+        breaker: CircuitBreaker | None = None,
+        monitoring: Monitoring | None = None,
+    ) -> None:
         self.session = session
         self.raise_errors = raise_errors
+        self.breaker = breaker
+        self.monitoring = monitoring
 
     @tenacity.retry(
         reraise=False,
         stop=tenacity.stop_after_attempt(3),
         wait=tenacity.wait_random_exponential(0.5, 60.0),
+        retry=tenacity.retry_if_not_exception_type(CircuitOpenError),
     )
     async def _call(self, link: str) -> None:
         try:
-            response = await self.session.get(link, allow_redirects=True)
+            await self._request_once(link)
         except Exception as e:
-            capture_exception(e)
-            logger.error(e)
+            self._report_error(link, e)
             if self.raise_errors:
                 raise
+
+    @tenacity.retry(
+        reraise=True,
+        stop=tenacity.stop_after_attempt(3),
+        wait=tenacity.wait_random_exponential(0.5, 60.0),
+        retry=tenacity.retry_if_not_exception_type(CircuitOpenError),
+    )
+    async def _post_with_retries(self, link: str, body: str) -> None:
+        await self._request_once(link, body)
+
+    @staticmethod
+    def _report_error(link: str, error: Exception) -> None:
+        if isinstance(error, CircuitOpenError):
+            # the host is known to be down, do not report every skipped call
+            logger.warning("webhook.skipped", link=link, reason=str(error))
+            return
+
+        capture_exception(error)
+        logger.error(error)
+
+    async def call_once(self, link: str) -> None:
+        """
+        One delivery attempt, errors and >400 statuses are raised.
+        Raises CircuitOpenError without a request when the host circuit is open.
+        """
+        await self._request_once(link)
+
+    async def _request_once(self, link: str, body: str | None = None) -> None:
+        if self.breaker is None:
+            await self._request(link, body)
+            return
+
+        host = URL(link).host or ""
+        await self.breaker.before_call(host)
+
+        # the outcome is recorded in finally, so a cancelled half-open probe does not leave the circuit stuck
+        succeeded = False
+        try:
+            await self._request(link, body)
+            succeeded = True
+        except aiohttp.ClientResponseError as e:
+            # client errors mean the host is up and answers
+            succeeded = e.status < 500
+            raise
+        finally:
+            if succeeded:
+                await self.breaker.record_success(host)
             else:
-                return
+                await self.breaker.record_failure(host)
+
+    async def _request(self, link: str, body: str | None) -> None:
+        if body is None:
+            request = self.session.get(link, allow_redirects=True)
+        else:
+            request = self.session.post(link, data=body, headers={"Content-Type": "application/json"})
+
+        async with request as response:
+            # body is read to the end, otherwise the connection is closed instead of returning to the pool
+            await response.read()
 
         # do not retry on >400 status from target
+        response.raise_for_status()
+
+        # counted on delivery, so queued and dropped webhooks are not counted and retried ones are counted once
+        if self.monitoring is not None:
+            await self.monitoring.fire_webhooks_count()
+
+    async def call(self, link: str) -> None:
+        await self._call(link=link)
+
+    async def post_json(self, link: str, body: str) -> None:
+        """
+        Unlike `call`, failed attempts are retried even when errors are not raised, a batch is lost after the last one.
+        """
         try:
-            response.raise_for_status()
+            await self._post_with_retries(link, body)
         except Exception as e:
-            capture_exception(e)
-            logger.error(e)
+            self._report_error(link, e)
             if self.raise_errors:
                 raise
-            else:
-                return
-
-    async def call(self, link: str) -> None:
-        await self._call(link=link)
@@ -1,17 +1,17 @@
 import asyncio
 import typing
-from enum import Enum
 from functools import singledispatchmethod
 from urllib.parse import quote_plus
 
 import structlog
-from jinja2 import Template
 
 from dbot.connectors.abstract import IConnector, NotificationTypesEnum
-from dbot.connectors.webhooks.transport import WebhooksTransport
+from dbot.connectors.routing import RoutingTable
+from dbot.connectors.webhooks.templates import TemplateCompiler
+from dbot.connectors.webhooks.transport import IWebhooksTransport
 from dbot.infrastructure.monitoring import Monitoring
 from dbot.model import NewUserInChannelNotification, UsersConnectedToChannelNotification
-from dbot.model.config import ChannelMonitorConfig, MonitorConfig
+from dbot.model.config import MonitorConfig
 from dbot.model.notifications import (
     Notification,
     UserLeftChannelNotification,
@@ -21,47 +21,37 @@ from dbot.model.notifications import (
 logger = structlog.getLogger()
 
 
-class TemplatesEnum(Enum):
-    NEW_USER = "new_user_webhooks"
-    USERS_CONNECTED = "users_connected_webhooks"
-    USERS_LEFT = "users_left_webhooks"
-    USER_LEFT = "user_left_webhooks"
-
-
 class WebhooksConnector(IConnector):
     def __init__(
         self,
-        transport: WebhooksTransport,
+        transport: IWebhooksTransport,
         config: MonitorConfig,
         monitoring: Monitoring,
+        compiler: TemplateCompiler | None = None,
+        routing_table: RoutingTable | None = None,
     ):
         self.transport = transport
         self.monitoring = monitoring
-        self.channels_templates = {
-            config.channel_id: self._init_channel_templates(config) for config in config.channels
-        }
+        self.compiler = compiler or TemplateCompiler()
+        self.routing_table = routing_table or RoutingTable.compile(config)
 
-    def _init_channel_templates(
-        self, channel_config: ChannelMonitorConfig
-    ) -> typing.Dict[TemplatesEnum, list[Template]]:
-        if channel_config.webhooks is None:
-            return {}
-
-        webhooks_target = channel_config.webhooks
-
-        return {
-            TemplatesEnum.NEW_USER: [Template(template_str) for template_str in webhooks_target.new_user_webhooks],
-            TemplatesEnum.USERS_CONNECTED: [
-                Template(template_str) for template_str in webhooks_target.users_connected_webhooks
-            ],
-            TemplatesEnum.USERS_LEFT: [Template(template_str) for template_str in webhooks_target.users_left_webhooks],
-            TemplatesEnum.USER_LEFT: [Template(template_str) for template_str in webhooks_target.user_left_webhooks],
-        }
+        # templates are compiled once at start, sending only looks them up in the compiler cache
+        for route in self.routing_table.routes():
+            for template_str in route.webhooks:
+                self.compiler.compile(template_str)
 
     async def send(self, notifications: list[Notification]) -> None:
-        tasks = [asyncio.create_task(self._send_one(notification)) for notification in notifications]
+        tasks = [
+            asyncio.create_task(self._send_one(notification))
+            for notification in notifications
+            if self._has_webhooks(notification)
+        ]
         await asyncio.gather(*tasks)
 
+    def _has_webhooks(self, notification: Notification) -> bool:
+        route = self.routing_table.route(notification)
+        return route is not None and bool(route.webhooks)
+
     @singledispatchmethod
     async def _send_one(self, notification: Notification) -> None:
         raise NotImplementedError()
@@ -74,7 +64,7 @@ class WebhooksConnector(IConnector):
             "user_id": notification.user.id,
             "type": NotificationTypesEnum.NEW_USER.value,
         }
-        await self._execute_send(data, notification.channel_id, TemplatesEnum.NEW_USER)
+        await self._execute_send(data, notification.channel_id, NotificationTypesEnum.NEW_USER)
 
     @_send_one.register
     async def _(self, notification: UserLeftChannelNotification) -> None:
@@ -84,7 +74,7 @@ class WebhooksConnector(IConnector):
             "user_id": notification.user.id,
             "type": NotificationTypesEnum.USER_LEFT.value,
         }
-        await self._execute_send(data, notification.channel_id, TemplatesEnum.USER_LEFT)
+        await self._execute_send(data, notification.channel_id, NotificationTypesEnum.USER_LEFT)
 
     @_send_one.register
     async def _(self, notification: UsersConnectedToChannelNotification) -> None:
@@ -96,7 +86,7 @@ class WebhooksConnector(IConnector):
             "id": notification.channel_id,
             "type": NotificationTypesEnum.USERS_CONNECTED.value,
         }
-        await self._execute_send(data, notification.channel_id, TemplatesEnum.USERS_CONNECTED)
+        await self._execute_send(data, notification.channel_id, NotificationTypesEnum.USERS_CONNECTED)
 
     @_send_one.register
     async def _(self, notification: UsersLeftChannelNotification) -> None:
@@ -104,14 +94,15 @@ class WebhooksConnector(IConnector):
             "id": notification.channel_id,
             "type": NotificationTypesEnum.USERS_LEFT.value,
         }
-        await self._execute_send(data, notification.channel_id, TemplatesEnum.USERS_LEFT)
+        await self._execute_send(data, notification.channel_id, NotificationTypesEnum.USERS_LEFT)
 
-    async def _execute_send(self, data: dict[str, typing.Any], channel_id: int, template_type: TemplatesEnum) -> None:
-        templates = self.channels_templates.get(channel_id)
-        if not templates:
+    async def _execute_send(
+        self, data: dict[str, typing.Any], channel_id: int, notification_type: NotificationTypesEnum
+    ) -> None:
+        route = self.routing_table.get(channel_id, notification_type)
+        if route is None:
             return
 
-        for template in templates[template_type]:
-            link = template.render(**data)
+        for template_str in route.webhooks:
+            link = self.compiler.compile(template_str).render(**data)
             await self.transport.call(link)
-            await self.monitoring.fire_webhooks_count()
@@ -7,3 +7,10 @@ class IDiscordClient(ABC):
     @abstractmethod
     def get_channel_members(self, channel_id: int) -> list[User] | None:
         ...
+
+    @abstractmethod
+    def local_channels(self, channel_ids: set[int]) -> set[int]:
+        """
+        Channels served by gateway connections of this process
+        """
+        ...
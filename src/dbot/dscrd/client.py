@@ -1,45 +1,124 @@
 import asyncio
+import math
+import time
 import typing
 
 import discord
 import structlog
 
 from dbot.dscrd.abstract import IDiscordClient
+from dbot.dscrd.snapshots import MembersSnapshot, SnapshotHandoff
+from dbot.infrastructure.monitoring import Monitoring
 from dbot.model import User
+from dbot.schedule import FixedRateScheduler
 from dbot.services import ActivityProcessingService
 
 logger = structlog.get_logger()
 
 
+def gateway_options(lean: bool = False) -> dict[str, typing.Any]:
+    if not lean:
+        return {"intents": discord.Intents.all()}
+
+    # only voice channels membership is read: no member list, presences and messages, members are cached while
+    # they are in a voice channel
+    intents = discord.Intents.none()
+    intents.guilds = True
+    intents.voice_states = True
+
+    return {
+        "intents": intents,
+        "member_cache_flags": discord.MemberCacheFlags.from_intents(intents),
+        "max_messages": None,
+        "chunk_guilds_at_startup": False,
+    }
+
+
 class DiscordClient(discord.Client, IDiscordClient):
     def __init__(
         self,
         processing_service: ActivityProcessingService,
-        check_interval: int,
+        scheduler: FixedRateScheduler,
         *args: typing.Any,
+        event_driven: bool = False,
+        lean: bool = False,
+        handoff: SnapshotHandoff | None = None,
         **kwargs: typing.Any,
     ) -> None:
-        intents = discord.Intents.all()
-        kwargs["intents"] = intents
+        kwargs.update(gateway_options(lean))
 
         super().__init__(*args, **kwargs)
 
         self.processing_service = processing_service
-        self.processing_service.register_client(self)
-        self.check_interval = check_interval
+        # with handoff the client runs in its own thread and only passes members snapshots to the processing loop
+        self.handoff = handoff
+        if self.handoff is None:
+            self.processing_service.register_client(self)
+        self.scheduler = scheduler
+        self.event_driven = event_driven
+
+        self._background_worker: asyncio.Task[None] | None = None
 
     async def on_ready(self) -> None:
-        self.loop.create_task(self.background_worker())
+        # on_ready is dispatched again after every gateway reconnect, only one worker must poll channels
+        if self._background_worker is not None and not self._background_worker.done():
+            return
+        self._background_worker = self.loop.create_task(self.background_worker())
 
     async def background_worker(self) -> None:
         logger.info("background_worker.started")
         await self.wait_until_ready()
-        while not self.is_closed():
-            try:
-                await self.processing_service.process()
-            except Exception as e:
-                logger.error(e)
-            await asyncio.sleep(self.check_interval)  # task runs every 60 seconds
+        await self.scheduler.run(self._process, until=self.is_closed)
+
+    async def _process(self, tick: float, skipped: list[float]) -> None:
+        if self.handoff is not None:
+            self.handoff.put(self.snapshot(self.local_channels(self.processing_service.channels), tick, skipped))
+            return
+
+        try:
+            await self.processing_service.process(tick, skipped)
+        except Exception as e:
+            logger.error(e)
+
+    def snapshot(
+        self, channel_ids: set[int], tick: float | None = None, skipped: list[float] | None = None
+    ) -> MembersSnapshot:
+        members = {channel_id: self.get_channel_members(channel_id) for channel_id in channel_ids}
+        return MembersSnapshot(members=members, created_at=time.monotonic(), tick=tick, skipped=list(skipped or []))
+
+    async def on_voice_state_update(
+        self, member: discord.Member, before: discord.VoiceState, after: discord.VoiceState
+    ) -> None:
+        if not self.event_driven:
+            return
+
+        channels = self._get_changed_channels(before, after)
+        if not channels:
+            return
+
+        logger.debug("voice_state_update.received", member_id=member.id, channels=channels)
+        if self.handoff is not None:
+            self.handoff.put(self.snapshot(channels))
+            return
+
+        try:
+            await self.processing_service.process_changed(channels)
+        except Exception as e:
+            logger.error(e)
+
+    @staticmethod
+    def _get_changed_channels(before: discord.VoiceState, after: discord.VoiceState) -> set[int]:
+        before_id = before.channel.id if before.channel else None
+        after_id = after.channel.id if after.channel else None
+
+        # mute, deafen, stream and similar updates do not change channel membership
+        if before_id == after_id:
+            return set()
+
+        return {channel_id for channel_id in (before_id, after_id) if channel_id is not None}
+
+    def local_channels(self, channel_ids: set[int]) -> set[int]:
+        return channel_ids
 
     def get_channel_members(self, channel_id: int) -> list[User] | None:
         channel = self.get_channel(channel_id)
@@ -69,3 +148,55 @@ class DiscordClient(discord.Client, IDiscordClient):
     ) -> None:
         async with self:
             await self.start(token, reconnect=reconnect)
+
+
+class ShardedDiscordClient(DiscordClient, discord.AutoShardedClient):
+    """
+    Runs several gateway connections in one process. With `shard_ids` only the given shards are connected,
+    so shards of one bot can be spread between processes.
+    """
+
+    SHARDS_MONITORING_INTERVAL = 10
+
+    def __init__(
+        self,
+        processing_service: ActivityProcessingService,
+        scheduler: FixedRateScheduler,
+        monitoring: Monitoring,
+        *args: typing.Any,
+        **kwargs: typing.Any,
+    ) -> None:
+        super().__init__(processing_service, scheduler, *args, **kwargs)
+
+        self._monitoring = monitoring
+
+    async def setup_hook(self) -> None:
+        # unlike on_ready, setup hook is called once per client
+        self.loop.create_task(self.shards_monitoring())
+
+    def local_channels(self, channel_ids: set[int]) -> set[int]:
+        if self.shard_ids is None:
+            return channel_ids
+
+        local_shards = set(self.shard_ids)
+        channels = set()
+        for channel_id in channel_ids:
+            channel = self.get_channel(channel_id)
+            if channel is None or isinstance(channel, discord.abc.PrivateChannel):
+                continue
+            if channel.guild.shard_id in local_shards:
+                channels.add(channel_id)
+        return channels
+
+    async def shards_monitoring(self) -> None:
+        await self.wait_until_ready()
+        while not self.is_closed():
+            await self.report_shards()
+            await asyncio.sleep(self.SHARDS_MONITORING_INTERVAL)
+
+    async def report_shards(self) -> None:
+        for shard_id, shard in self.shards.items():
+            # latency is infinite until the first heartbeat is acknowledged
+            if math.isfinite(shard.latency):
+                await self._monitoring.fire_shard_latency(shard_id, shard.latency)
+            await self._monitoring.fire_shard_up(shard_id, not shard.is_closed())
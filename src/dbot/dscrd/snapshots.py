@@ -0,0 +1,162 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+
+import structlog
+
+from dbot.dscrd.abstract import IDiscordClient
+from dbot.infrastructure.monitoring import Monitoring
+from dbot.model import User
+from dbot.services import ActivityProcessingService
+
+logger = structlog.get_logger()
+
+
+@dataclass
+class MembersSnapshot:
+    members: dict[int, list[User] | None]
+    created_at: float
+    # polling tick the snapshot was taken for, None for snapshots of channels changed by voice state events
+    tick: float | None = None
+    # polling ticks missed before the tick, their channels are processed along with it
+    skipped: list[float] = field(default_factory=list)
+    # channels changed by voice state events, processed as activity regardless of the tick
+    changed_channels: set[int] = field(default_factory=set)
+    # pending tick snapshots replaced by this one while the processing was busy
+    coalesced: int = 0
+
+    def __post_init__(self) -> None:
+        if self.tick is None and not self.changed_channels:
+            self.changed_channels = set(self.members)
+
+    def merge(self, snapshot: "MembersSnapshot") -> "MembersSnapshot":
+        """
+        Merges a newer snapshot into this one, a tick snapshot carries members of all channels and replaces older ones
+        """
+        members = self.members | snapshot.members
+        tick, skipped, coalesced = self.tick, self.skipped, self.coalesced
+        if snapshot.tick is not None:
+            members = snapshot.members
+            tick = snapshot.tick
+            skipped = self.skipped + snapshot.skipped
+            if self.tick is not None:
+                skipped.append(self.tick)
+                coalesced += 1
+
+        return MembersSnapshot(
+            members=members,
+            created_at=self.created_at,
+            tick=tick,
+            skipped=sorted(skipped),
+            changed_channels=self.changed_channels | snapshot.changed_channels,
+            coalesced=coalesced + snapshot.coalesced,
+        )
+
+
+class SnapshotHandoff:
+    """
+    Passes members snapshots from the gateway thread to the processing event loop. Only one snapshot is pending:
+    when the processing is slower than ticks, newer snapshots are merged into the pending one instead of queueing
+    up, so the processing always catches up with the latest members.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+        self._pending: MembersSnapshot | None = None
+        self._ready = asyncio.Event()
+
+    def put(self, snapshot: MembersSnapshot) -> None:
+        """
+        Thread-safe, called from the gateway event loop
+        """
+        self._loop.call_soon_threadsafe(self._put, snapshot)
+
+    def _put(self, snapshot: MembersSnapshot) -> None:
+        if self._pending is not None:
+            snapshot = self._pending.merge(snapshot)
+            if snapshot.coalesced > self._pending.coalesced:
+                logger.warning("snapshot.coalesced", tick=snapshot.tick, skipped=snapshot.skipped)
+
+        self._pending = snapshot
+        self._ready.set()
+
+    async def get(self) -> MembersSnapshot:
+        await self._ready.wait()
+        self._ready.clear()
+
+        snapshot, self._pending = self._pending, None
+        assert snapshot is not None
+        return snapshot
+
+
+class SnapshotDiscordClient(IDiscordClient):
+    """
+    Serves channel members from snapshots taken on the gateway thread
+    """
+
+    def __init__(self) -> None:
+        self._members: dict[int, list[User] | None] = {}
+
+    def update(self, snapshot: MembersSnapshot) -> None:
+        if snapshot.tick is None:
+            self._members.update(snapshot.members)
+        else:
+            self._members = snapshot.members
+
+    def local_channels(self, channel_ids: set[int]) -> set[int]:
+        return channel_ids & self._members.keys()
+
+    def get_channel_members(self, channel_id: int) -> list[User] | None:
+        return self._members.get(channel_id)
+
+
+class SnapshotProcessor:
+    def __init__(
+        self,
+        handoff: SnapshotHandoff,
+        processing_service: ActivityProcessingService,
+        monitoring: Monitoring,
+    ) -> None:
+        self.handoff = handoff
+        self.processing_service = processing_service
+        self.monitoring = monitoring
+
+        self.discord_client = SnapshotDiscordClient()
+        self.processing_service.register_client(self.discord_client)
+
+        self._task: asyncio.Task[None] | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info("snapshot_processor.started")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        logger.info("snapshot_processor.stopped")
+
+    async def _run(self) -> None:
+        while True:
+            snapshot = await self.handoff.get()
+            try:
+                await self.process(snapshot)
+            except Exception as e:
+                logger.error(e)
+
+    async def process(self, snapshot: MembersSnapshot) -> None:
+        await self.monitoring.fire_snapshot_handoff(time.monotonic() - snapshot.created_at)
+
+        if snapshot.coalesced:
+            # ticks merged while the processing was busy are overruns the scheduler does not see
+            await self.monitoring.fire_tick_overrun(snapshot.coalesced)
+
+        self.discord_client.update(snapshot)
+        if snapshot.changed_channels:
+            await self.processing_service.process_changed(snapshot.changed_channels)
+        if snapshot.tick is not None:
+            await self.processing_service.process(snapshot.tick, snapshot.skipped)
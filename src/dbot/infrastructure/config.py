@@ -1,6 +1,25 @@
+from enum import Enum
+
+from pydantic import model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
+class StateFormatEnum(Enum):
+    V2 = "v2"
+    V3 = "v3"
+
+
+class StateStorageEnum(Enum):
+    BLOB = "blob"
+    HASH = "hash"
+    LUA = "lua"
+
+
+class OverrunPolicyEnum(Enum):
+    SKIP = "skip"
+    COALESCE = "coalesce"
+
+
 class RedisConfig(BaseSettings):
     model_config = SettingsConfigDict(env_prefix="dbot_redis_", case_sensitive=False)
 
@@ -15,5 +34,83 @@ class Configuration(BaseSettings):
     sentry_dsn: str = ""
 
 
+class DiscordConfig(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="dbot_discord_", case_sensitive=False)
+
+    lean: bool = False
+    sharded: bool = False
+    # total shards count, discord recommended count is used when empty, required with shard ids
+    shard_count: int | None = None
+    # shards connected by this process, all shards when empty
+    shard_ids: list[int] | None = None
+    separate_loop: bool = False
+
+    @model_validator(mode="after")
+    def check_shards(self) -> "DiscordConfig":
+        if self.shard_ids is None:
+            return self
+
+        if self.shard_count is None:
+            raise ValueError("shard_count is required when shard_ids are set")
+        if any(shard_id < 0 or shard_id >= self.shard_count for shard_id in self.shard_ids):
+            raise ValueError("shard_ids must be between 0 and shard_count - 1")
+        return self
+
+
+class ProcessingConfig(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="dbot_processing_", case_sensitive=False)
+
+    check_interval: int = 10
+    event_driven: bool = False
+    reconciliation_interval: int = 60
+    concurrency: int = 1
+    adaptive: bool = False
+    max_interval: int = 300
+    backoff_factor: float = 2.0
+    overrun_policy: OverrunPolicyEnum = OverrunPolicyEnum.SKIP
+    stagger_slots: int = 1
+
+
+class StateConfig(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="dbot_state_", case_sensitive=False)
+
+    cache_enabled: bool = False
+    format: StateFormatEnum = StateFormatEnum.V2
+    storage: StateStorageEnum = StateStorageEnum.BLOB
+
+
+class WebhooksConfig(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="dbot_webhooks_", case_sensitive=False)
+
+    queue_enabled: bool = False
+    queue_size: int = 1000
+    workers: int = 4
+    drain_on_shutdown: bool = True
+    drain_timeout: float = 30.0
+
+    outbox_enabled: bool = False
+    outbox_max_attempts: int = 8
+    outbox_base_delay: float = 1.0
+    outbox_max_delay: float = 3600.0
+    outbox_interval: float = 1.0
+    outbox_lease_timeout: float = 300.0
+
+
+class ClusterConfig(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="dbot_cluster_", case_sensitive=False)
+
+    enabled: bool = False
+    # unique replica name, hostname and process id when empty
+    node_id: str = ""
+    heartbeat_interval: float = 5.0
+    node_ttl: float = 15.0
+    virtual_nodes: int = 64
+
+
 config_instance = Configuration()
 redis_config_instance = RedisConfig()
+discord_config_instance = DiscordConfig()
+processing_config_instance = ProcessingConfig()
+state_config_instance = StateConfig()
+webhooks_config_instance = WebhooksConfig()
+cluster_config_instance = ClusterConfig()
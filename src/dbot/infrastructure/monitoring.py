@@ -1,6 +1,6 @@
 import aiohttp
 import structlog
-from aioprometheus.collectors import REGISTRY, Counter, Summary
+from aioprometheus.collectors import REGISTRY, Counter, Gauge, Summary
 from aioprometheus.service import Service
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -35,10 +35,57 @@ class PrometheusMonitoring:
         self._service = Service()
         self._channel_processing_summary = Summary("channel_processing", "One channel processing time")
         self._channels_processing_summary = Summary("channels_processing", "All channels processing time")
+        self._changed_channels_processing_summary = Summary(
+            "changed_channels_processing", "Channels changed by voice state events processing time"
+        )
+        self._tick_lag_summary = Summary("tick_lag", "Delay between scheduled and actual processing tick start")
+        self._tick_overruns_counter = Counter("tick_overruns", "Processing ticks which took longer than the interval")
+        self._ticks_skipped_counter = Counter("ticks_skipped", "Processing ticks skipped because of overruns")
+        self._owned_channels = Gauge("owned_channels", "Channels processed by the replica")
+        self._snapshot_handoff_summary = Summary(
+            "snapshot_handoff", "Time from taking members snapshot on gateway thread to its processing"
+        )
+        self._shard_latency = Gauge("shard_latency", "Gateway heartbeat latency of a shard")
+        self._shard_up = Gauge("shard_up", "Whether gateway connection of a shard is open")
+        self._polling_intervals = Gauge("polling_intervals", "Channels count by current adaptive polling interval")
+        self._polling_intervals_seen: set[float] = set()
         self._notifications_counter = Counter("notifications", "Notifications count")
+        self._notifications_suppressed_counter = Counter(
+            "notifications_suppressed", "Notifications cancelled by an opposite notification inside debounce window"
+        )
         self._notifications_processing_summary = Summary("notifications_processing", "Notifications processing time")
-        self._webhooks_count = Counter("webhooks", "Webhooks count")
-        self._redis_events_count = Counter("redis_events", "Webhooks count")
+        self._connector_processing_summary = Summary("connector_processing", "Notifications sending time by connector")
+        self._webhooks_count = Counter("webhooks", "Webhooks delivered")
+        self._webhooks_batch_size_summary = Summary("webhooks_batch_size", "Notifications in one batch webhook")
+        self._webhooks_dropped_count = Counter("webhooks_dropped", "Webhooks dropped because the queue was full")
+        self._webhooks_queue_depth = Gauge("webhooks_queue_depth", "Webhooks waiting in the delivery queue")
+        self._webhooks_queue_wait_summary = Summary("webhooks_queue_wait", "Webhook wait time in the delivery queue")
+        self._webhooks_workers_utilization = Gauge(
+            "webhooks_workers_utilization", "Share of webhook delivery workers busy with a call"
+        )
+        self._webhooks_outbox_retries = Counter("webhooks_outbox_retries", "Failed webhooks scheduled for a retry")
+        self._webhooks_outbox_dead_letters = Counter(
+            "webhooks_outbox_dead_letters", "Webhooks moved to the dead-letter list after the last attempt"
+        )
+        self._webhooks_outbox_size = Gauge("webhooks_outbox_size", "Webhooks in the outbox")
+        self._webhooks_circuit_state = Gauge(
+            "webhooks_circuit_state", "Webhook host circuit state: 0 closed, 1 half-open, 2 open"
+        )
+        self._webhooks_connections_created = Counter("webhooks_connections_created", "Webhook connections opened")
+        self._webhooks_connections_reused = Counter(
+            "webhooks_connections_reused", "Webhook requests sent over a kept-alive connection"
+        )
+        self._webhooks_connections_active = Gauge("webhooks_connections_active", "Webhook connections in use")
+        self._webhooks_connections_waiting = Gauge(
+            "webhooks_connections_waiting", "Webhook requests waiting for a free connection"
+        )
+        self._redis_events_count = Counter("redis_events", "Redis events count")
+        self._redis_stream_events_count = Counter("redis_stream_events", "Redis stream events count")
+        self._state_cache_hits = Counter("state_cache_hits", "Channel states read from the in-process cache")
+        self._state_cache_misses = Counter("state_cache_misses", "Channel states missing in the in-process cache")
+        self._state_cache_skipped_writes = Counter(
+            "state_cache_skipped_writes", "Unchanged channel states not written to Redis"
+        )
 
     async def start(self) -> None:
         if self._enabled:
@@ -57,17 +104,105 @@ class PrometheusMonitoring:
     def fire_channels_processing(self, time: float) -> None:
         self._channels_processing_summary.observe({}, time)
 
+    def fire_changed_channels_processing(self, time: float) -> None:
+        self._changed_channels_processing_summary.observe({}, time)
+
+    def fire_tick_lag(self, lag: float) -> None:
+        self._tick_lag_summary.observe({}, lag)
+
+    def fire_tick_overrun(self, skipped: int) -> None:
+        self._tick_overruns_counter.add({}, 1)
+        self._ticks_skipped_counter.add({}, skipped)
+
+    def fire_owned_channels(self, node_id: str, count: int) -> None:
+        self._owned_channels.set({"node": node_id}, count)
+
+    def fire_snapshot_handoff(self, time: float) -> None:
+        self._snapshot_handoff_summary.observe({}, time)
+
+    def fire_shard_latency(self, shard_id: int, latency: float) -> None:
+        self._shard_latency.set({"shard": str(shard_id)}, latency)
+
+    def fire_shard_up(self, shard_id: int, up: bool) -> None:
+        self._shard_up.set({"shard": str(shard_id)}, int(up))
+
+    def fire_polling_intervals(self, intervals: dict[float, int]) -> None:
+        # intervals nobody is polled at anymore are reset, otherwise the gauge keeps reporting stale counts
+        for interval in self._polling_intervals_seen - intervals.keys():
+            self._polling_intervals.set({"interval": str(interval)}, 0)
+        for interval, count in intervals.items():
+            self._polling_intervals.set({"interval": str(interval)}, count)
+        self._polling_intervals_seen |= intervals.keys()
+
     def fire_notifications_processing(self, channel_id: int, time: float) -> None:
         self._notifications_processing_summary.observe({"channel": str(channel_id)}, time)
 
     def fire_notifications_count(self, channel_id: int, count: int) -> None:
         self._notifications_counter.add({"channel": str(channel_id)}, count)
 
+    def fire_notifications_suppressed_count(self, channel_id: int, count: int) -> None:
+        self._notifications_suppressed_counter.add({"channel": str(channel_id)}, count)
+
+    def fire_connector_processing(self, connector: str, time: float) -> None:
+        self._connector_processing_summary.observe({"connector": connector}, time)
+
     def fire_webhooks_count(self) -> None:
         self._webhooks_count.add({}, 1)
 
-    def fire_redis_events_count(self) -> None:
-        self._redis_events_count.add({}, 1)
+    def fire_webhooks_batch(self, size: int) -> None:
+        self._webhooks_batch_size_summary.observe({}, size)
+
+    def fire_webhooks_dropped_count(self) -> None:
+        self._webhooks_dropped_count.add({}, 1)
+
+    def fire_webhooks_queue_depth(self, depth: int) -> None:
+        self._webhooks_queue_depth.set({}, depth)
+
+    def fire_webhooks_queue_wait(self, time: float) -> None:
+        self._webhooks_queue_wait_summary.observe({}, time)
+
+    def fire_webhooks_workers_utilization(self, utilization: float) -> None:
+        self._webhooks_workers_utilization.set({}, utilization)
+
+    def fire_webhooks_outbox_retries_count(self) -> None:
+        self._webhooks_outbox_retries.add({}, 1)
+
+    def fire_webhooks_outbox_dead_letters_count(self) -> None:
+        self._webhooks_outbox_dead_letters.add({}, 1)
+
+    def fire_webhooks_outbox_size(self, scheduled: int, dead: int) -> None:
+        self._webhooks_outbox_size.set({"list": "scheduled"}, scheduled)
+        self._webhooks_outbox_size.set({"list": "dead"}, dead)
+
+    def fire_webhooks_circuit_state(self, host: str, state: int) -> None:
+        self._webhooks_circuit_state.set({"host": host}, state)
+
+    def fire_webhooks_connections_created_count(self) -> None:
+        self._webhooks_connections_created.add({}, 1)
+
+    def fire_webhooks_connections_reused_count(self) -> None:
+        self._webhooks_connections_reused.add({}, 1)
+
+    def fire_webhooks_connections_active(self, count: int) -> None:
+        self._webhooks_connections_active.set({}, count)
+
+    def fire_webhooks_connections_waiting(self, count: int) -> None:
+        self._webhooks_connections_waiting.set({}, count)
+
+    def fire_redis_events_count(self, count: int) -> None:
+        self._redis_events_count.add({}, count)
+
+    def fire_redis_stream_events_count(self, count: int) -> None:
+        self._redis_stream_events_count.add({}, count)
+
+    def fire_state_cache_hits(self, count: int) -> None:
+        self._state_cache_hits.add({}, count)
+
+    def fire_state_cache_misses(self, count: int) -> None:
+        self._state_cache_misses.add({}, count)
+
+    def fire_state_cache_skipped_writes(self, count: int) -> None:
+        self._state_cache_skipped_writes.add({}, count)
 
 
 class Monitoring:
@@ -90,17 +225,98 @@ class Monitoring:
     async def fire_channels_processing(self, time: float) -> None:
         self._prometheus.fire_channels_processing(time)
 
+    async def fire_changed_channels_processing(self, time: float) -> None:
+        self._prometheus.fire_changed_channels_processing(time)
+
+    async def fire_tick_lag(self, lag: float) -> None:
+        self._prometheus.fire_tick_lag(lag)
+
+    async def fire_tick_overrun(self, skipped: int) -> None:
+        self._prometheus.fire_tick_overrun(skipped)
+
+    async def fire_owned_channels(self, node_id: str, count: int) -> None:
+        self._prometheus.fire_owned_channels(node_id, count)
+
+    async def fire_snapshot_handoff(self, time: float) -> None:
+        self._prometheus.fire_snapshot_handoff(time)
+
+    async def fire_shard_latency(self, shard_id: int, latency: float) -> None:
+        self._prometheus.fire_shard_latency(shard_id, latency)
+
+    async def fire_shard_up(self, shard_id: int, up: bool) -> None:
+        self._prometheus.fire_shard_up(shard_id, up)
+
+    async def fire_polling_intervals(self, intervals: dict[float, int]) -> None:
+        self._prometheus.fire_polling_intervals(intervals)
+
     async def fire_notifications_processing(self, channel_id: int, time: float) -> None:
         self._prometheus.fire_notifications_processing(channel_id, time)
 
     async def fire_notifications_count(self, channel_id: int, count: int) -> None:
         self._prometheus.fire_notifications_count(channel_id, count)
 
+    async def fire_notifications_suppressed_count(self, channel_id: int, count: int) -> None:
+        self._prometheus.fire_notifications_suppressed_count(channel_id, count)
+
+    async def fire_connector_processing(self, connector: str, time: float) -> None:
+        self._prometheus.fire_connector_processing(connector, time)
+
     async def fire_webhooks_count(self) -> None:
         self._prometheus.fire_webhooks_count()
 
-    async def fire_redis_events_count(self) -> None:
-        self._prometheus.fire_redis_events_count()
+    async def fire_webhooks_batch(self, size: int) -> None:
+        self._prometheus.fire_webhooks_batch(size)
+
+    async def fire_webhooks_dropped_count(self) -> None:
+        self._prometheus.fire_webhooks_dropped_count()
+
+    async def fire_webhooks_queue_depth(self, depth: int) -> None:
+        self._prometheus.fire_webhooks_queue_depth(depth)
+
+    async def fire_webhooks_queue_wait(self, time: float) -> None:
+        self._prometheus.fire_webhooks_queue_wait(time)
+
+    async def fire_webhooks_workers_utilization(self, utilization: float) -> None:
+        self._prometheus.fire_webhooks_workers_utilization(utilization)
+
+    async def fire_webhooks_outbox_retries_count(self) -> None:
+        self._prometheus.fire_webhooks_outbox_retries_count()
+
+    async def fire_webhooks_outbox_dead_letters_count(self) -> None:
+        self._prometheus.fire_webhooks_outbox_dead_letters_count()
+
+    async def fire_webhooks_outbox_size(self, scheduled: int, dead: int) -> None:
+        self._prometheus.fire_webhooks_outbox_size(scheduled, dead)
+
+    async def fire_webhooks_circuit_state(self, host: str, state: int) -> None:
+        self._prometheus.fire_webhooks_circuit_state(host, state)
+
+    async def fire_webhooks_connections_created_count(self) -> None:
+        self._prometheus.fire_webhooks_connections_created_count()
+
+    async def fire_webhooks_connections_reused_count(self) -> None:
+        self._prometheus.fire_webhooks_connections_reused_count()
+
+    async def fire_webhooks_connections_active(self, count: int) -> None:
+        self._prometheus.fire_webhooks_connections_active(count)
+
+    async def fire_webhooks_connections_waiting(self, count: int) -> None:
+        self._prometheus.fire_webhooks_connections_waiting(count)
+
+    async def fire_redis_events_count(self, count: int) -> None:
+        self._prometheus.fire_redis_events_count(count)
+
+    async def fire_redis_stream_events_count(self, count: int) -> None:
+        self._prometheus.fire_redis_stream_events_count(count)
+
+    async def fire_state_cache_hits(self, count: int) -> None:
+        self._prometheus.fire_state_cache_hits(count)
+
+    async def fire_state_cache_misses(self, count: int) -> None:
+        self._prometheus.fire_state_cache_misses(count)
+
+    async def fire_state_cache_skipped_writes(self, count: int) -> None:
+        self._prometheus.fire_state_cache_skipped_writes(count)
 
 
 def initialize_monitoring() -> Monitoring:
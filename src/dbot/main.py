@@ -1,21 +1,59 @@
 import asyncio
+import os
+import socket
 
 import aiohttp
+import redis
 import sentry_sdk
 import structlog
 
+from dbot.cluster import ClusterMembership
 from dbot.config_loader.loader import JSONLoader
+from dbot.connectors.debounce import DebouncingNotificationRouter
 from dbot.connectors.router import NotificationRouter, NotificationRouterInstrumentation
+from dbot.connectors.routing import RoutingTable
 from dbot.connectors.rqueue.connector import RedisConnector
-from dbot.connectors.webhooks.transport import WebhooksTransport, initialize_session
+from dbot.connectors.rqueue.streams import RedisStreamConnector
+from dbot.connectors.webhooks.batch import BatchWebhooksConnector
+from dbot.connectors.webhooks.breaker import CircuitBreaker
+from dbot.connectors.webhooks.outbox import (
+    OutboxScheduler,
+    OutboxWebhooksTransport,
+    WebhooksOutbox,
+)
+from dbot.connectors.webhooks.queue import WebhooksDeliveryQueue
+from dbot.connectors.webhooks.transport import (
+    IWebhooksTransport,
+    TransportConfiguration,
+    WebhooksTransport,
+    initialize_session,
+)
 from dbot.connectors.webhooks.webhooks import WebhooksConnector
-from dbot.dscrd.client import DiscordClient
-from dbot.infrastructure.config import config_instance, redis_config_instance
+from dbot.dscrd.client import DiscordClient, ShardedDiscordClient
+from dbot.dscrd.snapshots import SnapshotHandoff, SnapshotProcessor
+from dbot.infrastructure.config import (
+    OverrunPolicyEnum,
+    StateFormatEnum,
+    StateStorageEnum,
+    cluster_config_instance,
+    config_instance,
+    discord_config_instance,
+    processing_config_instance,
+    redis_config_instance,
+    state_config_instance,
+    webhooks_config_instance,
+)
 from dbot.infrastructure.logs import initialize_logs
-from dbot.infrastructure.monitoring import initialize_monitoring
+from dbot.infrastructure.monitoring import Monitoring, initialize_monitoring
 from dbot.model.config import TargetTypeEnum
-from dbot.repository import Repository, open_redis
+from dbot.repository import ChannelStateCache, Repository, open_redis
+from dbot.schedule import AdaptivePollingSchedule, ChannelStagger, FixedRateScheduler
 from dbot.services import ActivityProcessingService
+from dbot.storage.abstract import IChannelStateStorage
+from dbot.storage.blob import BlobChannelStateStorage
+from dbot.storage.codecs import CompactChannelStateCodec, JSONChannelStateCodec
+from dbot.storage.hashes import HashChannelStateStorage
+from dbot.storage.lua import LuaChannelStateStorage
 
 logger = structlog.getLogger()
 
@@ -24,6 +62,12 @@ class DBot:
     def __init__(self) -> None:
         self.client: DiscordClient | None = None
         self.session: aiohttp.ClientSession | None = None
+        self.webhooks_queue: WebhooksDeliveryQueue | None = None
+        self.router: DebouncingNotificationRouter | None = None
+        self.outbox_scheduler: OutboxScheduler | None = None
+        self.batch_webhooks_connector: BatchWebhooksConnector | None = None
+        self.membership: ClusterMembership | None = None
+        self.snapshot_processor: SnapshotProcessor | None = None
 
     async def initialize(self) -> None:
         initialize_logs()
@@ -35,29 +79,159 @@ class DBot:
         await monitoring.start()
 
         redis_client = await open_redis(redis_config_instance.url)
-        repository = Repository(redis_client=redis_client)
+        repository = self._init_repository(redis_client, monitoring)
 
         loader = JSONLoader()
         monitor_config = loader.from_file(config_instance.monitor_config_path)
 
-        self.session = await initialize_session()
-        transport = WebhooksTransport(self.session)
-        webhooks_connector = WebhooksConnector(transport, monitor_config, monitoring)
-        redis_connector = RedisConnector(redis_client, monitor_config, monitoring)
+        transport_config = TransportConfiguration()
+        self.session = await initialize_session(transport_config, monitoring)
+        breaker = None
+        if transport_config.breaker_enabled:
+            breaker = CircuitBreaker(
+                monitoring,
+                failure_threshold=transport_config.breaker_failure_threshold,
+                recovery_timeout=transport_config.breaker_recovery_timeout,
+            )
+        webhooks_transport = WebhooksTransport(self.session, breaker=breaker, monitoring=monitoring)
+        transport: IWebhooksTransport = webhooks_transport
+        if webhooks_config_instance.outbox_enabled:
+            outbox = WebhooksOutbox(
+                redis_client,
+                max_attempts=webhooks_config_instance.outbox_max_attempts,
+                base_delay=webhooks_config_instance.outbox_base_delay,
+                max_delay=webhooks_config_instance.outbox_max_delay,
+                lease_timeout=webhooks_config_instance.outbox_lease_timeout,
+            )
+            self.outbox_scheduler = OutboxScheduler(
+                outbox, webhooks_transport, monitoring, interval=webhooks_config_instance.outbox_interval
+            )
+            self.outbox_scheduler.start()
+            # failed deliveries are retried by the scheduler instead of inline
+            transport = OutboxWebhooksTransport(webhooks_transport, outbox, monitoring)
+        if webhooks_config_instance.queue_enabled:
+            self.webhooks_queue = WebhooksDeliveryQueue(
+                transport,
+                monitoring,
+                size=webhooks_config_instance.queue_size,
+                workers=webhooks_config_instance.workers,
+            )
+            self.webhooks_queue.start()
+            transport = self.webhooks_queue
+        routing_table = RoutingTable.compile(monitor_config)
+        webhooks_connector = WebhooksConnector(transport, monitor_config, monitoring, routing_table=routing_table)
+        self.batch_webhooks_connector = BatchWebhooksConnector(
+            webhooks_transport, monitor_config, monitoring, routing_table=routing_table
+        )
+        redis_connector = RedisConnector(redis_client, monitor_config, monitoring, routing_table=routing_table)
+        redis_stream_connector = RedisStreamConnector(
+            redis_client, monitor_config, monitoring, routing_table=routing_table
+        )
+
+        instrumented_router = NotificationRouterInstrumentation(
+            NotificationRouter(monitor_config, routing_table=routing_table), monitoring
+        )
+        instrumented_router.register_connector(TargetTypeEnum.WEBHOOKS, webhooks_connector)
+        instrumented_router.register_connector(TargetTypeEnum.WEBHOOKS_BATCH, self.batch_webhooks_connector)
+        instrumented_router.register_connector(TargetTypeEnum.REDIS, redis_connector)
+        instrumented_router.register_connector(TargetTypeEnum.REDIS_STREAM, redis_stream_connector)
+
+        # debouncing wraps the instrumented router, so sent notifications metrics do not count cancelled flaps
+        self.router = DebouncingNotificationRouter(instrumented_router, monitor_config, monitoring)
+
+        if cluster_config_instance.enabled:
+            self.membership = ClusterMembership(
+                redis_client,
+                cluster_config_instance.node_id or f"{socket.gethostname()}-{os.getpid()}",
+                monitor_config.channels_ids,
+                monitoring,
+                heartbeat_interval=cluster_config_instance.heartbeat_interval,
+                node_ttl=cluster_config_instance.node_ttl,
+                virtual_nodes=cluster_config_instance.virtual_nodes,
+            )
+            # cached states of channels taken over from another replica may be stale
+            self.membership.on_gained(repository.invalidate_cache)
+            await self.membership.heartbeat()
+            self.membership.start()
+
+        # in event-driven mode polling only reconciles state in case some gateway events were missed
+        check_interval = processing_config_instance.check_interval
+        if processing_config_instance.event_driven:
+            check_interval = processing_config_instance.reconciliation_interval
 
-        router = NotificationRouter(monitor_config)
-        router.register_connector(TargetTypeEnum.WEBHOOKS, webhooks_connector)
-        router.register_connector(TargetTypeEnum.REDIS, redis_connector)
+        schedule = None
+        if processing_config_instance.adaptive:
+            schedule = AdaptivePollingSchedule(
+                min_interval=check_interval,
+                max_interval=processing_config_instance.max_interval,
+                backoff_factor=processing_config_instance.backoff_factor,
+            )
 
-        instrumented_router = NotificationRouterInstrumentation(router, monitoring)
+        stagger = None
+        tick_interval: float = check_interval
+        if processing_config_instance.stagger_slots > 1:
+            stagger = ChannelStagger(interval=check_interval, slots=processing_config_instance.stagger_slots)
+            tick_interval = stagger.tick_interval
 
         processing_service = ActivityProcessingService(
             repository=repository,
-            router=instrumented_router,
+            router=self.router,
             channels=monitor_config.channels_ids,
             monitoring=monitoring,
+            concurrency=processing_config_instance.concurrency,
+            membership=self.membership,
+            schedule=schedule,
+            stagger=stagger,
         )
-        self.client = DiscordClient(processing_service, check_interval=10)
+
+        scheduler = FixedRateScheduler(
+            interval=tick_interval,
+            monitoring=monitoring,
+            coalesce=processing_config_instance.overrun_policy == OverrunPolicyEnum.COALESCE,
+        )
+
+        # the client is run on its own thread and loop, processing gets members snapshots on this loop
+        handoff = None
+        if discord_config_instance.separate_loop:
+            handoff = SnapshotHandoff(asyncio.get_running_loop())
+            self.snapshot_processor = SnapshotProcessor(handoff, processing_service, monitoring)
+
+        if discord_config_instance.sharded:
+            self.client = ShardedDiscordClient(
+                processing_service,
+                scheduler=scheduler,
+                monitoring=monitoring,
+                event_driven=processing_config_instance.event_driven,
+                lean=discord_config_instance.lean,
+                handoff=handoff,
+                shard_count=discord_config_instance.shard_count,
+                shard_ids=discord_config_instance.shard_ids,
+            )
+        else:
+            self.client = DiscordClient(
+                processing_service,
+                scheduler=scheduler,
+                event_driven=processing_config_instance.event_driven,
+                lean=discord_config_instance.lean,
+                handoff=handoff,
+            )
+
+    @staticmethod
+    def _init_repository(redis_client: redis.asyncio.Redis, monitoring: Monitoring) -> Repository:
+        if state_config_instance.storage == StateStorageEnum.LUA:
+            return Repository(redis_client=redis_client, atomic_storage=LuaChannelStateStorage(redis_client))
+
+        cache = ChannelStateCache(monitoring) if state_config_instance.cache_enabled else None
+
+        storage: IChannelStateStorage = BlobChannelStateStorage(redis_client, JSONChannelStateCodec())
+        if state_config_instance.storage == StateStorageEnum.HASH:
+            storage = HashChannelStateStorage(redis_client)
+        elif state_config_instance.format == StateFormatEnum.V3:
+            storage = BlobChannelStateStorage(
+                redis_client, CompactChannelStateCodec(), legacy_codecs=[JSONChannelStateCodec()]
+            )
+
+        return Repository(redis_client=redis_client, cache=cache, storage=storage)
 
     async def run_async(self) -> None:
         await self.initialize()
@@ -65,7 +239,51 @@ class DBot:
         if self.client is None:
             raise RuntimeError("Client is not initialized")
 
-        await self.client.run_async(config_instance.discord_token)
+        try:
+            if self.snapshot_processor is not None:
+                self.snapshot_processor.start()
+                await self._run_client_thread(self.client)
+            else:
+                await self.client.run_async(config_instance.discord_token)
+        finally:
+            await self.shutdown()
+
+    @staticmethod
+    async def _run_client_thread(client: DiscordClient) -> None:
+        try:
+            await asyncio.to_thread(asyncio.run, client.run_async(config_instance.discord_token))
+        except asyncio.CancelledError:
+            # the thread keeps running after cancellation, the client is closed on its own loop to stop it
+            # loop is set only when the client has started
+            if isinstance(client.loop, asyncio.AbstractEventLoop) and not client.is_closed():
+                future = asyncio.run_coroutine_threadsafe(client.close(), client.loop)
+                await asyncio.wrap_future(future)
+            raise
+
+    async def shutdown(self) -> None:
+        if self.snapshot_processor is not None:
+            await self.snapshot_processor.stop()
+
+        if self.membership is not None:
+            await self.membership.stop()
+
+        if self.router is not None:
+            await self.router.flush()
+
+        if self.batch_webhooks_connector is not None:
+            await self.batch_webhooks_connector.flush()
+
+        if self.webhooks_queue is not None:
+            await self.webhooks_queue.stop(
+                drain=webhooks_config_instance.drain_on_shutdown,
+                timeout=webhooks_config_instance.drain_timeout,
+            )
+
+        if self.outbox_scheduler is not None:
+            await self.outbox_scheduler.stop()
+
+        if self.session is not None:
+            await self.session.close()
 
     def run(self) -> None:
         try:
@@ -15,6 +15,22 @@ from dbot.model.user import User
 logger = structlog.get_logger(__name__)
 
 
+@dataclass
+class UsersDiff:
+    joined: list[User]
+    left: list[User]
+
+    @classmethod
+    def between(cls, old_users: list[User], new_users: list[User]) -> "UsersDiff":
+        old_ids = {user.id for user in old_users}
+        new_ids = {user.id for user in new_users}
+
+        return cls(
+            joined=[user for user in new_users if user.id not in old_ids],
+            left=[user for user in old_users if user.id not in new_ids],
+        )
+
+
 @dataclass
 class Channel:
     id: int
@@ -32,19 +48,19 @@ class Channel:
         if self.previous_state is None:
             return []
 
-        old_users = {user.id: user for user in self.previous_state.users}
-        new_users = {user.id: user for user in self.users}
+        diff = UsersDiff.between(self.previous_state.users, self.users)
 
-        for user_id, user in new_users.items():
-            old_user = old_users.get(user_id)
-            if not old_user:
-                notifications.append(NewUserInChannelNotification(user=user, channel_id=self.id))
-                logger.info("NewUserInChannelNotification.generated", old_users=old_users, new_users=new_users)
+        for user in diff.joined:
+            notifications.append(NewUserInChannelNotification(user=user, channel_id=self.id))
+            logger.info(
+                "NewUserInChannelNotification.generated", old_users=self.previous_state.users, new_users=self.users
+            )
 
-        for user_id, user in old_users.items():
-            if user_id not in new_users:
-                notifications.append(UserLeftChannelNotification(user=user, channel_id=self.id))
-                logger.info("UserLeftChannelNotification.generated", old_users=old_users, new_users=new_users)
+        for user in diff.left:
+            notifications.append(UserLeftChannelNotification(user=user, channel_id=self.id))
+            logger.info(
+                "UserLeftChannelNotification.generated", old_users=self.previous_state.users, new_users=self.users
+            )
 
         return notifications
 
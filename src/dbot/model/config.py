@@ -1,10 +1,12 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
 
 
 class TargetTypeEnum(Enum):
     WEBHOOKS = "webhooks"
     REDIS = "redis"
+    REDIS_STREAM = "redis_stream"
+    WEBHOOKS_BATCH = "webhooks_batch"
 
 
 @dataclass
@@ -19,6 +21,17 @@ class WebhooksTargetConfig:
         return TargetTypeEnum.WEBHOOKS
 
 
+@dataclass
+class BatchWebhookTargetConfig:
+    url: str
+    max_batch_size: int
+    max_delay: float
+
+    @property
+    def type(self) -> TargetTypeEnum:
+        return TargetTypeEnum.WEBHOOKS_BATCH
+
+
 @dataclass
 class RedisTargetConfig:
     queue: str
@@ -28,11 +41,24 @@ class RedisTargetConfig:
         return TargetTypeEnum.REDIS
 
 
+@dataclass
+class RedisStreamTargetConfig:
+    stream: str
+    maxlen: int
+
+    @property
+    def type(self) -> TargetTypeEnum:
+        return TargetTypeEnum.REDIS_STREAM
+
+
 @dataclass
 class ChannelMonitorConfig:
     channel_id: int
     webhooks: WebhooksTargetConfig | None
     redis_queues: list[RedisTargetConfig] | None
+    redis_streams: list[RedisStreamTargetConfig] = field(default_factory=list)
+    batch_webhooks: list[BatchWebhookTargetConfig] = field(default_factory=list)
+    debounce_seconds: float = 0.0
 
     @property
     def available_target_types(self) -> list[TargetTypeEnum]:
@@ -44,6 +70,12 @@ class ChannelMonitorConfig:
         if self.redis_queues:
             targets.append(TargetTypeEnum.REDIS)
 
+        if self.redis_streams:
+            targets.append(TargetTypeEnum.REDIS_STREAM)
+
+        if self.batch_webhooks:
+            targets.append(TargetTypeEnum.WEBHOOKS_BATCH)
+
         return targets
 
 
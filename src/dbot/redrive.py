@@ -0,0 +1,30 @@
+import argparse
+import asyncio
+
+from dbot.connectors.webhooks.outbox import WebhooksOutbox
+from dbot.infrastructure.config import redis_config_instance
+from dbot.repository import open_redis
+
+
+async def redrive(limit: int | None) -> None:
+    redis_client = await open_redis(redis_config_instance.url)
+    try:
+        outbox = WebhooksOutbox(redis_client)
+        count = await outbox.redrive(limit)
+        scheduled, dead = await outbox.size()
+    finally:
+        await redis_client.aclose()
+
+    print(f"Redriven: {count}, scheduled: {scheduled}, dead: {dead}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Move dead-lettered webhooks back to the outbox for delivery")
+    parser.add_argument("--limit", type=int, default=None, help="maximum number of webhooks to redrive")
+    args = parser.parse_args()
+
+    asyncio.run(redrive(args.limit))
+
+
+if __name__ == "__main__":
+    main()
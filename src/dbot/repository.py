@@ -1,13 +1,17 @@
 import datetime
-from typing import Any
+from typing import Iterable
 
 import redis
 import structlog
-from pydantic import BaseModel
 
 from dbot.dscrd.abstract import IDiscordClient
+from dbot.infrastructure.monitoring import Monitoring
 from dbot.model import User
 from dbot.model.channel import Channel
+from dbot.storage.abstract import IAtomicChannelStateStorage, IChannelStateStorage
+from dbot.storage.blob import BlobChannelStateStorage
+from dbot.storage.codecs import JSONChannelStateCodec
+from dbot.storage.state import ChannelState
 
 logger = structlog.get_logger()
 
@@ -20,50 +24,103 @@ def _get_timestamp() -> int:
     return int(datetime.datetime.now(tz=datetime.timezone.utc).timestamp())
 
 
-class UserState(BaseModel):
-    username: str
-    id: int
+class ChannelStateCache:
+    """
+    Last persisted state of every channel saved by this process.
 
-    def to_model(self) -> User:
-        return User(id=self.id, username=self.username)
+    Entries are authoritative only while this process is the single writer of the channels states,
+    in cluster mode entries of channels taken over from another replica are invalidated.
+    """
 
-    @classmethod
-    def from_model(cls, model: User) -> "UserState":
-        return cls(id=model.id, username=model.username)
+    def __init__(self, monitoring: Monitoring) -> None:
+        self._states: dict[int, ChannelState] = {}
+        self._monitoring = monitoring
 
+    def get(self, channel_id: int) -> ChannelState | None:
+        return self._states.get(channel_id)
 
-class ChannelState(BaseModel):
-    id: int
-    ts: int
-    users: list[UserState]
+    def put(self, state: ChannelState) -> None:
+        self._states[state.id] = state
 
-    def to_model(self) -> Channel:
-        return Channel(id=self.id, users=[s.to_model() for s in self.users])
+    def invalidate(self, channel_ids: Iterable[int]) -> None:
+        for channel_id in channel_ids:
+            self._states.pop(channel_id, None)
 
-    @classmethod
-    def from_model(cls, model: Channel) -> "ChannelState":
-        return cls(
-            id=model.id,
-            ts=_get_timestamp(),
-            users=[UserState.from_model(user) for user in model.users],
-        )
+    async def fire_lookups(self, hits: int, misses: int) -> None:
+        if hits:
+            await self._monitoring.fire_state_cache_hits(hits)
+        if misses:
+            await self._monitoring.fire_state_cache_misses(misses)
+
+    async def fire_skipped_writes(self, count: int) -> None:
+        if count:
+            await self._monitoring.fire_state_cache_skipped_writes(count)
 
 
 class Repository:
-    CHANNEL_KEY_PREFIX = "channel_v2_{channel_id}"
     STATE_LIFETIME = 60 * 60  # 1 hour
-
-    def __init__(self, redis_client: redis.asyncio.Redis, discord_client: IDiscordClient | None = None) -> None:
+    # unchanged state is rewritten with cache enabled only to keep its timestamp far from STATE_LIFETIME
+    STATE_REFRESH_INTERVAL = 15 * 60  # 15 minutes
+
+    def __init__(
+        self,
+        redis_client: redis.asyncio.Redis,
+        discord_client: IDiscordClient | None = None,
+        cache: ChannelStateCache | None = None,
+        storage: IChannelStateStorage | None = None,
+        atomic_storage: IAtomicChannelStateStorage | None = None,
+    ) -> None:
         self.redis_client = redis_client
         self.discord_client = discord_client
+        self.cache = cache
+        self.storage = storage or BlobChannelStateStorage(redis_client, JSONChannelStateCodec())
+        # atomic storage replaces states while loading them and takes precedence over storage
+        self.atomic_storage = atomic_storage
+
+        if cache and atomic_storage:
+            raise ValueError("State cache can not be used with atomic state storage")
+
+    def invalidate_cache(self, channel_ids: Iterable[int]) -> None:
+        """
+        Drops cached states of channels another process may have written, e.g. channels this replica just took over.
+        """
+        if self.cache is not None:
+            self.cache.invalidate(channel_ids)
 
     def set_discord_client(self, discord_client: IDiscordClient) -> None:
         self.discord_client = discord_client
 
     async def save(self, channel: Channel) -> None:
-        state = ChannelState.from_model(channel)
-        key = self._prepare_channel_key(channel.id)
-        await self.redis_client.set(key, state.model_dump_json())
+        if self.atomic_storage:
+            # state was replaced when channel was loaded
+            return
+
+        ts = _get_timestamp()
+        await self.storage.save(channel, ts)
+
+        if self.cache:
+            self.cache.put(ChannelState.from_model(channel, ts=ts))
+
+    async def save_many(self, channels: list[Channel]) -> None:
+        if self.atomic_storage:
+            # states were replaced when channels were loaded
+            return
+
+        ts = _get_timestamp()
+
+        if self.cache:
+            dirty_channels = [channel for channel in channels if self._is_dirty(self.cache, channel, ts)]
+            await self.cache.fire_skipped_writes(len(channels) - len(dirty_channels))
+            channels = dirty_channels
+
+        if not channels:
+            return
+
+        await self.storage.save_many(channels, ts)
+
+        if self.cache:
+            for channel in channels:
+                self.cache.put(ChannelState.from_model(channel, ts=ts))
 
     async def get(self, channel_id: int) -> Channel | None:
         assert self.discord_client
@@ -73,24 +130,108 @@ class Repository:
             logger.debug("get_channel_users.error", channel_id=channel_id)
             return None
 
+        if self.atomic_storage:
+            return (await self._swap_states(self.atomic_storage, {channel_id: users}))[0]
+
         previous_state = await self._load_previous_state(channel_id)
         channel = Channel(id=channel_id, users=users, previous_state=previous_state)
         logger.debug("channel.loaded", channel=channel)
         return channel
 
+    async def get_many(self, channel_ids: Iterable[int]) -> list[Channel]:
+        assert self.discord_client
+
+        channels_users: dict[int, list[User]] = {}
+        for channel_id in channel_ids:
+            users = self.discord_client.get_channel_members(channel_id)
+            if users is None:
+                logger.debug("get_channel_users.error", channel_id=channel_id)
+                continue
+
+            channels_users[channel_id] = users
+
+        if not channels_users:
+            return []
+
+        if self.atomic_storage:
+            return await self._swap_states(self.atomic_storage, channels_users)
+
+        previous_states = await self._load_previous_states(list(channels_users))
+
+        channels = []
+        for channel_id, users in channels_users.items():
+            channel = Channel(id=channel_id, users=users, previous_state=previous_states.get(channel_id))
+            logger.debug("channel.loaded", channel=channel)
+            channels.append(channel)
+
+        return channels
+
+    async def _swap_states(
+        self, storage: IAtomicChannelStateStorage, channels_users: dict[int, list[User]]
+    ) -> list[Channel]:
+        transitions = await storage.swap_many(channels_users, _get_timestamp(), self.STATE_LIFETIME)
+
+        channels = []
+        for channel_id, users in channels_users.items():
+            transition = transitions[channel_id]
+            previous_state = transition.to_previous_state(channel_id, users)
+            if previous_state is None:
+                logger.debug("no_previous_state", channel_id=channel_id)
+
+            channel = Channel(id=channel_id, users=users, previous_state=previous_state)
+            logger.debug("channel.swapped", channel=channel, transition=transition)
+            channels.append(channel)
+
+        return channels
+
     async def _load_previous_state(self, channel_id: int) -> Channel | None:
-        channel_key = self._prepare_channel_key(channel_id)
-        data = await self.redis_client.get(channel_key)
-        if data is None:
-            logger.debug("no_previous_state", channel_id=channel_id)
-            return None
+        if self.cache:
+            cached_state = self.cache.get(channel_id)
+            await self.cache.fire_lookups(hits=int(cached_state is not None), misses=int(cached_state is None))
+            if cached_state is not None:
+                return self._to_previous_state(cached_state)
 
-        state = ChannelState.model_validate_json(data)
+        state = await self.storage.load(channel_id)
+        return self._to_previous_state(state) if state else None
+
+    async def _load_previous_states(self, channel_ids: list[int]) -> dict[int, Channel | None]:
+        previous_states: dict[int, Channel | None] = {}
+
+        not_cached_ids = channel_ids
+        if self.cache:
+            not_cached_ids = []
+            for channel_id in channel_ids:
+                cached_state = self.cache.get(channel_id)
+                if cached_state is None:
+                    not_cached_ids.append(channel_id)
+                else:
+                    previous_states[channel_id] = self._to_previous_state(cached_state)
+
+            await self.cache.fire_lookups(hits=len(previous_states), misses=len(not_cached_ids))
+
+        if not not_cached_ids:
+            return previous_states
+
+        for channel_id, state in (await self.storage.load_many(not_cached_ids)).items():
+            previous_states[channel_id] = self._to_previous_state(state) if state else None
+
+        return previous_states
+
+    def _to_previous_state(self, state: ChannelState) -> Channel | None:
         if _get_timestamp() - state.ts > self.STATE_LIFETIME:
-            logger.debug("previous_state_outdated", channel_id=channel_id)
+            logger.debug("previous_state_outdated", channel_id=state.id)
             return None
 
         return state.to_model()
 
-    def _prepare_channel_key(self, channel_id: Any) -> str:
-        return self.CHANNEL_KEY_PREFIX.format(channel_id=channel_id)
+    def _is_dirty(self, cache: ChannelStateCache, channel: Channel, ts: int) -> bool:
+        cached_state = cache.get(channel.id)
+        if cached_state is None:
+            return True
+
+        if ts - cached_state.ts >= self.STATE_REFRESH_INTERVAL:
+            return True
+
+        return {(user.id, user.username) for user in channel.users} != {
+            (user.id, user.username) for user in cached_state.users
+        }
@@ -0,0 +1,169 @@
+import asyncio
+import hashlib
+import math
+import time
+import typing
+from collections import Counter
+from dataclasses import dataclass
+
+import structlog
+
+from dbot.infrastructure.monitoring import Monitoring
+
+logger = structlog.get_logger()
+
+
+@dataclass
+class ChannelPolling:
+    interval: float
+    next_poll_at: float
+    # members seen on the last poll, None when unknown
+    member_ids: frozenset[int] | None = None
+
+
+class AdaptivePollingSchedule:
+    """
+    Per-channel polling intervals. A channel without changes is polled `backoff_factor` times less often after
+    every poll, up to `max_interval`; any change brings it back to `min_interval`.
+    Channels seen for the first time are due at once, so are channels whose current members differ from the ones
+    seen on the last poll.
+    """
+
+    def __init__(self, min_interval: float, max_interval: float, backoff_factor: float = 2.0) -> None:
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.backoff_factor = backoff_factor
+
+        self._channels: dict[int, ChannelPolling] = {}
+
+    def due(
+        self,
+        channel_ids: typing.Iterable[int],
+        now: float | None = None,
+        member_ids: typing.Callable[[int], frozenset[int] | None] | None = None,
+    ) -> set[int]:
+        now = time.monotonic() if now is None else now
+
+        # ticks never come exactly interval apart, a channel due before the middle of the next tick is polled now
+        now += self.min_interval / 2
+
+        due = set()
+        for channel_id in channel_ids:
+            polling = self._channels.get(channel_id)
+            if polling is None or polling.next_poll_at <= now:
+                due.add(channel_id)
+            elif member_ids is not None and polling.member_ids is not None:
+                # reading members is cheap, only storage and routing are worth skipping for idle channels
+                current = member_ids(channel_id)
+                if current is not None and current != polling.member_ids:
+                    due.add(channel_id)
+        return due
+
+    def record(
+        self,
+        channel_id: int,
+        changed: bool,
+        now: float | None = None,
+        member_ids: frozenset[int] | None = None,
+    ) -> None:
+        now = time.monotonic() if now is None else now
+
+        polling = self._channels.get(channel_id)
+        if polling is None or changed:
+            interval = self.min_interval
+        else:
+            interval = min(polling.interval * self.backoff_factor, self.max_interval)
+
+        self._channels[channel_id] = ChannelPolling(
+            interval=interval, next_poll_at=now + interval, member_ids=member_ids
+        )
+
+    def retain(self, channel_ids: set[int]) -> None:
+        """
+        Forgets channels which are not processed anymore, e.g. moved to another replica
+        """
+        for channel_id in self._channels.keys() - channel_ids:
+            del self._channels[channel_id]
+
+    def intervals(self) -> dict[float, int]:
+        return dict(Counter(polling.interval for polling in self._channels.values()))
+
+
+class ChannelStagger:
+    """
+    Spreads channels processing over the interval. Every channel gets a stable slot by its id hash and is processed
+    on ticks of its slot only, ticks come `slots` times per interval, so every channel is still processed once per
+    interval while a tick processes roughly 1/slots of channels. Several ticks select the union of their slots, so
+    channels of ticks skipped on overrun are not left out.
+    """
+
+    def __init__(self, interval: float, slots: int) -> None:
+        self.slots = slots
+        self.tick_interval = interval / slots
+
+    def slot(self, channel_id: int) -> int:
+        digest = hashlib.blake2b(str(channel_id).encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "big") % self.slots
+
+    def select(self, channel_ids: set[int], *ticks: float) -> set[int]:
+        slots = {round(tick / self.tick_interval) % self.slots for tick in ticks}
+        return {channel_id for channel_id in channel_ids if self.slot(channel_id) in slots}
+
+
+class FixedRateScheduler:
+    """
+    Runs a job on wall-clock aligned ticks, e.g. at :00, :10, :20 for 10 seconds interval, so the period does not
+    depend on the job duration. When the job overruns, missed ticks are either skipped until the next boundary
+    or coalesced into one run started right away. Either way the job gets the missed tick times along with the
+    tick it runs for.
+    """
+
+    def __init__(self, interval: float, monitoring: Monitoring, coalesce: bool = False) -> None:
+        self.interval = interval
+        self.coalesce = coalesce
+        self._monitoring = monitoring
+
+    def next_tick(self, now: float) -> float:
+        return math.ceil(now / self.interval) * self.interval
+
+    async def run(
+        self,
+        job: typing.Callable[[float, list[float]], typing.Awaitable[None]],
+        until: typing.Callable[[], bool],
+    ) -> None:
+        tick = self.next_tick(time.time())
+        skipped: list[float] = []
+        while not until():
+            await self._sleep_until(tick)
+
+            lag = time.time() - tick
+            await self._monitoring.fire_tick_lag(lag)
+
+            await job(tick, skipped)
+
+            tick, skipped = await self._schedule_next(tick)
+
+    async def _schedule_next(self, tick: float) -> tuple[float, list[float]]:
+        now = time.time()
+        next_tick = tick + self.interval
+        if now <= next_tick:
+            return next_tick, []
+
+        missed = math.floor((now - tick) / self.interval)
+        if self.coalesce:
+            # all missed ticks are replaced by one run started right away
+            next_tick = tick + missed * self.interval
+            skipped = missed - 1
+        else:
+            next_tick = tick + (missed + 1) * self.interval
+            skipped = missed
+
+        logger.warning("scheduler.overrun", duration=now - tick, interval=self.interval, skipped=skipped)
+        await self._monitoring.fire_tick_overrun(skipped)
+        return next_tick, [tick + i * self.interval for i in range(1, skipped + 1)]
+
+    @staticmethod
+    async def _sleep_until(moment: float) -> None:
+        # event loop sleeps on monotonic clock, so wake up is checked against wall clock once again
+        while (delay := moment - time.time()) > 0:
+            await asyncio.sleep(delay)
@@ -1,13 +1,19 @@
+import asyncio
+import collections
 import contextlib
 import time
 import typing
 
 import structlog
 
+from dbot.cluster import ClusterMembership
 from dbot.connectors.router import INotificationRouter
 from dbot.dscrd.abstract import IDiscordClient
 from dbot.infrastructure.monitoring import Monitoring
+from dbot.model.channel import Channel
+from dbot.model.notifications import Notification
 from dbot.repository import Repository
+from dbot.schedule import AdaptivePollingSchedule, ChannelStagger
 
 logger = structlog.getLogger()
 
@@ -40,6 +46,17 @@ class ActivityProcessingServiceInstrumentation:
         await self._monitoring.on_job_executed_successfully()
         await self._monitoring.fire_channels_processing(processing_time)
 
+    @contextlib.asynccontextmanager
+    async def changed_channels_processing(self, channels: set[int]) -> typing.AsyncIterator[None]:
+        start = time.monotonic()
+        logger.debug("changed_channels_processing.started", ids=channels)
+
+        yield
+
+        processing_time = time.monotonic() - start
+        logger.debug("changed_channels_processing.finished", ids=channels, processing_time=processing_time)
+        await self._monitoring.fire_changed_channels_processing(processing_time)
+
 
 class ActivityProcessingService:
     def __init__(
@@ -48,29 +65,146 @@ class ActivityProcessingService:
         router: INotificationRouter,
         channels: set[int],
         monitoring: Monitoring,
+        concurrency: int = 1,
+        membership: ClusterMembership | None = None,
+        schedule: AdaptivePollingSchedule | None = None,
+        stagger: ChannelStagger | None = None,
     ) -> None:
         self.repository = repository
         self.router = router
         self.channels = channels
+        self.concurrency = concurrency
+        # in cluster mode only channels owned by this replica are processed
+        self.membership = membership
+        # with adaptive polling a tick processes only channels that are due
+        self.schedule = schedule
+        # with staggering a tick processes only channels of the tick slot
+        self.stagger = stagger
+        self.monitoring = monitoring
         self.instrumentation = ActivityProcessingServiceInstrumentation(monitoring)
 
+        # polling ticks and voice state events may overlap, state for a channel must be processed once at a time
+        self._locks: collections.defaultdict[int, asyncio.Lock] = collections.defaultdict(asyncio.Lock)
+
+        self.discord_client: IDiscordClient | None = None
+
     def register_client(self, discord_client: IDiscordClient) -> None:
+        self.discord_client = discord_client
         self.repository.set_discord_client(discord_client)
 
-    async def process(self) -> None:
-        async with self.instrumentation.channels_processing(self.channels):
-            for channel_id in self.channels:
-                await self._process_chanel(channel_id)
-
-    async def _process_chanel(self, channel_id: int) -> None:
-        async with self.instrumentation.channel_processing(channel_id):
-            channel = await self.repository.get(channel_id)
-            if channel is None:
-                return
+    def is_monitored(self, channel_id: int) -> bool:
+        if self.membership is not None:
+            return self.membership.owns(channel_id)
+        return channel_id in self.channels
+
+    def owned_channels(self) -> set[int]:
+        channels = self.channels
+        if self.membership is not None:
+            channels = self.membership.owned()
+
+        # with sharding channels of guilds on shards of other processes are skipped
+        if self.discord_client is not None:
+            channels = self.discord_client.local_channels(channels)
+        return channels
+
+    def _member_ids(self, channel_id: int) -> frozenset[int] | None:
+        if self.discord_client is None:
+            return None
+
+        users = self.discord_client.get_channel_members(channel_id)
+        return None if users is None else frozenset(user.id for user in users)
+
+    async def process(self, tick: float | None = None, skipped: typing.Sequence[float] = ()) -> None:
+        started_at = time.monotonic()
+        channels = self.owned_channels()
+        if self.schedule is not None:
+            self.schedule.retain(channels)
+        if self.stagger is not None:
+            # channels of ticks skipped on overrun are processed along with the current tick slot
+            channels = self.stagger.select(channels, time.time() if tick is None else tick, *skipped)
+        if self.schedule is not None:
+            channels = self.schedule.due(channels, started_at, self._member_ids)
+
+        async with self.instrumentation.channels_processing(channels):
+            await self._process_channels(channels, started_at)
+
+        if self.schedule is not None:
+            await self.monitoring.fire_polling_intervals(self.schedule.intervals())
+
+    async def process_changed(self, channels: set[int]) -> None:
+        channels = {channel_id for channel_id in channels if self.is_monitored(channel_id)}
+        if not channels:
+            return
+
+        async with self.instrumentation.changed_channels_processing(channels):
+            # a gateway event means activity, such channels are polled at the fast interval again
+            await self._process_channels(channels, time.monotonic(), activity=True)
+
+    async def _process_channels(self, channel_ids: set[int], started_at: float, activity: bool = False) -> None:
+        if not channel_ids:
+            return
+
+        # locks are taken in the same order by every caller, so overlapping batches can not deadlock
+        held = set()
+        try:
+            for channel_id in sorted(channel_ids):
+                await self._locks[channel_id].acquire()
+                held.add(channel_id)
+
+            await self._process_locked_channels(channel_ids, held, started_at, activity)
+        finally:
+            for channel_id in held:
+                self._locks[channel_id].release()
+
+    async def _process_locked_channels(
+        self, channel_ids: set[int], held: set[int], started_at: float, activity: bool
+    ) -> None:
+        channels = await self.repository.get_many(channel_ids)
+        notifications = {channel.id: channel.generate_notifications() for channel in channels}
+
+        # channels without notifications are saved in one batch and released at once, so gateway events for them
+        # do not wait for webhooks of other channels
+        idle = [channel for channel in channels if not notifications[channel.id]]
+        await self._save(idle, held, activity, started_at, changed=False)
+
+        # state is saved only for channels whose notifications were routed, failed ones are retried on next tick.
+        # The lua atomic storage is an exception: get_many has already replaced the state, so notifications
+        # of a channel that failed to route are not retried
+        changed = [channel for channel in channels if notifications[channel.id]]
+        if self.concurrency <= 1:
+            for channel in changed:
+                await self._process_chanel(channel, notifications[channel.id])
+                await self._save([channel], held, activity, started_at, changed=True)
+            return
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def process_limited(channel: Channel) -> None:
+            # waiting for a slot is not a part of channel processing time
+            async with semaphore:
+                await self._process_chanel(channel, notifications[channel.id])
+                await self._save([channel], held, activity, started_at, changed=True)
+
+        results = await asyncio.gather(*[process_limited(channel) for channel in changed], return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+    async def _save(
+        self, channels: list[Channel], held: set[int], activity: bool, started_at: float, changed: bool
+    ) -> None:
+        if not channels:
+            return
 
-            notifications = channel.generate_notifications()
+        await self.repository.save_many(channels)
+        for channel in channels:
+            held.discard(channel.id)
+            self._locks[channel.id].release()
 
-            if notifications:
-                await self.router.send(notifications)
+            if self.schedule is not None:
+                member_ids = frozenset(user.id for user in channel.users)
+                self.schedule.record(channel.id, activity or changed, started_at, member_ids)
 
-            await self.repository.save(channel)
+    async def _process_chanel(self, channel: Channel, notifications: list[Notification]) -> None:
+        async with self.instrumentation.channel_processing(channel.id):
+            await self.router.send(notifications)
@@ -0,0 +1,33 @@
+from abc import ABC, abstractmethod
+
+from dbot.model import User
+from dbot.model.channel import Channel
+from dbot.storage.state import ChannelState, StateTransition
+
+
+class IChannelStateStorage(ABC):
+    @abstractmethod
+    async def load(self, channel_id: int) -> ChannelState | None:
+        ...
+
+    @abstractmethod
+    async def load_many(self, channel_ids: list[int]) -> dict[int, ChannelState | None]:
+        ...
+
+    @abstractmethod
+    async def save(self, channel: Channel, ts: int) -> None:
+        ...
+
+    @abstractmethod
+    async def save_many(self, channels: list[Channel], ts: int) -> None:
+        ...
+
+
+class IAtomicChannelStateStorage(ABC):
+    @abstractmethod
+    async def swap_many(
+        self, channels_users: dict[int, list[User]], ts: int, lifetime: int
+    ) -> dict[int, StateTransition]:
+        """
+        Replaces stored channels members with current ones and returns what changed since the stored state.
+        """
@@ -0,0 +1,66 @@
+import redis
+import structlog
+
+from dbot.model.channel import Channel
+from dbot.storage.abstract import IChannelStateStorage
+from dbot.storage.codecs import IChannelStateCodec
+from dbot.storage.state import ChannelState
+
+logger = structlog.get_logger()
+
+
+class BlobChannelStateStorage(IChannelStateStorage):
+    """
+    Stores the whole state of a channel encoded by codec under one key.
+    """
+
+    def __init__(
+        self,
+        redis_client: redis.asyncio.Redis,
+        codec: IChannelStateCodec,
+        legacy_codecs: list[IChannelStateCodec] | None = None,
+    ) -> None:
+        self.redis_client = redis_client
+        # states are written with codec only, legacy codecs are used to read states saved before migration
+        self.codec = codec
+        self.legacy_codecs = legacy_codecs or []
+
+    async def load(self, channel_id: int) -> ChannelState | None:
+        for codec in [self.codec, *self.legacy_codecs]:
+            data = await self.redis_client.get(codec.key(channel_id))
+            if data is not None:
+                return codec.decode(data)
+
+        logger.debug("no_previous_state", channel_id=channel_id)
+        return None
+
+    async def load_many(self, channel_ids: list[int]) -> dict[int, ChannelState | None]:
+        codecs = [self.codec, *self.legacy_codecs]
+
+        # states of all codecs are requested at once, so migration does not cost additional round trips
+        keys = [codec.key(channel_id) for codec in codecs for channel_id in channel_ids]
+        raw_states = await self.redis_client.mget(keys)
+
+        states: dict[int, ChannelState | None] = {}
+        for index, channel_id in enumerate(channel_ids):
+            states[channel_id] = None
+            for codec_index, codec in enumerate(codecs):
+                data = raw_states[codec_index * len(channel_ids) + index]
+                if data is not None:
+                    states[channel_id] = codec.decode(data)
+                    break
+            else:
+                logger.debug("no_previous_state", channel_id=channel_id)
+
+        return states
+
+    async def save(self, channel: Channel, ts: int) -> None:
+        state = ChannelState.from_model(channel, ts=ts)
+        await self.redis_client.set(self.codec.key(channel.id), self.codec.encode(state))
+
+    async def save_many(self, channels: list[Channel], ts: int) -> None:
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for channel in channels:
+                state = ChannelState.from_model(channel, ts=ts)
+                pipe.set(self.codec.key(channel.id), self.codec.encode(state))
+            await pipe.execute()
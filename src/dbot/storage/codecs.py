@@ -0,0 +1,113 @@
+import struct
+from abc import ABC, abstractmethod
+from typing import Any
+
+from pydantic import BaseModel
+
+from dbot.model import User
+from dbot.storage.state import ChannelState
+
+
+class CodecError(Exception):
+    pass
+
+
+class UserStateSerializer(BaseModel):
+    username: str
+    id: int
+
+    def to_model(self) -> User:
+        return User(id=self.id, username=self.username)
+
+    @classmethod
+    def from_model(cls, model: User) -> "UserStateSerializer":
+        return cls(id=model.id, username=model.username)
+
+
+class ChannelStateSerializer(BaseModel):
+    id: int
+    ts: int
+    users: list[UserStateSerializer]
+
+    def to_model(self) -> ChannelState:
+        return ChannelState(id=self.id, ts=self.ts, users=[s.to_model() for s in self.users])
+
+    @classmethod
+    def from_model(cls, model: ChannelState) -> "ChannelStateSerializer":
+        return cls(
+            id=model.id,
+            ts=model.ts,
+            users=[UserStateSerializer.from_model(user) for user in model.users],
+        )
+
+
+class IChannelStateCodec(ABC):
+    KEY_PREFIX: str
+
+    def key(self, channel_id: Any) -> str:
+        return self.KEY_PREFIX.format(channel_id=channel_id)
+
+    @abstractmethod
+    def encode(self, state: ChannelState) -> bytes | str:
+        ...
+
+    @abstractmethod
+    def decode(self, data: bytes | str) -> ChannelState:
+        ...
+
+
+class JSONChannelStateCodec(IChannelStateCodec):
+    KEY_PREFIX = "channel_v2_{channel_id}"
+
+    def encode(self, state: ChannelState) -> bytes | str:
+        return ChannelStateSerializer.from_model(state).model_dump_json()
+
+    def decode(self, data: bytes | str) -> ChannelState:
+        return ChannelStateSerializer.model_validate_json(data).to_model()
+
+
+class CompactChannelStateCodec(IChannelStateCodec):
+    """
+    Binary state format: a header with version, channel id, timestamp and users count,
+    a packed array of users ids and a dictionary of usernames in the same order, separated by zero bytes.
+    """
+
+    KEY_PREFIX = "channel_v3_{channel_id}"
+    VERSION = 3
+
+    _HEADER = struct.Struct("<BQqI")
+    _SEPARATOR = "\0"
+
+    def encode(self, state: ChannelState) -> bytes | str:
+        users_count = len(state.users)
+
+        header = self._HEADER.pack(self.VERSION, state.id, state.ts, users_count)
+        ids = struct.pack(f"<{users_count}Q", *[user.id for user in state.users])
+        usernames = self._SEPARATOR.join([user.username for user in state.users]).encode("utf-8")
+
+        return b"".join((header, ids, usernames))
+
+    def decode(self, data: bytes | str) -> ChannelState:
+        if isinstance(data, str):
+            raise CodecError("Compact channel state must be bytes")
+
+        try:
+            version, channel_id, ts, users_count = self._HEADER.unpack_from(data)
+            if version != self.VERSION:
+                raise CodecError(f"Unsupported compact channel state version: {version}")
+
+            ids = struct.unpack_from(f"<{users_count}Q", data, self._HEADER.size)
+        except struct.error as e:
+            raise CodecError("Compact channel state is malformed") from e
+
+        usernames_offset = self._HEADER.size + users_count * 8
+        usernames = data[usernames_offset:].decode("utf-8").split(self._SEPARATOR) if users_count else []
+
+        if len(usernames) != users_count:
+            raise CodecError("Compact channel state usernames do not match users ids")
+
+        return ChannelState(
+            id=channel_id,
+            ts=ts,
+            users=[User(id=user_id, username=username) for user_id, username in zip(ids, usernames)],
+        )
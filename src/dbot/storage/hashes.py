@@ -0,0 +1,89 @@
+from typing import Any
+
+import redis
+import structlog
+
+from dbot.model import User
+from dbot.model.channel import Channel, UsersDiff
+from dbot.storage.abstract import IChannelStateStorage
+from dbot.storage.state import ChannelState
+
+logger = structlog.get_logger()
+
+
+class HashChannelStateStorage(IChannelStateStorage):
+    """
+    Stores channel members in a Redis hash of user id to username, with the state timestamp in a separate field.
+
+    Only joined and left users are written when previous state is known, so writes scale with churn
+    instead of channel size.
+    """
+
+    KEY_PREFIX = "channel_hash_{channel_id}"
+    TS_FIELD = "ts"
+
+    def __init__(self, redis_client: redis.asyncio.Redis) -> None:
+        self.redis_client = redis_client
+
+    def key(self, channel_id: Any) -> str:
+        return self.KEY_PREFIX.format(channel_id=channel_id)
+
+    async def load(self, channel_id: int) -> ChannelState | None:
+        return (await self.load_many([channel_id]))[channel_id]
+
+    async def load_many(self, channel_ids: list[int]) -> dict[int, ChannelState | None]:
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for channel_id in channel_ids:
+                pipe.hgetall(self.key(channel_id))
+            raw_states = await pipe.execute()
+
+        return {channel_id: self._decode(channel_id, data) for channel_id, data in zip(channel_ids, raw_states)}
+
+    async def save(self, channel: Channel, ts: int) -> None:
+        await self.save_many([channel], ts)
+
+    async def save_many(self, channels: list[Channel], ts: int) -> None:
+        # transaction keeps readers from seeing a partially rewritten channel
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            for channel in channels:
+                self._write(pipe, channel, ts)
+            await pipe.execute()
+
+    def _write(self, pipe: redis.asyncio.client.Pipeline, channel: Channel, ts: int) -> None:
+        key = self.key(channel.id)
+
+        if channel.previous_state is None:
+            # nothing is known about stored members, so the hash is rewritten completely
+            pipe.delete(key)
+            pipe.hset(key, mapping={self.TS_FIELD: ts, **{str(user.id): user.username for user in channel.users}})
+            return
+
+        diff = UsersDiff.between(channel.previous_state.users, channel.users)
+
+        previous_usernames = {user.id: user.username for user in channel.previous_state.users}
+        renamed = [
+            user
+            for user in channel.users
+            if user.id in previous_usernames and previous_usernames[user.id] != user.username
+        ]
+
+        if diff.left:
+            pipe.hdel(key, *[str(user.id) for user in diff.left])
+
+        updated = {str(user.id): user.username for user in [*diff.joined, *renamed]}
+        pipe.hset(key, mapping={self.TS_FIELD: ts, **updated})
+
+    def _decode(self, channel_id: int, data: dict[bytes, bytes]) -> ChannelState | None:
+        if not data:
+            logger.debug("no_previous_state", channel_id=channel_id)
+            return None
+
+        fields = {field.decode("utf-8"): value.decode("utf-8") for field, value in data.items()}
+
+        ts = fields.pop(self.TS_FIELD, None)
+        if ts is None:
+            logger.debug("no_previous_state_timestamp", channel_id=channel_id)
+            return None
+
+        users = [User(id=int(user_id), username=username) for user_id, username in fields.items()]
+        return ChannelState(id=channel_id, ts=int(ts), users=users)
@@ -0,0 +1,123 @@
+from typing import Any
+
+import redis
+import structlog
+
+from dbot.model import User
+from dbot.storage.abstract import IAtomicChannelStateStorage
+from dbot.storage.hashes import HashChannelStateStorage
+from dbot.storage.state import StateTransition
+
+logger = structlog.get_logger()
+
+# KEYS[1] - channel hash, ARGV[1] - timestamp, ARGV[2] - state lifetime, ARGV[3..] - user id and username pairs.
+# Users ids are kept as strings, Lua numbers can not represent Discord snowflakes precisely.
+SWAP_CHANNEL_STATE_SCRIPT = """
+local key = KEYS[1]
+local ts = tonumber(ARGV[1])
+local lifetime = tonumber(ARGV[2])
+local chunk_size = 500
+
+local function hset_pairs(pairs_list)
+    for i = 1, #pairs_list, chunk_size * 2 do
+        redis.call('HSET', key, unpack(pairs_list, i, math.min(i + chunk_size * 2 - 1, #pairs_list)))
+    end
+end
+
+local previous_ts = nil
+local previous_users = {}
+local stored = redis.call('HGETALL', key)
+for i = 1, #stored, 2 do
+    if stored[i] == 'ts' then
+        previous_ts = tonumber(stored[i + 1])
+    else
+        previous_users[stored[i]] = stored[i + 1]
+    end
+end
+
+local previous_exists = 1
+if previous_ts == nil or ts - previous_ts > lifetime then
+    previous_exists = 0
+end
+
+local current_users = {}
+local joined = {}
+local updated = {'ts', ARGV[1]}
+for i = 3, #ARGV, 2 do
+    local user_id = ARGV[i]
+    local username = ARGV[i + 1]
+    current_users[user_id] = username
+    if previous_users[user_id] == nil then
+        table.insert(joined, user_id)
+    end
+    if previous_exists == 0 or previous_users[user_id] ~= username then
+        table.insert(updated, user_id)
+        table.insert(updated, username)
+    end
+end
+
+local left = {}
+local left_ids = {}
+for user_id, username in pairs(previous_users) do
+    if current_users[user_id] == nil then
+        table.insert(left, user_id)
+        table.insert(left, username)
+        table.insert(left_ids, user_id)
+    end
+end
+
+if previous_exists == 0 then
+    redis.call('DEL', key)
+else
+    for i = 1, #left_ids, chunk_size do
+        redis.call('HDEL', key, unpack(left_ids, i, math.min(i + chunk_size - 1, #left_ids)))
+    end
+end
+hset_pairs(updated)
+
+return {previous_exists, joined, left}
+"""
+
+
+class LuaChannelStateStorage(IAtomicChannelStateStorage):
+    """
+    Swaps channels states with a server-side script, so the stored state is read and replaced atomically.
+
+    States are kept in the same hashes as in HashChannelStateStorage.
+    """
+
+    KEY_PREFIX = HashChannelStateStorage.KEY_PREFIX
+
+    def __init__(self, redis_client: redis.asyncio.Redis) -> None:
+        self.redis_client = redis_client
+        self._swap_script = redis_client.register_script(SWAP_CHANNEL_STATE_SCRIPT)
+
+    def key(self, channel_id: Any) -> str:
+        return self.KEY_PREFIX.format(channel_id=channel_id)
+
+    async def swap_many(
+        self, channels_users: dict[int, list[User]], ts: int, lifetime: int
+    ) -> dict[int, StateTransition]:
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for channel_id, users in channels_users.items():
+                args: list[Any] = [ts, lifetime]
+                for user in users:
+                    args.extend((str(user.id), user.username))
+
+                await self._swap_script(keys=[self.key(channel_id)], args=args, client=pipe)
+
+            results = await pipe.execute()
+
+        return {channel_id: self._decode(result) for channel_id, result in zip(channels_users, results)}
+
+    @staticmethod
+    def _decode(result: list[Any]) -> StateTransition:
+        previous_exists, joined, left = result
+
+        return StateTransition(
+            previous_exists=bool(previous_exists),
+            joined_ids={int(user_id) for user_id in joined},
+            left=[
+                User(id=int(left[index]), username=left[index + 1].decode("utf-8")) for index in range(0, len(left), 2)
+            ],
+        )
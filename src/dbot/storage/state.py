@@ -0,0 +1,33 @@
+from dataclasses import dataclass
+
+from dbot.model import User
+from dbot.model.channel import Channel
+
+
+@dataclass
+class ChannelState:
+    id: int
+    ts: int
+    users: list[User]
+
+    def to_model(self) -> Channel:
+        return Channel(id=self.id, users=list(self.users))
+
+    @classmethod
+    def from_model(cls, model: Channel, ts: int) -> "ChannelState":
+        return cls(id=model.id, ts=ts, users=list(model.users))
+
+
+@dataclass
+class StateTransition:
+    previous_exists: bool
+    joined_ids: set[int]
+    left: list[User]
+
+    def to_previous_state(self, channel_id: int, users: list[User]) -> Channel | None:
+        if not self.previous_exists:
+            return None
+
+        previous_users = [user for user in users if user.id not in self.joined_ids]
+        previous_users.extend(self.left)
+        return Channel(id=channel_id, users=previous_users)
@@ -4,6 +4,7 @@ from dbot.config_loader.loader import JSONLoader
 from dbot.model.config import (
     ChannelMonitorConfig,
     MonitorConfig,
+    RedisStreamTargetConfig,
     RedisTargetConfig,
     WebhooksTargetConfig,
 )
@@ -63,3 +64,40 @@ def test__channel_config_loader__two_targets():
             ),
         ]
     )
+
+
+def test__channel_config_loader__redis_streams__default_maxlen():
+    loader = JSONLoader()
+
+    data = {
+        "channels": [
+            {
+                "channel_id": 1,
+                "redis_streams": [
+                    {
+                        "stream": "test_stream",
+                    },
+                    {
+                        "stream": "test_stream_2",
+                        "maxlen": 100,
+                    },
+                ],
+            }
+        ],
+    }
+
+    config = loader.from_string(json.dumps(data))
+
+    assert config == MonitorConfig(
+        channels=[
+            ChannelMonitorConfig(
+                channel_id=1,
+                webhooks=None,
+                redis_queues=[],
+                redis_streams=[
+                    RedisStreamTargetConfig(stream="test_stream", maxlen=10000),
+                    RedisStreamTargetConfig(stream="test_stream_2", maxlen=100),
+                ],
+            ),
+        ]
+    )
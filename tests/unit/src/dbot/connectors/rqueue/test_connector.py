@@ -18,8 +18,18 @@ TEST_QUEUE_NAME = "test_queue"
 
 
 @pytest.fixture
-def client():
-    return mock.AsyncMock()
+def pipeline():
+    pipeline = mock.MagicMock()
+    pipeline.execute = mock.AsyncMock()
+    return pipeline
+
+
+@pytest.fixture
+def client(pipeline):
+    client = mock.AsyncMock()
+    client.pipeline = mock.MagicMock()
+    client.pipeline.return_value.__aenter__.return_value = pipeline
+    return client
 
 
 @pytest.fixture
@@ -54,7 +64,7 @@ def connector(client, monitoring):
     )
 
 
-async def test__send__two_queues__new_user_in_channel(client, monitoring, time_freeze):
+async def test__send__two_queues__new_user_in_channel(client, pipeline, monitoring, time_freeze):
     notification = NewUserInChannelNotification(
         user=User(username="test", id=1),
         channel_id=1,
@@ -83,7 +93,7 @@ async def test__send__two_queues__new_user_in_channel(client, monitoring, time_f
 
     await connector.send([notification])
 
-    first_call = connector.client.rpush.call_args_list[0]
+    first_call = pipeline.rpush.call_args_list[0]
     args = first_call[0]
     assert args[0] == "test_queue"
     assert (
@@ -91,7 +101,7 @@ async def test__send__two_queues__new_user_in_channel(client, monitoring, time_f
         == '{"version":1,"type":"new_user","data":{"id":1,"username":"test"},"channel_id":1,"happened_at":"2023-10-10T10:10:10Z"}'
     )
 
-    second_call = connector.client.rpush.call_args_list[1]
+    second_call = pipeline.rpush.call_args_list[1]
     args = second_call[0]
     assert args[0] == "test_queue_2"
     assert (
@@ -100,7 +110,7 @@ async def test__send__two_queues__new_user_in_channel(client, monitoring, time_f
     )
 
 
-async def test__send__new_user_in_channel(connector, time_freeze):
+async def test__send__new_user_in_channel(connector, pipeline, time_freeze):
     notification = NewUserInChannelNotification(
         user=User(username="test", id=1),
         channel_id=1,
@@ -108,13 +118,13 @@ async def test__send__new_user_in_channel(connector, time_freeze):
 
     await connector.send([notification])
 
-    connector.client.rpush.assert_called_once_with(
+    pipeline.rpush.assert_called_once_with(
         TEST_QUEUE_NAME,
         '{"version":1,"type":"new_user","data":{"id":1,"username":"test"},"channel_id":1,"happened_at":"2023-10-10T10:10:10Z"}',
     )
 
 
-async def test__send__users_connected_to_channel(connector, time_freeze):
+async def test__send__users_connected_to_channel(connector, pipeline, time_freeze):
     notification = UsersConnectedToChannelNotification(
         users=[
             User(username="test1", id=1),
@@ -125,32 +135,53 @@ async def test__send__users_connected_to_channel(connector, time_freeze):
 
     await connector.send([notification])
 
-    connector.client.rpush.assert_called_once_with(
+    pipeline.rpush.assert_called_once_with(
         TEST_QUEUE_NAME,
         '{"version":1,"type":"users_connected","data":{"usernames":["test1","test2"],"users":[{"id":1,"username":"test1"},{"id":2,"username":"test2"}]},'
         '"channel_id":1,"happened_at":"2023-10-10T10:10:10Z"}',
     )
 
 
-async def test__send__users_left_channel(connector, time_freeze):
+async def test__send__users_left_channel(connector, pipeline, time_freeze):
     notification = UsersLeftChannelNotification(
         channel_id=1,
     )
 
     await connector.send([notification])
 
-    connector.client.rpush.assert_called_once_with(
+    pipeline.rpush.assert_called_once_with(
         TEST_QUEUE_NAME,
         '{"version":1,"type":"users_left","data":{},"channel_id":1,"happened_at":"2023-10-10T10:10:10Z"}',
     )
 
 
-async def test__send__user_left_channel(connector, time_freeze):
+async def test__send__user_left_channel(connector, pipeline, time_freeze):
     notification = UserLeftChannelNotification(channel_id=1, user=User(username="test_user", id=1))
 
     await connector.send([notification])
 
-    connector.client.rpush.assert_called_once_with(
+    pipeline.rpush.assert_called_once_with(
         TEST_QUEUE_NAME,
         '{"version":1,"type":"user_left","data":{"id":1,"username":"test_user"},"channel_id":1,"happened_at":"2023-10-10T10:10:10Z"}',
     )
+
+
+async def test__send__two_notifications__pushed_with_one_command_in_one_pipeline(
+    connector, client, pipeline, monitoring, time_freeze
+):
+    notifications = [
+        NewUserInChannelNotification(user=User(username="test", id=1), channel_id=1),
+        UserLeftChannelNotification(user=User(username="test_2", id=2), channel_id=1),
+        NewUserInChannelNotification(user=User(username="test_3", id=3), channel_id=2),
+    ]
+
+    await connector.send(notifications)
+
+    client.pipeline.assert_called_once_with(transaction=False)
+    pipeline.rpush.assert_called_once_with(
+        TEST_QUEUE_NAME,
+        '{"version":1,"type":"new_user","data":{"id":1,"username":"test"},"channel_id":1,"happened_at":"2023-10-10T10:10:10Z"}',
+        '{"version":1,"type":"user_left","data":{"id":2,"username":"test_2"},"channel_id":1,"happened_at":"2023-10-10T10:10:10Z"}',
+    )
+    pipeline.execute.assert_awaited_once()
+    monitoring.fire_redis_events_count.assert_called_once_with(2)
@@ -0,0 +1,144 @@
+from unittest import mock
+
+import freezegun
+import pytest
+
+from dbot.connectors.rqueue.streams import RedisStreamConnector
+from dbot.infrastructure.monitoring import Monitoring
+from dbot.model import MonitorConfig, User
+from dbot.model.config import ChannelMonitorConfig, RedisStreamTargetConfig
+from dbot.model.notifications import (
+    NewUserInChannelNotification,
+    UserLeftChannelNotification,
+)
+
+TEST_STREAM_NAME = "test_stream"
+
+
+@pytest.fixture
+def pipeline():
+    pipeline = mock.MagicMock()
+    pipeline.execute = mock.AsyncMock()
+    return pipeline
+
+
+@pytest.fixture
+def client(pipeline):
+    client = mock.AsyncMock()
+    client.pipeline = mock.MagicMock()
+    client.pipeline.return_value.__aenter__.return_value = pipeline
+    return client
+
+
+@pytest.fixture
+async def monitoring():
+    return mock.AsyncMock(spec=Monitoring)
+
+
+@pytest.fixture
+def time_freeze():
+    with freezegun.freeze_time("2023-10-10T10:10:10"):
+        yield
+
+
+@pytest.fixture
+def connector(client, monitoring):
+    return RedisStreamConnector(
+        client,
+        MonitorConfig(
+            channels=[
+                ChannelMonitorConfig(
+                    channel_id=1,
+                    redis_queues=None,
+                    redis_streams=[
+                        RedisStreamTargetConfig(stream=TEST_STREAM_NAME, maxlen=100),
+                    ],
+                    webhooks=None,
+                )
+            ]
+        ),
+        monitoring,
+    )
+
+
+async def test__send__new_user_in_channel(connector, client, pipeline, monitoring, time_freeze):
+    notification = NewUserInChannelNotification(
+        user=User(username="test", id=1),
+        channel_id=1,
+    )
+
+    await connector.send([notification])
+
+    client.pipeline.assert_called_once_with(transaction=False)
+    pipeline.xadd.assert_called_once_with(
+        TEST_STREAM_NAME,
+        {
+            "message": '{"version":1,"type":"new_user","data":{"id":1,"username":"test"},"channel_id":1,'
+            '"happened_at":"2023-10-10T10:10:10Z"}'
+        },
+        maxlen=100,
+        approximate=True,
+    )
+    pipeline.execute.assert_awaited_once()
+    monitoring.fire_redis_stream_events_count.assert_called_once_with(1)
+
+
+async def test__send__two_notifications__appended_in_order_in_one_pipeline(
+    connector, client, pipeline, monitoring, time_freeze
+):
+    notifications = [
+        NewUserInChannelNotification(user=User(username="test", id=1), channel_id=1),
+        UserLeftChannelNotification(user=User(username="test_2", id=2), channel_id=1),
+    ]
+
+    await connector.send(notifications)
+
+    client.pipeline.assert_called_once_with(transaction=False)
+    assert [call.args[1]["message"] for call in pipeline.xadd.call_args_list] == [
+        '{"version":1,"type":"new_user","data":{"id":1,"username":"test"},"channel_id":1,'
+        '"happened_at":"2023-10-10T10:10:10Z"}',
+        '{"version":1,"type":"user_left","data":{"id":2,"username":"test_2"},"channel_id":1,'
+        '"happened_at":"2023-10-10T10:10:10Z"}',
+    ]
+    pipeline.execute.assert_awaited_once()
+    monitoring.fire_redis_stream_events_count.assert_called_once_with(2)
+
+
+async def test__send__stream_for_two_channels__largest_maxlen_used(client, pipeline, monitoring, time_freeze):
+    connector = RedisStreamConnector(
+        client,
+        MonitorConfig(
+            channels=[
+                ChannelMonitorConfig(
+                    channel_id=1,
+                    redis_queues=None,
+                    redis_streams=[RedisStreamTargetConfig(stream=TEST_STREAM_NAME, maxlen=100)],
+                    webhooks=None,
+                ),
+                ChannelMonitorConfig(
+                    channel_id=2,
+                    redis_queues=None,
+                    redis_streams=[RedisStreamTargetConfig(stream=TEST_STREAM_NAME, maxlen=500)],
+                    webhooks=None,
+                ),
+            ]
+        ),
+        monitoring,
+    )
+    notifications = [
+        NewUserInChannelNotification(user=User(username="test", id=1), channel_id=1),
+        NewUserInChannelNotification(user=User(username="test", id=1), channel_id=2),
+    ]
+
+    await connector.send(notifications)
+
+    assert [call.kwargs["maxlen"] for call in pipeline.xadd.call_args_list] == [500, 500]
+
+
+async def test__send__channel_without_streams__nothing_sent(connector, client, monitoring):
+    notification = NewUserInChannelNotification(user=User(username="test", id=1), channel_id=2)
+
+    await connector.send([notification])
+
+    client.pipeline.assert_not_called()
+    monitoring.fire_redis_stream_events_count.assert_not_called()
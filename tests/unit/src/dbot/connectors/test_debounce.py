@@ -0,0 +1,153 @@
+import asyncio
+from unittest import mock
+
+import pytest
+
+from dbot.connectors.debounce import DebouncingNotificationRouter
+from dbot.connectors.router import INotificationRouter
+from dbot.infrastructure.monitoring import Monitoring
+from dbot.model import MonitorConfig, User
+from dbot.model.config import ChannelMonitorConfig
+from dbot.model.notifications import (
+    NewUserInChannelNotification,
+    UserLeftChannelNotification,
+    UsersConnectedToChannelNotification,
+    UsersLeftChannelNotification,
+)
+
+WINDOW = 0.05
+
+
+@pytest.fixture
+def router():
+    return mock.AsyncMock(spec=INotificationRouter)
+
+
+@pytest.fixture
+def monitoring():
+    return mock.AsyncMock(spec=Monitoring)
+
+
+@pytest.fixture
+def debouncer(router, monitoring):
+    config = MonitorConfig(
+        channels=[
+            ChannelMonitorConfig(channel_id=1, webhooks=None, redis_queues=None, debounce_seconds=WINDOW),
+            ChannelMonitorConfig(channel_id=2, webhooks=None, redis_queues=None),
+        ]
+    )
+    return DebouncingNotificationRouter(router, config, monitoring)
+
+
+class TestCaseDebouncingNotificationRouter:
+    async def test__send__channel_without_window__sent_immediately(self, debouncer, router):
+        notification = NewUserInChannelNotification(user=User(id=1, username="test"), channel_id=2)
+
+        await debouncer.send([notification])
+
+        router.send.assert_awaited_once_with([notification])
+
+    async def test__send__channel_with_window__sent_after_window(self, debouncer, router):
+        notification = NewUserInChannelNotification(user=User(id=1, username="test"), channel_id=1)
+
+        await debouncer.send([notification])
+        router.send.assert_not_awaited()
+
+        await asyncio.sleep(WINDOW * 2)
+
+        router.send.assert_awaited_once_with([notification])
+
+    async def test__send__user_left_and_joined_inside_window__both_suppressed(self, debouncer, router, monitoring):
+        user = User(id=1, username="test")
+
+        await debouncer.send(
+            [UserLeftChannelNotification(user=user, channel_id=1), UsersLeftChannelNotification(channel_id=1)]
+        )
+        await debouncer.send(
+            [
+                NewUserInChannelNotification(user=user, channel_id=1),
+                UsersConnectedToChannelNotification(users=[user], channel_id=1),
+            ]
+        )
+        await asyncio.sleep(WINDOW * 2)
+
+        router.send.assert_not_awaited()
+        assert monitoring.fire_notifications_suppressed_count.await_args_list == [mock.call(1, 2), mock.call(1, 2)]
+
+    async def test__send__other_user_joined_inside_window__both_sent(self, debouncer, router, monitoring):
+        left = UserLeftChannelNotification(user=User(id=1, username="test"), channel_id=1)
+        joined = NewUserInChannelNotification(user=User(id=2, username="test_2"), channel_id=1)
+
+        await debouncer.send([left])
+        await debouncer.send([joined])
+        await asyncio.sleep(WINDOW * 2)
+
+        assert router.send.await_args_list == [mock.call([left]), mock.call([joined])]
+        monitoring.fire_notifications_suppressed_count.assert_not_awaited()
+
+    async def test__send__same_notification_held__previous_sent_immediately(self, debouncer, router):
+        first = NewUserInChannelNotification(user=User(id=1, username="test"), channel_id=1)
+        second = NewUserInChannelNotification(user=User(id=1, username="test_renamed"), channel_id=1)
+
+        await debouncer.send([first])
+        await debouncer.send([second])
+
+        router.send.assert_awaited_once_with([first])
+
+    async def test__flush__held_notifications__sent(self, debouncer, router):
+        notification = UsersLeftChannelNotification(channel_id=1)
+        await debouncer.send([notification])
+
+        await debouncer.flush()
+        await asyncio.sleep(WINDOW * 2)
+
+        router.send.assert_awaited_once_with([notification])
+
+    async def test__send__released_notification_failed__held_again(self, debouncer, router):
+        notification = NewUserInChannelNotification(user=User(id=1, username="test"), channel_id=1)
+        router.send.side_effect = [ConnectionError, None]
+
+        await debouncer.send([notification])
+        await asyncio.sleep(WINDOW * 1.5)
+
+        assert router.send.await_count == 1
+        assert debouncer._pending[(1, 1)].notification is notification
+
+        await asyncio.sleep(WINDOW)
+
+        assert router.send.await_args_list == [mock.call([notification]), mock.call([notification])]
+        assert debouncer._pending == {}
+
+    async def test__send__released_failed_then_opposite_held__both_suppressed(self, debouncer, router, monitoring):
+        left = UserLeftChannelNotification(user=User(id=1, username="test"), channel_id=1)
+        router.send.side_effect = ConnectionError
+
+        await debouncer.send([left])
+        await asyncio.sleep(WINDOW * 1.5)
+        await debouncer.send([NewUserInChannelNotification(user=User(id=1, username="test"), channel_id=1)])
+
+        assert debouncer._pending == {}
+        monitoring.fire_notifications_suppressed_count.assert_awaited_once_with(1, 2)
+
+    async def test__flush__send_failed__not_held_again(self, debouncer, router):
+        router.send.side_effect = ConnectionError
+        await debouncer.send([UsersLeftChannelNotification(channel_id=1)])
+
+        await debouncer.flush()
+
+        assert debouncer._pending == {}
+
+    async def test__send__users_changed_inside_window__held_users_connected_updated(self, debouncer, router):
+        first, second, third = (User(id=i, username=f"user{i}") for i in range(1, 4))
+        await debouncer.send([UsersConnectedToChannelNotification(users=[first, second], channel_id=1)])
+
+        await debouncer.send(
+            [
+                UserLeftChannelNotification(user=first, channel_id=1),
+                NewUserInChannelNotification(user=third, channel_id=1),
+            ]
+        )
+        await debouncer.flush()
+
+        sent = [notification for call in router.send.await_args_list for notification in call.args[0]]
+        assert UsersConnectedToChannelNotification(users=[second, third], channel_id=1) in sent
@@ -1,6 +1,10 @@
+import asyncio
 from unittest.mock import AsyncMock
 
-from dbot.connectors.router import NotificationRouter
+import pytest
+
+from dbot.connectors.router import NotificationRouter, NotificationRouterInstrumentation
+from dbot.infrastructure.monitoring import Monitoring
 from dbot.model import MonitorConfig, User
 from dbot.model.config import (
     ChannelMonitorConfig,
@@ -8,7 +12,10 @@ from dbot.model.config import (
     TargetTypeEnum,
     WebhooksTargetConfig,
 )
-from dbot.model.notifications import NewUserInChannelNotification
+from dbot.model.notifications import (
+    NewUserInChannelNotification,
+    UsersLeftChannelNotification,
+)
 
 
 async def test__NotificationRouter__send__event_and_config_has_2_targets__sent_to_both():
@@ -173,3 +180,93 @@ async def test__NotificationRouter__send__event_and_config_has_2_redis_queues__s
     await router.send(notifications)
 
     redis_connector_mock.send.assert_called_once_with(notifications)
+
+
+def _two_targets_config() -> MonitorConfig:
+    return MonitorConfig(
+        channels=[
+            ChannelMonitorConfig(
+                channel_id=1,
+                redis_queues=[RedisTargetConfig(queue="test_queue")],
+                webhooks=WebhooksTargetConfig(
+                    new_user_webhooks=["http://localhost:8000"],
+                    users_connected_webhooks=[],
+                    users_left_webhooks=[],
+                    user_left_webhooks=[],
+                ),
+            )
+        ]
+    )
+
+
+async def test__NotificationRouter__send__two_notifications__each_connector_called_once_with_batch():
+    router = NotificationRouter(configs=_two_targets_config())
+    redis_connector_mock = AsyncMock()
+    webhooks_connector_mock = AsyncMock()
+    router.register_connector(TargetTypeEnum.REDIS, redis_connector_mock)
+    router.register_connector(TargetTypeEnum.WEBHOOKS, webhooks_connector_mock)
+    notifications = [
+        NewUserInChannelNotification(user=User(username="test", id=1), channel_id=1),
+        NewUserInChannelNotification(user=User(username="test_2", id=2), channel_id=1),
+    ]
+
+    await router.send(notifications)
+
+    redis_connector_mock.send.assert_called_once_with(notifications)
+    webhooks_connector_mock.send.assert_called_once_with(notifications)
+
+
+async def test__NotificationRouter__send__connectors_sent_concurrently():
+    router = NotificationRouter(configs=_two_targets_config())
+    both_started = asyncio.Barrier(2)
+
+    async def send(notifications):
+        await asyncio.wait_for(both_started.wait(), timeout=1)
+
+    router.register_connector(TargetTypeEnum.REDIS, AsyncMock(send=AsyncMock(side_effect=send)))
+    router.register_connector(TargetTypeEnum.WEBHOOKS, AsyncMock(send=AsyncMock(side_effect=send)))
+
+    await router.send([NewUserInChannelNotification(user=User(username="test", id=1), channel_id=1)])
+
+
+async def test__NotificationRouter__send__one_connector_failed__others_sent_and_error_raised():
+    router = NotificationRouter(configs=_two_targets_config())
+    redis_connector_mock = AsyncMock()
+    redis_connector_mock.send.side_effect = Exception("redis error")
+    webhooks_connector_mock = AsyncMock()
+    router.register_connector(TargetTypeEnum.REDIS, redis_connector_mock)
+    router.register_connector(TargetTypeEnum.WEBHOOKS, webhooks_connector_mock)
+    notifications = [NewUserInChannelNotification(user=User(username="test", id=1), channel_id=1)]
+
+    with pytest.raises(Exception, match="redis error"):
+        await router.send(notifications)
+
+    webhooks_connector_mock.send.assert_called_once_with(notifications)
+
+
+async def test__NotificationRouterInstrumentation__send__connector_time_reported():
+    monitoring = AsyncMock(spec=Monitoring)
+    router = NotificationRouterInstrumentation(NotificationRouter(configs=_two_targets_config()), monitoring)
+    router.register_connector(TargetTypeEnum.REDIS, AsyncMock())
+    router.register_connector(TargetTypeEnum.WEBHOOKS, AsyncMock())
+
+    await router.send([NewUserInChannelNotification(user=User(username="test", id=1), channel_id=1)])
+
+    assert sorted(call.args[0] for call in monitoring.fire_connector_processing.await_args_list) == [
+        "redis",
+        "webhooks",
+    ]
+
+
+async def test__NotificationRouter__send__type_without_webhooks__webhooks_connector_not_called():
+    router = NotificationRouter(configs=_two_targets_config())
+    redis_connector_mock = AsyncMock()
+    webhooks_connector_mock = AsyncMock()
+    router.register_connector(TargetTypeEnum.REDIS, redis_connector_mock)
+    router.register_connector(TargetTypeEnum.WEBHOOKS, webhooks_connector_mock)
+    notifications = [UsersLeftChannelNotification(channel_id=1)]
+
+    await router.send(notifications)
+
+    redis_connector_mock.send.assert_called_once_with(notifications)
+    webhooks_connector_mock.send.assert_not_called()
@@ -0,0 +1,67 @@
+import pytest
+
+from dbot.connectors.abstract import NotificationTypesEnum
+from dbot.connectors.routing import Route, RoutingTable
+from dbot.model import MonitorConfig, User
+from dbot.model.config import (
+    ChannelMonitorConfig,
+    RedisTargetConfig,
+    TargetTypeEnum,
+    WebhooksTargetConfig,
+)
+from dbot.model.notifications import (
+    NewUserInChannelNotification,
+    UsersLeftChannelNotification,
+)
+
+
+@pytest.fixture
+def table() -> RoutingTable:
+    return RoutingTable.compile(
+        MonitorConfig(
+            channels=[
+                ChannelMonitorConfig(
+                    channel_id=1,
+                    redis_queues=[RedisTargetConfig(queue="test_queue")],
+                    webhooks=WebhooksTargetConfig(
+                        new_user_webhooks=["http://localhost/new_user"],
+                        users_connected_webhooks=[],
+                        users_left_webhooks=[],
+                        user_left_webhooks=[],
+                    ),
+                ),
+                ChannelMonitorConfig(
+                    channel_id=2,
+                    redis_queues=None,
+                    webhooks=WebhooksTargetConfig(
+                        new_user_webhooks=["http://localhost/new_user"],
+                        users_connected_webhooks=[],
+                        users_left_webhooks=[],
+                        user_left_webhooks=[],
+                    ),
+                ),
+            ]
+        )
+    )
+
+
+class TestCaseRoutingTable:
+    def test__get__type_with_all_targets__route(self, table):
+        route = table.get(1, NotificationTypesEnum.NEW_USER)
+
+        assert route == Route(
+            target_types=(TargetTypeEnum.WEBHOOKS, TargetTypeEnum.REDIS),
+            webhooks=("http://localhost/new_user",),
+            redis_queues=("test_queue",),
+        )
+
+    def test__get__type_without_webhooks__only_redis(self, table):
+        route = table.get(1, NotificationTypesEnum.USERS_LEFT)
+
+        assert route == Route(target_types=(TargetTypeEnum.REDIS,), redis_queues=("test_queue",))
+
+    def test__route__type_without_targets__none(self, table):
+        assert table.route(UsersLeftChannelNotification(channel_id=2)) is None
+
+    def test__route__unknown_channel__none(self, table):
+        assert table.route(NewUserInChannelNotification(user=User(id=1, username="test"), channel_id=3)) is None
@@ -0,0 +1,105 @@
+import asyncio
+import json
+from unittest import mock
+
+import freezegun
+import pytest
+
+from dbot.connectors.webhooks.batch import BatchWebhooksConnector
+from dbot.connectors.webhooks.transport import WebhooksTransport
+from dbot.infrastructure.monitoring import Monitoring
+from dbot.model import MonitorConfig, User
+from dbot.model.config import BatchWebhookTargetConfig, ChannelMonitorConfig
+from dbot.model.notifications import (
+    NewUserInChannelNotification,
+    UsersLeftChannelNotification,
+)
+
+URL = "http://localhost/ingest"
+
+
+@pytest.fixture
+def transport():
+    return mock.AsyncMock(spec=WebhooksTransport)
+
+
+@pytest.fixture
+def monitoring():
+    return mock.AsyncMock(spec=Monitoring)
+
+
+@pytest.fixture
+def time_freeze():
+    with freezegun.freeze_time("2023-10-10T10:10:10"):
+        yield
+
+
+def _config(max_batch_size: int = 100, max_delay: float = 0.0) -> MonitorConfig:
+    return MonitorConfig(
+        channels=[
+            ChannelMonitorConfig(
+                channel_id=channel_id,
+                webhooks=None,
+                redis_queues=None,
+                batch_webhooks=[BatchWebhookTargetConfig(url=URL, max_batch_size=max_batch_size, max_delay=max_delay)],
+            )
+            for channel_id in (1, 2)
+        ]
+    )
+
+
+def _posted_batches(transport: mock.AsyncMock) -> list[list[dict]]:
+    return [json.loads(call.args[1]) for call in transport.post_json.await_args_list]
+
+
+class TestCaseBatchWebhooksConnector:
+    async def test__send__no_delay__posted_as_one_array(self, transport, monitoring, time_freeze):
+        connector = BatchWebhooksConnector(transport, _config(), monitoring)
+
+        await connector.send(
+            [
+                NewUserInChannelNotification(user=User(id=1, username="test"), channel_id=1),
+                UsersLeftChannelNotification(channel_id=1),
+            ]
+        )
+
+        transport.post_json.assert_awaited_once_with(
+            URL,
+            '[{"version":1,"type":"new_user","data":{"id":1,"username":"test"},"channel_id":1,'
+            '"happened_at":"2023-10-10T10:10:10Z"},'
+            '{"version":1,"type":"users_left","data":{},"channel_id":1,"happened_at":"2023-10-10T10:10:10Z"}]',
+        )
+        monitoring.fire_webhooks_batch.assert_awaited_once_with(2)
+
+    async def test__send__batch_size_reached__posted_in_chunks(self, transport, monitoring):
+        connector = BatchWebhooksConnector(transport, _config(max_batch_size=2), monitoring)
+
+        await connector.send([UsersLeftChannelNotification(channel_id=1) for _ in range(3)])
+
+        assert [len(batch) for batch in _posted_batches(transport)] == [2, 1]
+
+    async def test__send__delay__channels_posted_together_after_delay(self, transport, monitoring):
+        connector = BatchWebhooksConnector(transport, _config(max_delay=0.05), monitoring)
+
+        await connector.send([UsersLeftChannelNotification(channel_id=1)])
+        await connector.send([UsersLeftChannelNotification(channel_id=2)])
+        transport.post_json.assert_not_awaited()
+
+        await asyncio.sleep(0.1)
+
+        assert [[message["channel_id"] for message in batch] for batch in _posted_batches(transport)] == [[1, 2]]
+
+    async def test__flush__pending_messages__posted(self, transport, monitoring):
+        connector = BatchWebhooksConnector(transport, _config(max_delay=10.0), monitoring)
+        await connector.send([UsersLeftChannelNotification(channel_id=1)])
+
+        await connector.flush()
+
+        assert len(_posted_batches(transport)) == 1
+
+    async def test__send__channel_without_target__nothing_posted(self, transport, monitoring):
+        connector = BatchWebhooksConnector(transport, _config(), monitoring)
+
+        await connector.send([UsersLeftChannelNotification(channel_id=3)])
+
+        transport.post_json.assert_not_awaited()
@@ -0,0 +1,88 @@
+from unittest import mock
+
+import pytest
+
+from dbot.connectors.webhooks.breaker import (
+    CircuitBreaker,
+    CircuitOpenError,
+    CircuitStateEnum,
+)
+from dbot.infrastructure.monitoring import Monitoring
+
+HOST = "hook.example.com"
+
+
+@pytest.fixture
+def monitoring():
+    return mock.AsyncMock(spec=Monitoring)
+
+
+@pytest.fixture
+def clock():
+    with mock.patch("dbot.connectors.webhooks.breaker.time.monotonic", return_value=100.0) as clock:
+        yield clock
+
+
+class TestCaseCircuitBreaker:
+    async def test__record_failure__threshold_reached__opened(self, monitoring, clock):
+        breaker = CircuitBreaker(monitoring, failure_threshold=2, recovery_timeout=10.0)
+
+        await breaker.record_failure(HOST)
+        assert breaker.state(HOST) == CircuitStateEnum.CLOSED
+        await breaker.record_failure(HOST)
+
+        assert breaker.state(HOST) == CircuitStateEnum.OPEN
+        monitoring.fire_webhooks_circuit_state.assert_awaited_once_with(HOST, CircuitStateEnum.OPEN.value)
+        with pytest.raises(CircuitOpenError):
+            await breaker.before_call(HOST)
+
+    async def test__record_success__between_failures__failures_reset(self, monitoring, clock):
+        breaker = CircuitBreaker(monitoring, failure_threshold=2)
+
+        await breaker.record_failure(HOST)
+        await breaker.record_success(HOST)
+        await breaker.record_failure(HOST)
+
+        assert breaker.state(HOST) == CircuitStateEnum.CLOSED
+
+    async def test__before_call__recovery_timeout_passed__one_probe_allowed(self, monitoring, clock):
+        breaker = CircuitBreaker(monitoring, failure_threshold=1, recovery_timeout=10.0)
+        await breaker.record_failure(HOST)
+        clock.return_value = 111.0
+
+        await breaker.before_call(HOST)
+
+        assert breaker.state(HOST) == CircuitStateEnum.HALF_OPEN
+        with pytest.raises(CircuitOpenError):
+            await breaker.before_call(HOST)
+
+    async def test__record_success__half_open__closed(self, monitoring, clock):
+        breaker = CircuitBreaker(monitoring, failure_threshold=1, recovery_timeout=10.0)
+        await breaker.record_failure(HOST)
+        clock.return_value = 111.0
+        await breaker.before_call(HOST)
+
+        await breaker.record_success(HOST)
+
+        assert breaker.state(HOST) == CircuitStateEnum.CLOSED
+        await breaker.before_call(HOST)
+
+    async def test__record_failure__half_open__opened_again(self, monitoring, clock):
+        breaker = CircuitBreaker(monitoring, failure_threshold=3, recovery_timeout=10.0)
+        for _ in range(3):
+            await breaker.record_failure(HOST)
+        clock.return_value = 111.0
+        await breaker.before_call(HOST)
+
+        await breaker.record_failure(HOST)
+
+        assert breaker.state(HOST) == CircuitStateEnum.OPEN
+        with pytest.raises(CircuitOpenError):
+            await breaker.before_call(HOST)
+
+    async def test__record_failure__other_host__not_affected(self, monitoring, clock):
+        breaker = CircuitBreaker(monitoring, failure_threshold=1)
+
+        await breaker.record_failure(HOST)
+
+        await breaker.before_call("other.example.com")
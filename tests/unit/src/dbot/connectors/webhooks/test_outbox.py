@@ -0,0 +1,201 @@
+from unittest import mock
+
+import pytest
+
+from dbot.connectors.webhooks.breaker import CircuitOpenError
+from dbot.connectors.webhooks.outbox import (
+    CLAIM_DUE_SCRIPT,
+    REDRIVE_SCRIPT,
+    REQUEUE_EXPIRED_SCRIPT,
+    OutboxEntry,
+    OutboxScheduler,
+    OutboxWebhooksTransport,
+    WebhooksOutbox,
+)
+from dbot.connectors.webhooks.transport import WebhooksTransport
+from dbot.infrastructure.monitoring import Monitoring
+
+
+@pytest.fixture
+def pipeline():
+    pipeline = mock.MagicMock()
+    pipeline.execute = mock.AsyncMock()
+    return pipeline
+
+
+@pytest.fixture
+def scripts():
+    return {}
+
+
+@pytest.fixture
+def redis_client(pipeline, scripts):
+    redis_client = mock.AsyncMock()
+    redis_client.pipeline = mock.MagicMock()
+    redis_client.pipeline.return_value.__aenter__.return_value = pipeline
+    redis_client.register_script = mock.MagicMock(
+        side_effect=lambda script: scripts.setdefault(script, mock.AsyncMock())
+    )
+    return redis_client
+
+
+@pytest.fixture
+def outbox():
+    return mock.AsyncMock(spec=WebhooksOutbox)
+
+
+@pytest.fixture
+def transport():
+    return mock.AsyncMock(spec=WebhooksTransport)
+
+
+@pytest.fixture
+def monitoring():
+    return mock.AsyncMock(spec=Monitoring)
+
+
+class TestCaseWebhooksOutbox:
+    @mock.patch("dbot.connectors.webhooks.outbox.time.time", return_value=1000.0)
+    async def test__reschedule__attempts_left__scheduled_with_backoff(self, _, redis_client, pipeline):
+        outbox = WebhooksOutbox(redis_client, max_attempts=5, base_delay=10.0)
+        entry = OutboxEntry(id="1", link="http://localhost", attempts=2)
+
+        scheduled = await outbox.reschedule(entry, "error")
+
+        assert scheduled is True
+        [(key, mapping), _] = pipeline.zadd.call_args
+        [(raw, score)] = mapping.items()
+        assert key == WebhooksOutbox.SCHEDULED_KEY
+        assert OutboxEntry.model_validate_json(raw) == OutboxEntry(
+            id="1", link="http://localhost", attempts=3, last_error="error"
+        )
+        assert 1020.0 <= score <= 1040.0
+        pipeline.zrem.assert_not_called()
+
+    async def test__reschedule__without_attempt__attempts_kept(self, redis_client, pipeline):
+        outbox = WebhooksOutbox(redis_client, max_attempts=3)
+        entry = OutboxEntry(id="1", link="http://localhost", attempts=2)
+
+        scheduled = await outbox.reschedule(entry, "error", count_attempt=False)
+
+        assert scheduled is True
+        [(_, mapping), _] = pipeline.zadd.call_args
+        assert OutboxEntry.model_validate_json(next(iter(mapping))).attempts == 2
+
+    async def test__reschedule__last_attempt__dead_lettered(self, redis_client, pipeline):
+        outbox = WebhooksOutbox(redis_client, max_attempts=3)
+        entry = OutboxEntry(id="1", link="http://localhost", attempts=2)
+
+        scheduled = await outbox.reschedule(entry, "error")
+
+        assert scheduled is False
+        pipeline.zadd.assert_not_called()
+        pipeline.lpush.assert_called_once_with(
+            WebhooksOutbox.DEAD_KEY,
+            OutboxEntry(id="1", link="http://localhost", attempts=3, last_error="error").model_dump_json(),
+        )
+
+    async def test__reschedule__claimed_entry__removed_from_inflight_in_same_transaction(self, redis_client, pipeline):
+        outbox = WebhooksOutbox(redis_client)
+        entry = OutboxEntry(id="1", link="http://localhost", claim='{"id": "1"}')
+
+        await outbox.reschedule(entry, "error")
+
+        redis_client.pipeline.assert_called_once_with(transaction=True)
+        pipeline.zrem.assert_called_once_with(WebhooksOutbox.INFLIGHT_KEY, '{"id": "1"}')
+        pipeline.zadd.assert_called_once()
+        pipeline.execute.assert_awaited_once()
+
+    @mock.patch("dbot.connectors.webhooks.outbox.time.time", return_value=1000.0)
+    async def test__claim_due__due_entries__moved_to_inflight_with_lease(self, _, redis_client, scripts):
+        entry = OutboxEntry(id="1", link="http://localhost/1")
+        outbox = WebhooksOutbox(redis_client, lease_timeout=60.0)
+        scripts[CLAIM_DUE_SCRIPT].return_value = [entry.model_dump_json().encode()]
+
+        entries = await outbox.claim_due(10)
+
+        assert [claimed.model_dump() for claimed in entries] == [entry.model_dump()]
+        assert entries[0].claim == entry.model_dump_json()
+        scripts[CLAIM_DUE_SCRIPT].assert_awaited_once_with(
+            keys=[WebhooksOutbox.SCHEDULED_KEY, WebhooksOutbox.INFLIGHT_KEY], args=[1000.0, 10, 1060.0]
+        )
+
+    async def test__ack__claimed_entry__removed_from_inflight(self, redis_client):
+        outbox = WebhooksOutbox(redis_client)
+
+        await outbox.ack(OutboxEntry(id="1", link="http://localhost", claim="raw"))
+
+        redis_client.zrem.assert_awaited_once_with(WebhooksOutbox.INFLIGHT_KEY, "raw")
+
+    @mock.patch("dbot.connectors.webhooks.outbox.time.time", return_value=1000.0)
+    async def test__requeue_expired__expired_leases__scheduled_again(self, _, redis_client, scripts):
+        outbox = WebhooksOutbox(redis_client)
+        scripts[REQUEUE_EXPIRED_SCRIPT].return_value = 2
+
+        assert await outbox.requeue_expired() == 2
+        scripts[REQUEUE_EXPIRED_SCRIPT].assert_awaited_once_with(
+            keys=[WebhooksOutbox.INFLIGHT_KEY, WebhooksOutbox.SCHEDULED_KEY], args=[1000.0]
+        )
+
+    @mock.patch("dbot.connectors.webhooks.outbox.time.time", return_value=1000.0)
+    async def test__redrive__no_limit__all_dead_entries_moved_by_script(self, _, redis_client, scripts):
+        outbox = WebhooksOutbox(redis_client)
+        scripts[REDRIVE_SCRIPT].return_value = 3
+
+        assert await outbox.redrive() == 3
+        scripts[REDRIVE_SCRIPT].assert_awaited_once_with(
+            keys=[WebhooksOutbox.DEAD_KEY, WebhooksOutbox.SCHEDULED_KEY], args=[1000.0, -1]
+        )
+
+
+class TestCaseOutboxWebhooksTransport:
+    async def test__call__delivered__not_added_to_outbox(self, transport, outbox, monitoring):
+        outbox_transport = OutboxWebhooksTransport(transport, outbox, monitoring)
+
+        await outbox_transport.call("http://localhost")
+
+        transport.call_once.assert_awaited_once_with("http://localhost")
+        outbox.add.assert_not_called()
+
+    async def test__call__failed__added_to_outbox(self, transport, outbox, monitoring):
+        transport.call_once.side_effect = Exception("error")
+        outbox.add.return_value = True
+        outbox_transport = OutboxWebhooksTransport(transport, outbox, monitoring)
+
+        await outbox_transport.call("http://localhost")
+
+        outbox.add.assert_awaited_once_with("http://localhost", "error", count_attempt=True)
+        monitoring.fire_webhooks_outbox_retries_count.assert_awaited_once()
+
+    async def test__call__circuit_open__added_to_outbox_without_attempt(self, transport, outbox, monitoring):
+        transport.call_once.side_effect = CircuitOpenError("localhost")
+        outbox.add.return_value = True
+        outbox_transport = OutboxWebhooksTransport(transport, outbox, monitoring)
+
+        await outbox_transport.call("http://localhost")
+
+        outbox.add.assert_awaited_once_with(
+            "http://localhost", "Circuit is open for host localhost", count_attempt=False
+        )
+
+
+class TestCaseOutboxScheduler:
+    async def test__process_due__delivered_and_failed__failed_rescheduled(self, transport, outbox, monitoring):
+        delivered = OutboxEntry(id="1", link="http://localhost/1", attempts=1)
+        failed = OutboxEntry(id="2", link="http://localhost/2", attempts=1)
+        outbox.requeue_expired.return_value = 0
+        outbox.claim_due.return_value = [delivered, failed]
+        outbox.reschedule.return_value = False
+        outbox.size.return_value = (0, 1)
+        transport.call_once.side_effect = [None, Exception("error")]
+        scheduler = OutboxScheduler(outbox, transport, monitoring)
+
+        await scheduler.process_due()
+
+        outbox.requeue_expired.assert_awaited_once()
+        outbox.ack.assert_awaited_once_with(delivered)
+        outbox.reschedule.assert_awaited_once_with(failed, "error", count_attempt=True)
+        # deliveries are counted by the transport
+        monitoring.fire_webhooks_count.assert_not_awaited()
+        monitoring.fire_webhooks_outbox_dead_letters_count.assert_awaited_once()
+        monitoring.fire_webhooks_outbox_size.assert_awaited_once_with(0, 1)
@@ -0,0 +1,87 @@
+import asyncio
+from unittest import mock
+
+import pytest
+
+from dbot.connectors.webhooks.queue import WebhooksDeliveryQueue
+from dbot.connectors.webhooks.transport import IWebhooksTransport
+from dbot.infrastructure.monitoring import Monitoring
+
+
+@pytest.fixture
+def transport():
+    return mock.AsyncMock(spec=IWebhooksTransport)
+
+
+@pytest.fixture
+def monitoring():
+    return mock.AsyncMock(spec=Monitoring)
+
+
+class TestCaseWebhooksDeliveryQueue:
+    async def test__call__started__delivered_by_worker(self, transport, monitoring):
+        queue = WebhooksDeliveryQueue(transport, monitoring, size=10, workers=2)
+        queue.start()
+
+        await queue.call("http://localhost/1")
+        await queue.call("http://localhost/2")
+        await queue.stop(drain=True)
+
+        assert transport.call.await_args_list == [mock.call("http://localhost/1"), mock.call("http://localhost/2")]
+        assert monitoring.fire_webhooks_queue_wait.await_count == 2
+
+    async def test__call__slow_receiver__does_not_block_caller(self, transport, monitoring):
+        released = asyncio.Event()
+
+        async def slow_call(link):
+            await released.wait()
+
+        transport.call.side_effect = slow_call
+        queue = WebhooksDeliveryQueue(transport, monitoring, size=10, workers=1)
+        queue.start()
+
+        await asyncio.wait_for(queue.call("http://localhost/1"), timeout=1)
+        await asyncio.wait_for(queue.call("http://localhost/2"), timeout=1)
+
+        released.set()
+        await queue.stop(drain=True)
+
+        assert transport.call.await_count == 2
+
+    async def test__call__queue_full__dropped(self, transport, monitoring):
+        queue = WebhooksDeliveryQueue(transport, monitoring, size=1, workers=1)
+
+        await queue.call("http://localhost/1")
+        await queue.call("http://localhost/2")
+
+        monitoring.fire_webhooks_dropped_count.assert_awaited_once()
+        monitoring.fire_webhooks_queue_depth.assert_awaited_once_with(1)
+
+    async def test__worker__transport_error__next_webhook_delivered(self, transport, monitoring):
+        transport.call.side_effect = [Exception("error"), None]
+        queue = WebhooksDeliveryQueue(transport, monitoring, size=10, workers=1)
+        queue.start()
+
+        await queue.call("http://localhost/1")
+        await queue.call("http://localhost/2")
+        await queue.stop(drain=True)
+
+        assert transport.call.await_count == 2
+
+    async def test__stop__no_drain__pending_webhooks_not_delivered(self, transport, monitoring):
+        queue = WebhooksDeliveryQueue(transport, monitoring, size=10, workers=1)
+
+        await queue.call("http://localhost/1")
+        queue.start()
+        await queue.stop(drain=False)
+
+        transport.call.assert_not_called()
+
+    async def test__worker__busy__utilization_reported(self, transport, monitoring):
+        queue = WebhooksDeliveryQueue(transport, monitoring, size=10, workers=2)
+        queue.start()
+
+        await queue.call("http://localhost/1")
+        await queue.stop(drain=True)
+
+        assert monitoring.fire_webhooks_workers_utilization.await_args_list == [mock.call(0.5), mock.call(0.0)]
@@ -0,0 +1,65 @@
+import pytest
+from jinja2 import Template
+
+from dbot.connectors.webhooks.templates import (
+    ConstantTemplate,
+    JinjaTemplate,
+    SubstitutionTemplate,
+    TemplateCompiler,
+)
+
+DATA = {"id": 1, "username": "test", "user_id": 2, "type": "new_user", "usernames_safe": "a%2Cb", "empty": None}
+
+
+class TestCaseTemplateCompiler:
+    @pytest.mark.parametrize(
+        "source, template_class",
+        [
+            ("http://localhost/hook", ConstantTemplate),
+            ("", ConstantTemplate),
+            ("http://localhost/hook?id={{id}}&un={{ username }}", SubstitutionTemplate),
+            ("{{id}}", SubstitutionTemplate),
+            ("http://localhost/hook?un={{ username|upper }}", JinjaTemplate),
+            ("http://localhost/hook?{% if id %}id={{id}}{% endif %}", JinjaTemplate),
+            ("http://localhost/hook?{# comment #}", JinjaTemplate),
+            ("http://localhost/hook?id={{id}}\n", JinjaTemplate),
+            ("http://localhost/hook?flag={{ true }}", JinjaTemplate),
+            ("http://localhost/hook?value={{none}}", JinjaTemplate),
+            ("http://localhost/hook?fn={{ range }}", JinjaTemplate),
+        ],
+    )
+    def test__compile__source__template_class(self, source, template_class):
+        compiler = TemplateCompiler()
+
+        template = compiler.compile(source)
+
+        assert isinstance(template, template_class)
+
+    @pytest.mark.parametrize(
+        "source",
+        [
+            "http://localhost/hook",
+            "http://localhost/hook?id={{id}}&un={{ username }}&uid={{user_id}}&event={{type}}",
+            "{{usernames_safe}}{{id}}",
+            "http://localhost/hook?missing={{missing}}&none={{empty}}",
+            "http://localhost/hook?un={{ username|upper }}",
+            "http://localhost/hook?id={{id}}&flag={{ true }}",
+            "http://localhost/hook?a={{ false }}&b={{ False }}&c={{ none }}&d={{ None }}&e={{ True }}",
+            "http://localhost/hook?fn={{ range }}",
+        ],
+    )
+    def test__render__source__same_as_jinja(self, source):
+        compiler = TemplateCompiler()
+
+        template = compiler.compile(source)
+
+        assert template.render(**DATA) == Template(source).render(**DATA)
+
+    def test__compile__same_source_twice__compiled_once(self):
+        compiler = TemplateCompiler()
+
+        first = compiler.compile("http://localhost/hook?id={{id}}")
+        second = compiler.compile("http://localhost/hook?id={{id}}")
+
+        assert first is second
+        assert len(compiler) == 1
@@ -0,0 +1,178 @@
+import asyncio
+from unittest import mock
+
+import pytest
+from aiohttp import ClientResponseError, web
+from aiohttp.test_utils import TestServer
+
+from dbot.connectors.webhooks.breaker import (
+    CircuitBreaker,
+    CircuitOpenError,
+    CircuitStateEnum,
+)
+from dbot.connectors.webhooks.transport import (
+    TransportConfiguration,
+    WebhooksTransport,
+    initialize_session,
+)
+from dbot.infrastructure.monitoring import Monitoring
+
+
+async def _webhook_handler(request: web.Request) -> web.Response:
+    return web.Response(text="ok" * 1000)
+
+
+async def _ingest_handler(request: web.Request) -> web.Response:
+    await request.json()
+    return web.Response()
+
+
+async def _slow_handler(request: web.Request) -> web.Response:
+    await asyncio.sleep(10)
+    return web.Response()
+
+
+async def _failing_handler(request: web.Request) -> web.Response:
+    return web.Response(status=503)
+
+
+_flaky_calls: list[web.Request] = []
+
+
+async def _flaky_handler(request: web.Request) -> web.Response:
+    _flaky_calls.append(request)
+    return web.Response(status=503 if len(_flaky_calls) == 1 else 200)
+
+
+@pytest.fixture
+async def server():
+    _flaky_calls.clear()
+    app = web.Application()
+    app.router.add_get("/webhook", _webhook_handler)
+    app.router.add_get("/failing", _failing_handler)
+    app.router.add_get("/slow", _slow_handler)
+    app.router.add_post("/ingest", _ingest_handler)
+    app.router.add_post("/flaky", _flaky_handler)
+    app.router.add_post("/failing", _failing_handler)
+    server = TestServer(app)
+    await server.start_server()
+    yield server
+    await server.close()
+
+
+@pytest.fixture
+def monitoring():
+    return mock.AsyncMock(spec=Monitoring)
+
+
+class TestCaseWebhooksTransport:
+    async def test__call__two_calls_to_same_host__connection_reused(self, server, monitoring):
+        session = await initialize_session(TransportConfiguration(), monitoring)
+        transport = WebhooksTransport(session, raise_errors=True)
+
+        await transport.call(str(server.make_url("/webhook")))
+        await transport.call(str(server.make_url("/webhook")))
+        await session.close()
+
+        monitoring.fire_webhooks_connections_created_count.assert_awaited_once()
+        monitoring.fire_webhooks_connections_reused_count.assert_awaited_once()
+        assert monitoring.fire_webhooks_connections_active.await_args_list == [
+            mock.call(1),
+            mock.call(0),
+            mock.call(1),
+            mock.call(0),
+        ]
+
+    async def test__call__delivered_and_failed__only_delivered_counted(self, server, monitoring):
+        session = await initialize_session()
+        transport = WebhooksTransport(session, monitoring=monitoring)
+
+        await transport.call(str(server.make_url("/webhook")))
+        with pytest.raises(ClientResponseError):
+            await transport.call_once(str(server.make_url("/failing")))
+        await session.close()
+
+        monitoring.fire_webhooks_count.assert_awaited_once()
+
+    async def test__initialize_session__config__connector_limits_applied(self):
+        config = TransportConfiguration(connections_limit=20, connections_limit_per_host=2)
+
+        session = await initialize_session(config)
+        connector = session.connector
+        await session.close()
+
+        assert connector.limit == 20
+        assert connector.limit_per_host == 2
+
+    async def test__call_once__host_failing__circuit_opened_and_calls_skipped(self, server, monitoring):
+        session = await initialize_session(TransportConfiguration(), monitoring)
+        transport = WebhooksTransport(session, breaker=CircuitBreaker(monitoring, failure_threshold=2))
+
+        for _ in range(2):
+            with pytest.raises(ClientResponseError):
+                await transport.call_once(str(server.make_url("/failing")))
+        with pytest.raises(CircuitOpenError):
+            await transport.call_once(str(server.make_url("/webhook")))
+        await session.close()
+
+        assert monitoring.fire_webhooks_connections_active.await_count == 4
+
+    @mock.patch("dbot.connectors.webhooks.transport.capture_exception")
+    async def test__call__circuit_open__not_retried_and_not_reported(self, capture_exception, server, monitoring):
+        session = await initialize_session()
+        breaker = CircuitBreaker(monitoring, failure_threshold=1)
+        transport = WebhooksTransport(session, breaker=breaker)
+        await breaker.record_failure(server.host)
+
+        await transport.call(str(server.make_url("/webhook")))
+        await session.close()
+
+        capture_exception.assert_not_called()
+        assert transport._call.statistics["attempt_number"] == 1
+
+    async def test__call_once__half_open_probe_cancelled__next_probe_allowed(self, server, monitoring):
+        session = await initialize_session()
+        breaker = CircuitBreaker(monitoring, failure_threshold=1, recovery_timeout=0)
+        transport = WebhooksTransport(session, breaker=breaker)
+        await breaker.record_failure(server.host)
+
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(transport.call_once(str(server.make_url("/slow"))), 0.1)
+        assert breaker.state(server.host) == CircuitStateEnum.OPEN
+
+        await transport.call_once(str(server.make_url("/webhook")))
+        await session.close()
+
+        assert breaker.state(server.host) == CircuitStateEnum.CLOSED
+
+    async def test__post_json__body__posted_as_json(self, server):
+        session = await initialize_session()
+        transport = WebhooksTransport(session, raise_errors=True)
+
+        with mock.patch.object(session, "post", wraps=session.post) as post:
+            await transport.post_json(str(server.make_url("/ingest")), '[{"id":1}]')
+        await session.close()
+
+        post.assert_called_once_with(
+            str(server.make_url("/ingest")), data='[{"id":1}]', headers={"Content-Type": "application/json"}
+        )
+
+    async def test__post_json__failed_once_without_raising_errors__retried(self, server):
+        session = await initialize_session()
+        transport = WebhooksTransport(session, raise_errors=False)
+
+        await transport.post_json(str(server.make_url("/flaky")), "[]")
+        await session.close()
+
+        assert len(_flaky_calls) == 2
+
+    @mock.patch("dbot.connectors.webhooks.transport.capture_exception")
+    async def test__post_json__all_attempts_failed__reported_once_and_not_raised(self, capture_exception, server):
+        session = await initialize_session()
+        transport = WebhooksTransport(session, raise_errors=False)
+
+        await transport.post_json(str(server.make_url("/failing")), "[]")
+        await session.close()
+
+        assert transport._post_with_retries.statistics["attempt_number"] == 3
+        capture_exception.assert_called_once()
@@ -0,0 +1,109 @@
+from unittest import mock
+
+import discord
+
+from dbot.dscrd.client import DiscordClient, ShardedDiscordClient, gateway_options
+from dbot.dscrd.snapshots import SnapshotHandoff
+from dbot.infrastructure.monitoring import Monitoring
+from dbot.services import ActivityProcessingService
+
+
+def _voice_state(channel_id: int | None) -> mock.Mock:
+    state = mock.Mock(spec=discord.VoiceState)
+    if channel_id is None:
+        state.channel = None
+    else:
+        state.channel = mock.Mock(id=channel_id)
+    return state
+
+
+class TestCaseDiscordClient:
+    def test__get_changed_channels__user_joined__joined_channel_returned(self):
+        channels = DiscordClient._get_changed_channels(_voice_state(None), _voice_state(1))
+
+        assert channels == {1}
+
+    def test__get_changed_channels__user_left__left_channel_returned(self):
+        channels = DiscordClient._get_changed_channels(_voice_state(1), _voice_state(None))
+
+        assert channels == {1}
+
+    def test__get_changed_channels__user_moved__both_channels_returned(self):
+        channels = DiscordClient._get_changed_channels(_voice_state(1), _voice_state(2))
+
+        assert channels == {1, 2}
+
+    def test__get_changed_channels__same_channel__nothing_returned(self):
+        channels = DiscordClient._get_changed_channels(_voice_state(1), _voice_state(1))
+
+        assert channels == set()
+
+    async def test__on_ready__worker_running__second_worker_not_started(self):
+        client = mock.Mock(spec=DiscordClient)
+        client._background_worker = None
+        client.loop = mock.Mock()
+        client.background_worker = mock.Mock()
+
+        await DiscordClient.on_ready(client)
+        client.loop.create_task.return_value.done.return_value = False
+        await DiscordClient.on_ready(client)
+
+        client.loop.create_task.assert_called_once()
+
+    def test__gateway_options__lean__only_voice_members_cached(self):
+        options = gateway_options(lean=True)
+
+        assert options["intents"] == discord.Intents(guilds=True, voice_states=True)
+        assert options["member_cache_flags"] == discord.MemberCacheFlags(voice=True, joined=False)
+        assert options["max_messages"] is None
+        assert options["chunk_guilds_at_startup"] is False
+
+
+def _guild_channel(guild_id: int, shard_count: int) -> mock.Mock:
+    channel = mock.Mock(spec=discord.VoiceChannel)
+    channel.guild = mock.Mock(shard_id=(guild_id >> 22) % shard_count)
+    return channel
+
+
+class TestCaseShardedDiscordClient:
+    def test__local_channels__shard_ids_set__channels_of_other_shards_skipped(self):
+        client = ShardedDiscordClient(
+            mock.Mock(), mock.Mock(), mock.AsyncMock(spec=Monitoring), shard_count=4, shard_ids=[1]
+        )
+        guilds = {10: 1 << 22, 20: 2 << 22, 30: 5 << 22}
+        channels = {channel_id: _guild_channel(guild_id, 4) for channel_id, guild_id in guilds.items()}
+
+        with mock.patch.object(client, "get_channel", side_effect=channels.get):
+            assert client.local_channels({10, 20, 30, 40}) == {10, 30}
+
+    async def test__report_shards__shards_connected__latency_and_health_reported(self):
+        monitoring = mock.AsyncMock(spec=Monitoring)
+        client = ShardedDiscordClient(mock.Mock(), mock.Mock(), monitoring, shard_count=2)
+        shards = {
+            0: mock.Mock(latency=0.05, is_closed=mock.Mock(return_value=False)),
+            1: mock.Mock(latency=float("inf"), is_closed=mock.Mock(return_value=True)),
+        }
+
+        with mock.patch.object(ShardedDiscordClient, "shards", shards):
+            await client.report_shards()
+
+        monitoring.fire_shard_latency.assert_called_once_with(0, 0.05)
+        monitoring.fire_shard_up.assert_has_calls([mock.call(0, True), mock.call(1, False)])
+
+
+class TestCaseDiscordClientHandoff:
+    async def test__process__handoff__snapshot_passed_instead_of_processing(self):
+        processing_service = mock.AsyncMock(spec=ActivityProcessingService)
+        processing_service.channels = {1}
+        handoff = mock.Mock(spec=SnapshotHandoff)
+        client = DiscordClient(processing_service, mock.Mock(), handoff=handoff)
+
+        with mock.patch.object(client, "get_channel", return_value=None):
+            await client._process(1000, [990])
+
+        snapshot = handoff.put.call_args.args[0]
+        assert snapshot.members == {1: None}
+        assert snapshot.tick == 1000
+        assert snapshot.skipped == [990]
+        processing_service.register_client.assert_not_called()
+        processing_service.process.assert_not_called()
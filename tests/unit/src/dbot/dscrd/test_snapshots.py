@@ -0,0 +1,159 @@
+import asyncio
+import threading
+import time
+from unittest import mock
+
+import pytest
+
+from dbot.dscrd.snapshots import (
+    MembersSnapshot,
+    SnapshotDiscordClient,
+    SnapshotHandoff,
+    SnapshotProcessor,
+)
+from dbot.infrastructure.monitoring import Monitoring
+from dbot.model import User
+from dbot.services import ActivityProcessingService
+
+USER = User(id=1, username="user")
+
+
+@pytest.fixture
+def monitoring():
+    return mock.AsyncMock(spec=Monitoring)
+
+
+@pytest.fixture
+def processing_service():
+    return mock.AsyncMock(spec=ActivityProcessingService)
+
+
+class TestCaseSnapshotHandoff:
+    async def test__put__from_other_thread__snapshot_received(self):
+        handoff = SnapshotHandoff(asyncio.get_running_loop())
+        snapshot = MembersSnapshot(members={1: [USER]}, created_at=time.monotonic(), tick=1000)
+
+        thread = threading.Thread(target=handoff.put, args=(snapshot,))
+        thread.start()
+        thread.join()
+
+        assert await asyncio.wait_for(handoff.get(), 1) is snapshot
+
+    async def test__put__tick_pending__newest_tick_kept(self):
+        handoff = SnapshotHandoff(asyncio.get_running_loop())
+
+        handoff.put(MembersSnapshot(members={1: [], 2: []}, created_at=0, tick=1000))
+        handoff.put(MembersSnapshot(members={1: [USER]}, created_at=1, tick=1010, skipped=[1005]))
+        await asyncio.sleep(0)
+
+        snapshot = await handoff.get()
+        assert snapshot.tick == 1010
+        assert snapshot.skipped == [1000, 1005]
+        assert snapshot.members == {1: [USER]}
+        assert snapshot.coalesced == 1
+        assert snapshot.created_at == 0
+        assert handoff._pending is None
+
+    async def test__put__changed_after_tick__merged_into_tick(self):
+        handoff = SnapshotHandoff(asyncio.get_running_loop())
+
+        handoff.put(MembersSnapshot(members={1: [], 2: []}, created_at=0, tick=1000))
+        handoff.put(MembersSnapshot(members={2: [USER]}, created_at=1))
+        await asyncio.sleep(0)
+
+        snapshot = await handoff.get()
+        assert snapshot.tick == 1000
+        assert snapshot.members == {1: [], 2: [USER]}
+        assert snapshot.changed_channels == {2}
+        assert snapshot.coalesced == 0
+
+    async def test__put__tick_after_changed__changed_channels_kept(self):
+        handoff = SnapshotHandoff(asyncio.get_running_loop())
+
+        handoff.put(MembersSnapshot(members={2: [USER]}, created_at=0))
+        handoff.put(MembersSnapshot(members={3: []}, created_at=1))
+        handoff.put(MembersSnapshot(members={1: [], 2: [], 3: [USER]}, created_at=2, tick=1000))
+        await asyncio.sleep(0)
+
+        snapshot = await handoff.get()
+        assert snapshot.tick == 1000
+        assert snapshot.members == {1: [], 2: [], 3: [USER]}
+        assert snapshot.changed_channels == {2, 3}
+        assert snapshot.coalesced == 0
+
+
+class TestCaseSnapshotDiscordClient:
+    def test__update__tick_snapshot__members_replaced(self):
+        client = SnapshotDiscordClient()
+        client.update(MembersSnapshot(members={1: [USER], 2: []}, created_at=0, tick=1000))
+
+        client.update(MembersSnapshot(members={2: [USER]}, created_at=0, tick=1010))
+
+        assert client.get_channel_members(1) is None
+        assert client.get_channel_members(2) == [USER]
+        assert client.local_channels({1, 2}) == {2}
+
+    def test__update__changed_snapshot__members_merged(self):
+        client = SnapshotDiscordClient()
+        client.update(MembersSnapshot(members={1: [USER], 2: []}, created_at=0, tick=1000))
+
+        client.update(MembersSnapshot(members={2: [USER]}, created_at=0))
+
+        assert client.get_channel_members(1) == [USER]
+        assert client.get_channel_members(2) == [USER]
+
+
+class TestCaseSnapshotProcessor:
+    async def test__process__tick_snapshot__all_channels_processed(self, processing_service, monitoring):
+        processor = SnapshotProcessor(SnapshotHandoff(asyncio.get_running_loop()), processing_service, monitoring)
+
+        await processor.process(
+            MembersSnapshot(members={1: [USER]}, created_at=time.monotonic(), tick=1000, skipped=[990])
+        )
+
+        processing_service.register_client.assert_called_once_with(processor.discord_client)
+        processing_service.process.assert_called_once_with(1000, [990])
+        processing_service.process_changed.assert_not_called()
+        assert processor.discord_client.get_channel_members(1) == [USER]
+        monitoring.fire_snapshot_handoff.assert_called_once()
+        monitoring.fire_tick_overrun.assert_not_called()
+
+    async def test__process__changed_snapshot__changed_channels_processed(self, processing_service, monitoring):
+        processor = SnapshotProcessor(SnapshotHandoff(asyncio.get_running_loop()), processing_service, monitoring)
+
+        await processor.process(MembersSnapshot(members={1: [USER]}, created_at=time.monotonic()))
+
+        processing_service.process_changed.assert_called_once_with({1})
+        processing_service.process.assert_not_called()
+
+    async def test__run__slow_processing__pending_ticks_coalesced(self, processing_service, monitoring):
+        handoff = SnapshotHandoff(asyncio.get_running_loop())
+        processor = SnapshotProcessor(handoff, processing_service, monitoring)
+        release = asyncio.Event()
+        started = asyncio.Event()
+
+        async def process(tick, skipped):
+            started.set()
+            if tick == 1000:
+                await release.wait()
+
+        processing_service.process.side_effect = process
+        processor.start()
+
+        handoff.put(MembersSnapshot(members={1: []}, created_at=time.monotonic(), tick=1000))
+        await asyncio.wait_for(started.wait(), 1)
+        for tick in (1010, 1020, 1030):
+            handoff.put(MembersSnapshot(members={1: [USER]}, created_at=time.monotonic(), tick=tick))
+        handoff.put(MembersSnapshot(members={2: [USER]}, created_at=time.monotonic()))
+        await asyncio.sleep(0)
+        release.set()
+        for _ in range(10):
+            await asyncio.sleep(0)
+        await processor.stop()
+
+        assert processing_service.process.call_args_list == [
+            mock.call(1000, []),
+            mock.call(1030, [1010, 1020]),
+        ]
+        processing_service.process_changed.assert_called_once_with({2})
+        monitoring.fire_tick_overrun.assert_called_once_with(2)
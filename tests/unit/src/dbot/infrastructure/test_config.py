@@ -0,0 +1,19 @@
+import pytest
+from pydantic import ValidationError
+
+from dbot.infrastructure.config import DiscordConfig
+
+
+class TestCaseDiscordConfig:
+    def test__init__shard_ids_with_shard_count__accepted(self):
+        config = DiscordConfig(sharded=True, shard_count=4, shard_ids=[0, 1])
+
+        assert config.shard_ids == [0, 1]
+
+    def test__init__shard_ids_without_shard_count__rejected(self):
+        with pytest.raises(ValidationError, match="shard_count is required"):
+            DiscordConfig(sharded=True, shard_ids=[0, 1])
+
+    def test__init__shard_id_out_of_range__rejected(self):
+        with pytest.raises(ValidationError, match="between 0 and shard_count - 1"):
+            DiscordConfig(sharded=True, shard_count=2, shard_ids=[2])
@@ -0,0 +1,66 @@
+import pytest
+
+from dbot.model import User
+from dbot.storage.codecs import (
+    CodecError,
+    CompactChannelStateCodec,
+    JSONChannelStateCodec,
+)
+from dbot.storage.state import ChannelState
+
+
+@pytest.fixture
+def state():
+    return ChannelState(
+        id=1234567890123456789,
+        ts=100,
+        users=[
+            User(id=2, username="test"),
+            User(id=987654321098765432, username="юзер"),
+            User(id=3, username=""),
+        ],
+    )
+
+
+class TestCaseJSONChannelStateCodec:
+    def test__encode__state_encoded_as_json(self, state):
+        codec = JSONChannelStateCodec()
+
+        assert codec.encode(ChannelState(id=1, ts=100, users=[User(id=2, username="test")])) == (
+            '{"id":1,"ts":100,"users":[{"username":"test","id":2}]}'
+        )
+
+    def test__key__v2_key(self):
+        assert JSONChannelStateCodec().key(1) == "channel_v2_1"
+
+
+class TestCaseCompactChannelStateCodec:
+    def test__decode__encoded_state__same_state(self, state):
+        codec = CompactChannelStateCodec()
+
+        assert codec.decode(codec.encode(state)) == state
+
+    def test__decode__empty_channel__same_state(self):
+        codec = CompactChannelStateCodec()
+        state = ChannelState(id=1, ts=100, users=[])
+
+        assert codec.decode(codec.encode(state)) == state
+
+    def test__encode__smaller_than_json(self, state):
+        assert len(CompactChannelStateCodec().encode(state)) < len(JSONChannelStateCodec().encode(state))
+
+    def test__decode__truncated_data__error_raised(self, state):
+        codec = CompactChannelStateCodec()
+
+        with pytest.raises(CodecError):
+            codec.decode(codec.encode(state)[:30])
+
+    def test__decode__unknown_version__error_raised(self, state):
+        codec = CompactChannelStateCodec()
+        data = codec.encode(state)
+
+        with pytest.raises(CodecError):
+            codec.decode(b"\x02" + data[1:])
+
+    def test__key__v3_key(self):
+        assert CompactChannelStateCodec().key(1) == "channel_v3_1"
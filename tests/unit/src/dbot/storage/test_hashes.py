@@ -0,0 +1,88 @@
+from unittest import mock
+
+import pytest
+from redis.asyncio import Redis
+
+from dbot.model import User
+from dbot.model.channel import Channel
+from dbot.storage.hashes import HashChannelStateStorage
+from dbot.storage.state import ChannelState
+
+
+@pytest.fixture
+def pipeline():
+    pipeline = mock.MagicMock()
+    pipeline.execute = mock.AsyncMock()
+    return pipeline
+
+
+@pytest.fixture
+def redis_client(pipeline):
+    redis = mock.AsyncMock(spec=Redis)
+    redis.pipeline.return_value.__aenter__.return_value = pipeline
+    return redis
+
+
+@pytest.fixture
+def storage(redis_client):
+    return HashChannelStateStorage(redis_client)
+
+
+class TestCaseHashChannelStateStorage:
+    async def test__save_many__no_previous_state__hash_rewritten(self, storage, pipeline):
+        channel = Channel(id=1, users=[User(id=2, username="test")], previous_state=None)
+
+        await storage.save_many([channel], ts=100)
+
+        pipeline.delete.assert_called_once_with("channel_hash_1")
+        pipeline.hset.assert_called_once_with("channel_hash_1", mapping={"ts": 100, "2": "test"})
+        pipeline.execute.assert_awaited_once()
+
+    async def test__save_many__users_joined_and_left__only_delta_written(self, storage, pipeline):
+        channel = Channel(
+            id=1,
+            users=[User(id=2, username="test"), User(id=4, username="test_4")],
+            previous_state=Channel(id=1, users=[User(id=2, username="test"), User(id=3, username="test_3")]),
+        )
+
+        await storage.save_many([channel], ts=100)
+
+        pipeline.delete.assert_not_called()
+        pipeline.hdel.assert_called_once_with("channel_hash_1", "3")
+        pipeline.hset.assert_called_once_with("channel_hash_1", mapping={"ts": 100, "4": "test_4"})
+
+    async def test__save_many__users_not_changed__only_timestamp_written(self, storage, pipeline):
+        users = [User(id=2, username="test")]
+        channel = Channel(id=1, users=users, previous_state=Channel(id=1, users=users))
+
+        await storage.save_many([channel], ts=100)
+
+        pipeline.hdel.assert_not_called()
+        pipeline.hset.assert_called_once_with("channel_hash_1", mapping={"ts": 100})
+
+    async def test__save_many__user_renamed__username_written(self, storage, pipeline):
+        channel = Channel(
+            id=1,
+            users=[User(id=2, username="renamed")],
+            previous_state=Channel(id=1, users=[User(id=2, username="test")]),
+        )
+
+        await storage.save_many([channel], ts=100)
+
+        pipeline.hset.assert_called_once_with("channel_hash_1", mapping={"ts": 100, "2": "renamed"})
+
+    async def test__load_many__hashes_loaded_in_one_pipeline(self, storage, pipeline):
+        pipeline.execute.return_value = [{b"ts": b"100", b"2": b"test"}, {b"ts": b"100"}, {}]
+
+        states = await storage.load_many([1, 3, 5])
+
+        assert pipeline.hgetall.call_args_list == [
+            mock.call("channel_hash_1"),
+            mock.call("channel_hash_3"),
+            mock.call("channel_hash_5"),
+        ]
+        assert states == {
+            1: ChannelState(id=1, ts=100, users=[User(id=2, username="test")]),
+            3: ChannelState(id=3, ts=100, users=[]),
+            5: None,
+        }
@@ -0,0 +1,59 @@
+from unittest import mock
+
+import pytest
+from redis.asyncio import Redis
+
+from dbot.model import User
+from dbot.storage.lua import LuaChannelStateStorage
+from dbot.storage.state import StateTransition
+
+
+@pytest.fixture
+def pipeline():
+    pipeline = mock.MagicMock()
+    pipeline.execute = mock.AsyncMock()
+    return pipeline
+
+
+@pytest.fixture
+def script():
+    return mock.AsyncMock()
+
+
+@pytest.fixture
+def redis_client(pipeline, script):
+    redis = mock.AsyncMock(spec=Redis)
+    redis.pipeline.return_value.__aenter__.return_value = pipeline
+    redis.register_script.return_value = script
+    return redis
+
+
+@pytest.fixture
+def storage(redis_client):
+    return LuaChannelStateStorage(redis_client)
+
+
+class TestCaseLuaChannelStateStorage:
+    async def test__swap_many__script_called_for_every_channel_in_one_pipeline(self, storage, pipeline, script):
+        pipeline.execute.return_value = [[0, [], []], [1, [], []]]
+
+        await storage.swap_many({1: [User(id=2, username="test")], 3: []}, ts=100, lifetime=3600)
+
+        assert script.call_args_list == [
+            mock.call(keys=["channel_hash_1"], args=[100, 3600, "2", "test"], client=pipeline),
+            mock.call(keys=["channel_hash_3"], args=[100, 3600], client=pipeline),
+        ]
+        pipeline.execute.assert_awaited_once()
+
+    async def test__swap_many__script_result__transitions_decoded(self, storage, pipeline):
+        pipeline.execute.return_value = [[1, [b"4"], [b"3", b"test_3"]]]
+
+        transitions = await storage.swap_many({1: [User(id=2, username="test")]}, ts=100, lifetime=3600)
+
+        assert transitions == {
+            1: StateTransition(
+                previous_exists=True,
+                joined_ids={4},
+                left=[User(id=3, username="test_3")],
+            )
+        }
@@ -0,0 +1,21 @@
+from dbot.model import User
+from dbot.model.channel import Channel
+from dbot.storage.state import StateTransition
+
+
+class TestCaseStateTransition:
+    def test__to_previous_state__users_joined_and_left__previous_users_restored(self):
+        transition = StateTransition(
+            previous_exists=True,
+            joined_ids={3},
+            left=[User(id=4, username="test_4")],
+        )
+
+        previous_state = transition.to_previous_state(1, [User(id=2, username="test_2"), User(id=3, username="test_3")])
+
+        assert previous_state == Channel(id=1, users=[User(id=2, username="test_2"), User(id=4, username="test_4")])
+
+    def test__to_previous_state__previous_state_not_exists__none(self):
+        transition = StateTransition(previous_exists=False, joined_ids={2}, left=[])
+
+        assert transition.to_previous_state(1, [User(id=2, username="test_2")]) is None
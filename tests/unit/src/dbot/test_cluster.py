@@ -0,0 +1,180 @@
+import collections
+from unittest import mock
+
+import pytest
+
+from dbot.cluster import ClusterMembership, HashRing
+from dbot.infrastructure.monitoring import Monitoring
+
+CHANNELS = set(range(1000))
+
+
+@pytest.fixture
+def pipeline():
+    pipeline = mock.MagicMock()
+    pipeline.execute = mock.AsyncMock()
+    return pipeline
+
+
+@pytest.fixture
+def redis_client(pipeline):
+    redis_client = mock.AsyncMock()
+    redis_client.pipeline = mock.MagicMock()
+    redis_client.pipeline.return_value.__aenter__.return_value = pipeline
+    redis_client.time.return_value = (1000, 500000)
+    return redis_client
+
+
+@pytest.fixture
+def monitoring():
+    return mock.AsyncMock(spec=Monitoring)
+
+
+class TestCaseHashRing:
+    def test__owner__no_nodes__none(self):
+        assert HashRing([]).owner(1) is None
+
+    def test__owner__three_nodes__channels_spread_between_all(self):
+        ring = HashRing(["a", "b", "c"])
+
+        owners = collections.Counter(ring.owner(channel_id) for channel_id in CHANNELS)
+
+        assert set(owners) == {"a", "b", "c"}
+        assert min(owners.values()) > 200
+
+    def test__owner__node_joined__only_channels_of_new_node_moved(self):
+        before = HashRing(["a", "b", "c"])
+        after = HashRing(["a", "b", "c", "d"])
+
+        moved = [channel_id for channel_id in CHANNELS if before.owner(channel_id) != after.owner(channel_id)]
+
+        assert moved
+        assert all(after.owner(channel_id) == "d" for channel_id in moved)
+
+
+class TestCaseClusterMembership:
+    async def test__heartbeat__single_node__all_channels_owned(self, redis_client, pipeline, monitoring):
+        pipeline.execute.return_value = [1, 0, [b"a"]]
+        membership = ClusterMembership(redis_client, "a", CHANNELS, monitoring)
+
+        await membership.heartbeat()
+
+        assert membership.owned_channels == CHANNELS
+        monitoring.fire_owned_channels.assert_awaited_once_with("a", len(CHANNELS))
+
+    async def test__heartbeat__node_joined__channels_shared_after_grace_period(
+        self, redis_client, pipeline, monitoring
+    ):
+        gained = []
+        membership_a = ClusterMembership(redis_client, "a", CHANNELS, monitoring, node_ttl=15)
+        membership_b = ClusterMembership(redis_client, "b", CHANNELS, monitoring, node_ttl=15)
+        membership_b.on_gained(gained.append)
+
+        with mock.patch("dbot.cluster.time.monotonic", return_value=100):
+            pipeline.execute.return_value = [1, 0, [b"a"]]
+            await membership_a.heartbeat()
+            pipeline.execute.return_value = [1, 0, [b"a", b"b"]]
+            await membership_b.heartbeat()
+
+            # a has not seen b yet, so b does not process the channels it was assigned
+            assert membership_a.owned_channels == CHANNELS
+            assert membership_b.owned_channels == set()
+            assert gained == []
+
+        with mock.patch("dbot.cluster.time.monotonic", return_value=105):
+            await membership_a.heartbeat()
+            await membership_b.heartbeat()
+
+            assert not membership_a.owned_channels & set(membership_b.pending_channels)
+            assert membership_b.owned_channels == set()
+
+        with mock.patch("dbot.cluster.time.monotonic", return_value=115):
+            await membership_a.heartbeat()
+            await membership_b.heartbeat()
+
+        assert membership_a.owned_channels | membership_b.owned_channels == CHANNELS
+        assert not membership_a.owned_channels & membership_b.owned_channels
+        assert gained == [membership_b.owned_channels]
+
+    async def test__heartbeat__other_node_expired__channels_taken_over_at_once(
+        self, redis_client, pipeline, monitoring
+    ):
+        membership = ClusterMembership(redis_client, "a", CHANNELS, monitoring)
+        pipeline.execute.return_value = [1, 0, [b"a", b"b"]]
+        await membership.heartbeat()
+        assert membership.owned_channels == set()
+
+        pipeline.execute.return_value = [1, 1, [b"a"]]
+        await membership.heartbeat()
+
+        assert membership.owned_channels == CHANNELS
+
+    async def test__heartbeat__same_nodes__not_rebalanced(self, redis_client, pipeline, monitoring):
+        pipeline.execute.return_value = [1, 0, [b"a"]]
+        membership = ClusterMembership(redis_client, "a", CHANNELS, monitoring)
+
+        await membership.heartbeat()
+        await membership.heartbeat()
+
+        monitoring.fire_owned_channels.assert_awaited_once()
+
+    async def test__heartbeat__redis_time_used_for_score(self, redis_client, pipeline, monitoring):
+        pipeline.execute.return_value = [1, 0, [b"a"]]
+        membership = ClusterMembership(redis_client, "a", CHANNELS, monitoring, node_ttl=15)
+
+        with mock.patch("dbot.cluster.time.time", return_value=5000):
+            await membership.heartbeat()
+
+        pipeline.zadd.assert_called_once_with(ClusterMembership.NODES_KEY, {"a": 1000.5})
+        pipeline.zremrangebyscore.assert_called_once_with(ClusterMembership.NODES_KEY, "-inf", 985.5)
+
+    async def test__owns__heartbeat_failing_longer_than_ttl__channels_released(
+        self, redis_client, pipeline, monitoring
+    ):
+        pipeline.execute.return_value = [1, 0, [b"a"]]
+        membership = ClusterMembership(redis_client, "a", CHANNELS, monitoring, node_ttl=15)
+        with mock.patch("dbot.cluster.time.monotonic", return_value=100):
+            await membership.heartbeat()
+
+        redis_client.time.side_effect = ConnectionError
+        with mock.patch("dbot.cluster.time.monotonic", return_value=110):
+            with pytest.raises(ConnectionError):
+                await membership.heartbeat()
+
+            assert membership.owns(1)
+
+        with mock.patch("dbot.cluster.time.monotonic", return_value=115):
+            assert not membership.owns(1)
+            assert membership.owned() == set()
+            assert membership.pending_channels == {}
+
+    async def test__heartbeat__recovered_after_expiry__channels_taken_after_grace_period(
+        self, redis_client, pipeline, monitoring
+    ):
+        pipeline.execute.return_value = [1, 0, [b"a", b"b"]]
+        membership = ClusterMembership(redis_client, "a", CHANNELS, monitoring, node_ttl=15)
+        with mock.patch("dbot.cluster.time.monotonic", return_value=100):
+            await membership.heartbeat()
+        with mock.patch("dbot.cluster.time.monotonic", return_value=115):
+            await membership.heartbeat()
+        assigned = membership.owned_channels
+        assert assigned
+
+        with mock.patch("dbot.cluster.time.monotonic", return_value=130):
+            assert membership.owned() == set()
+            await membership.heartbeat()
+
+            assert membership.owned() == set()
+            assert set(membership.pending_channels) == assigned
+
+        with mock.patch("dbot.cluster.time.monotonic", return_value=145):
+            await membership.heartbeat()
+
+            assert membership.owned() == assigned
+
+    async def test__stop__node_removed_from_cluster(self, redis_client, monitoring):
+        membership = ClusterMembership(redis_client, "a", CHANNELS, monitoring)
+
+        await membership.stop()
+
+        redis_client.zrem.assert_awaited_once_with(ClusterMembership.NODES_KEY, "a")
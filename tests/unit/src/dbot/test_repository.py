@@ -5,18 +5,33 @@ import pytest
 from redis.asyncio import Redis
 
 from dbot.dscrd.client import DiscordClient
+from dbot.infrastructure.monitoring import Monitoring
 from dbot.model import User
 from dbot.model.channel import Channel
-from dbot.repository import Repository
+from dbot.repository import ChannelStateCache, Repository
+from dbot.storage.abstract import IAtomicChannelStateStorage
+from dbot.storage.blob import BlobChannelStateStorage
+from dbot.storage.codecs import CompactChannelStateCodec, JSONChannelStateCodec
+from dbot.storage.state import ChannelState, StateTransition
 
 
 @pytest.fixture
 def redis_client():
     redis = mock.AsyncMock(spec=Redis)
     redis.set = mock.AsyncMock()
+
+    pipeline = mock.MagicMock()
+    pipeline.execute = mock.AsyncMock()
+    redis.pipeline.return_value.__aenter__.return_value = pipeline
+
     return redis
 
 
+@pytest.fixture
+def pipeline(redis_client):
+    return redis_client.pipeline.return_value.__aenter__.return_value
+
+
 @pytest.fixture
 def discord_client():
     return mock.AsyncMock(spec=DiscordClient)
@@ -27,6 +42,16 @@ def repository(redis_client, discord_client):
     return Repository(redis_client=redis_client, discord_client=discord_client)
 
 
+@pytest.fixture
+def monitoring():
+    return mock.AsyncMock(spec=Monitoring)
+
+
+@pytest.fixture
+def cached_repository(redis_client, discord_client, monitoring):
+    return Repository(redis_client=redis_client, discord_client=discord_client, cache=ChannelStateCache(monitoring))
+
+
 class TestCaseRepository:
     async def test__save__state_and_key_passed_correctly(self, repository, redis_client):
         user = User(
@@ -89,3 +114,209 @@ class TestCaseRepository:
             channel = await repository.get(1)
 
         assert channel is None
+
+    async def test__save_many__states_written_in_one_pipeline(self, repository, redis_client, pipeline):
+        channels = [
+            Channel(users=[User(id=2, username="test")], id=1),
+            Channel(users=[], id=3),
+        ]
+
+        with patch("dbot.repository._get_timestamp") as timestamp_mock:
+            timestamp_mock.return_value = 100
+            await repository.save_many(channels)
+
+        redis_client.pipeline.assert_called_once_with(transaction=False)
+        assert pipeline.set.call_args_list == [
+            mock.call("channel_v2_1", '{"id":1,"ts":100,"users":[{"username":"test","id":2}]}'),
+            mock.call("channel_v2_3", '{"id":3,"ts":100,"users":[]}'),
+        ]
+        pipeline.execute.assert_awaited_once()
+
+    async def test__save_many__no_channels__nothing_written(self, repository, redis_client):
+        await repository.save_many([])
+
+        redis_client.pipeline.assert_not_called()
+
+    async def test__get_many__states_loaded_with_one_mget(self, repository, redis_client, discord_client):
+        previous_state = '{"id": 1, "ts": 100, "users": [{"username": "test", "id": 2}]}'
+        redis_client.mget = mock.AsyncMock(return_value=[previous_state, None])
+        discord_client.get_channel_members = mock.Mock(side_effect=[[], None, [User(username="test_2", id=3)]])
+
+        with patch("dbot.repository._get_timestamp") as timestamp_mock:
+            timestamp_mock.return_value = 100
+            channels = await repository.get_many([1, 2, 3])
+
+        redis_client.mget.assert_called_once_with(["channel_v2_1", "channel_v2_3"])
+        assert channels == [
+            Channel(id=1, users=[], previous_state=Channel(id=1, users=[User(username="test", id=2)])),
+            Channel(id=3, users=[User(username="test_2", id=3)], previous_state=None),
+        ]
+
+    async def test__get_many__no_channels_members__redis_not_called(self, repository, redis_client, discord_client):
+        redis_client.mget = mock.AsyncMock()
+        discord_client.get_channel_members = mock.Mock(return_value=None)
+
+        channels = await repository.get_many([1])
+
+        assert channels == []
+        redis_client.mget.assert_not_called()
+
+
+class TestCaseRepositoryCompactCodec:
+    @pytest.fixture
+    def repository(self, redis_client, discord_client):
+        return Repository(
+            redis_client=redis_client,
+            discord_client=discord_client,
+            storage=BlobChannelStateStorage(
+                redis_client, CompactChannelStateCodec(), legacy_codecs=[JSONChannelStateCodec()]
+            ),
+        )
+
+    async def test__save_many__state_written_to_v3_key(self, repository, pipeline):
+        with patch("dbot.repository._get_timestamp") as timestamp_mock:
+            timestamp_mock.return_value = 100
+            await repository.save_many([Channel(users=[User(id=2, username="test")], id=1)])
+
+        pipeline.set.assert_called_once_with(
+            "channel_v3_1",
+            CompactChannelStateCodec().encode(ChannelState(id=1, ts=100, users=[User(id=2, username="test")])),
+        )
+
+    async def test__get_many__v3_and_v2_states__v3_preferred_and_v2_read_for_migration(
+        self, repository, redis_client, discord_client
+    ):
+        v3_state = CompactChannelStateCodec().encode(ChannelState(id=1, ts=100, users=[User(id=2, username="test")]))
+        v2_state = '{"id": 3, "ts": 100, "users": [{"username": "test_2", "id": 4}]}'
+        redis_client.mget = mock.AsyncMock(return_value=[v3_state, None, "{}", v2_state])
+        discord_client.get_channel_members = mock.Mock(return_value=[])
+
+        with patch("dbot.repository._get_timestamp") as timestamp_mock:
+            timestamp_mock.return_value = 100
+            channels = await repository.get_many([1, 3])
+
+        redis_client.mget.assert_called_once_with(["channel_v3_1", "channel_v3_3", "channel_v2_1", "channel_v2_3"])
+        assert channels == [
+            Channel(id=1, users=[], previous_state=Channel(id=1, users=[User(username="test", id=2)])),
+            Channel(id=3, users=[], previous_state=Channel(id=3, users=[User(username="test_2", id=4)])),
+        ]
+
+
+class TestCaseRepositoryAtomicStorage:
+    @pytest.fixture
+    def atomic_storage(self):
+        return mock.AsyncMock(spec=IAtomicChannelStateStorage)
+
+    @pytest.fixture
+    def repository(self, redis_client, discord_client, atomic_storage):
+        return Repository(redis_client=redis_client, discord_client=discord_client, atomic_storage=atomic_storage)
+
+    async def test__get_many__states_swapped__channels_built_from_transitions(
+        self, repository, discord_client, atomic_storage
+    ):
+        discord_client.get_channel_members = mock.Mock(return_value=[User(username="test", id=2)])
+        atomic_storage.swap_many.return_value = {
+            1: StateTransition(previous_exists=True, joined_ids={2}, left=[User(username="test_3", id=3)])
+        }
+
+        with patch("dbot.repository._get_timestamp") as timestamp_mock:
+            timestamp_mock.return_value = 100
+            channels = await repository.get_many([1])
+
+        atomic_storage.swap_many.assert_called_once_with({1: [User(username="test", id=2)]}, 100, 3600)
+        assert channels == [
+            Channel(
+                id=1,
+                users=[User(username="test", id=2)],
+                previous_state=Channel(id=1, users=[User(username="test_3", id=3)]),
+            )
+        ]
+
+    async def test__save_many__states_already_swapped__nothing_written(self, repository, redis_client):
+        await repository.save_many([Channel(id=1, users=[])])
+
+        redis_client.pipeline.assert_not_called()
+
+    def test__init__cache_with_atomic_storage__error_raised(self, redis_client, atomic_storage, monitoring):
+        with pytest.raises(ValueError):
+            Repository(redis_client=redis_client, cache=ChannelStateCache(monitoring), atomic_storage=atomic_storage)
+
+
+class TestCaseRepositoryCache:
+    async def test__get_many__state_saved_by_process__read_from_cache(
+        self, cached_repository, redis_client, discord_client, monitoring
+    ):
+        redis_client.mget = mock.AsyncMock()
+        discord_client.get_channel_members = mock.Mock(return_value=[])
+
+        with patch("dbot.repository._get_timestamp") as timestamp_mock:
+            timestamp_mock.return_value = 100
+            await cached_repository.save_many([Channel(id=1, users=[User(username="test", id=2)])])
+            channels = await cached_repository.get_many([1])
+
+        redis_client.mget.assert_not_called()
+        monitoring.fire_state_cache_hits.assert_called_once_with(1)
+        assert channels == [Channel(id=1, users=[], previous_state=Channel(id=1, users=[User(username="test", id=2)]))]
+
+    async def test__get_many__cache_invalidated__loaded_from_redis(
+        self, cached_repository, redis_client, discord_client, monitoring
+    ):
+        redis_client.mget = mock.AsyncMock(return_value=[None])
+        discord_client.get_channel_members = mock.Mock(return_value=[])
+
+        with patch("dbot.repository._get_timestamp") as timestamp_mock:
+            timestamp_mock.return_value = 100
+            await cached_repository.save_many([Channel(id=1, users=[User(username="test", id=2)])])
+            cached_repository.invalidate_cache({1})
+            await cached_repository.get_many([1])
+
+        redis_client.mget.assert_called_once_with(["channel_v2_1"])
+
+    async def test__get_many__state_not_cached__loaded_from_redis(
+        self, cached_repository, redis_client, discord_client, monitoring
+    ):
+        redis_client.mget = mock.AsyncMock(return_value=[None])
+        discord_client.get_channel_members = mock.Mock(return_value=[])
+
+        channels = await cached_repository.get_many([1])
+
+        redis_client.mget.assert_called_once_with(["channel_v2_1"])
+        monitoring.fire_state_cache_misses.assert_called_once_with(1)
+        assert channels == [Channel(id=1, users=[], previous_state=None)]
+
+    async def test__save_many__users_not_changed__write_skipped(
+        self, cached_repository, redis_client, pipeline, monitoring
+    ):
+        with patch("dbot.repository._get_timestamp") as timestamp_mock:
+            timestamp_mock.return_value = 100
+            await cached_repository.save_many([Channel(id=1, users=[User(username="test", id=2)])])
+
+            timestamp_mock.return_value = 110
+            await cached_repository.save_many([Channel(id=1, users=[User(username="test", id=2)])])
+
+        pipeline.set.assert_called_once()
+        monitoring.fire_state_cache_skipped_writes.assert_called_once_with(1)
+
+    async def test__save_many__users_changed__state_written(self, cached_repository, redis_client, pipeline):
+        with patch("dbot.repository._get_timestamp") as timestamp_mock:
+            timestamp_mock.return_value = 100
+            await cached_repository.save_many([Channel(id=1, users=[User(username="test", id=2)])])
+
+            timestamp_mock.return_value = 110
+            await cached_repository.save_many([Channel(id=1, users=[])])
+
+        assert pipeline.set.call_args_list[-1] == mock.call("channel_v2_1", '{"id":1,"ts":110,"users":[]}')
+
+    async def test__save_many__users_not_changed_for_refresh_interval__state_refreshed(
+        self, cached_repository, redis_client, pipeline
+    ):
+        with patch("dbot.repository._get_timestamp") as timestamp_mock:
+            timestamp_mock.return_value = 100
+            await cached_repository.save_many([Channel(id=1, users=[])])
+
+            timestamp_mock.return_value = 100 + Repository.STATE_REFRESH_INTERVAL
+            await cached_repository.save_many([Channel(id=1, users=[])])
+
+        assert pipeline.set.call_args_list[-1] == mock.call(
+            "channel_v2_1", '{"id":1,"ts":%d,"users":[]}' % (100 + Repository.STATE_REFRESH_INTERVAL)
+        )
@@ -0,0 +1,192 @@
+import collections
+from unittest import mock
+
+import pytest
+
+from dbot.infrastructure.monitoring import Monitoring
+from dbot.schedule import AdaptivePollingSchedule, ChannelStagger, FixedRateScheduler
+
+
+@pytest.fixture
+def schedule():
+    return AdaptivePollingSchedule(min_interval=10, max_interval=60, backoff_factor=2.0)
+
+
+class TestCaseAdaptivePollingSchedule:
+    def test__due__unknown_channels__all_due(self, schedule):
+        assert schedule.due({1, 2}, now=0) == {1, 2}
+
+    def test__due__polled_recently__not_due(self, schedule):
+        schedule.record(1, changed=False, now=0)
+
+        assert schedule.due({1}, now=4) == set()
+        assert schedule.due({1}, now=9.9) == {1}
+
+    def test__record__no_changes__interval_backed_off_up_to_max(self, schedule):
+        now = 0.0
+        for _ in range(5):
+            schedule.record(1, changed=False, now=now)
+            now += 100
+
+        assert schedule.intervals() == {60: 1}
+
+    def test__record__changed__interval_reset_to_min(self, schedule):
+        schedule.record(1, changed=False, now=0)
+        schedule.record(1, changed=False, now=10)
+        schedule.record(1, changed=False, now=30)
+
+        schedule.record(1, changed=True, now=70)
+
+        assert schedule.intervals() == {10: 1}
+        assert schedule.due({1}, now=80) == {1}
+
+    def test__due__members_changed__due_before_next_poll(self, schedule):
+        schedule.record(1, changed=False, now=0, member_ids=frozenset({1}))
+        schedule.record(2, changed=False, now=0, member_ids=frozenset({1}))
+
+        members = {1: frozenset({1}), 2: frozenset({1, 2})}
+
+        assert schedule.due({1, 2}, now=1, member_ids=members.get) == {2}
+
+    def test__retain__channel_removed__forgotten(self, schedule):
+        schedule.record(1, changed=False, now=0)
+        schedule.record(2, changed=False, now=0)
+
+        schedule.retain({2})
+
+        assert schedule.intervals() == {10: 1}
+        assert schedule.due({1}, now=1) == {1}
+
+
+class TestCaseChannelStagger:
+    def test__select__ticks_of_one_interval__every_channel_selected_once(self):
+        stagger = ChannelStagger(interval=10, slots=5)
+        channels = set(range(1000))
+
+        selected = collections.Counter()
+        for tick in (1000, 1002, 1004, 1006, 1008):
+            selected.update(stagger.select(channels, tick))
+
+        assert set(selected) == channels
+        assert set(selected.values()) == {1}
+
+    def test__select__channels_spread_evenly_between_slots(self):
+        stagger = ChannelStagger(interval=10, slots=5)
+        channels = set(range(1000))
+
+        sizes = [len(stagger.select(channels, tick)) for tick in (1000, 1002, 1004, 1006, 1008)]
+
+        assert min(sizes) > 150
+
+    def test__select__next_interval__same_slot_selected(self):
+        stagger = ChannelStagger(interval=10, slots=5)
+        channels = set(range(100))
+
+        assert stagger.select(channels, 1002) == stagger.select(channels, 1012)
+
+    def test__select__several_ticks__union_of_slots_selected(self):
+        stagger = ChannelStagger(interval=10, slots=5)
+
+        assert stagger.select(set(range(10)), 1004, 1006) == {4, 5, 8}
+
+
+@pytest.fixture
+def monitoring():
+    return mock.AsyncMock(spec=Monitoring)
+
+
+class TestCaseFixedRateScheduler:
+    def test__next_tick__between_boundaries__next_boundary_returned(self, monitoring):
+        scheduler = FixedRateScheduler(interval=10, monitoring=monitoring)
+
+        assert scheduler.next_tick(1003.5) == 1010
+        assert scheduler.next_tick(1010) == 1010
+
+    async def test__run__job_faster_than_interval__ticks_aligned(self, monitoring):
+        scheduler = FixedRateScheduler(interval=10, monitoring=monitoring)
+        clock = mock.Mock(now=1003.0)
+        ticks = []
+
+        async def sleep(delay):
+            clock.now += delay
+
+        async def job(tick, skipped):
+            ticks.append(clock.now)
+            clock.now += 2
+
+        with mock.patch("dbot.schedule.time.time", lambda: clock.now), mock.patch("dbot.schedule.asyncio.sleep", sleep):
+            await scheduler.run(job, until=lambda: len(ticks) == 3)
+
+        assert ticks == [1010, 1020, 1030]
+        monitoring.fire_tick_overrun.assert_not_called()
+
+    async def test__run__overrun_with_skip__missed_ticks_skipped(self, monitoring):
+        scheduler = FixedRateScheduler(interval=10, monitoring=monitoring)
+        clock = mock.Mock(now=1000.0)
+        ticks = []
+
+        async def sleep(delay):
+            clock.now += delay
+
+        async def job(tick, skipped):
+            ticks.append(clock.now)
+            clock.now += 25 if len(ticks) == 1 else 1
+
+        with mock.patch("dbot.schedule.time.time", lambda: clock.now), mock.patch("dbot.schedule.asyncio.sleep", sleep):
+            await scheduler.run(job, until=lambda: len(ticks) == 2)
+
+        assert ticks == [1000, 1030]
+        monitoring.fire_tick_overrun.assert_called_once_with(2)
+
+    async def test__run__overrun_with_skip__skipped_ticks_passed_to_job(self, monitoring):
+        scheduler = FixedRateScheduler(interval=10, monitoring=monitoring)
+        clock = mock.Mock(now=1000.0)
+        calls = []
+
+        async def sleep(delay):
+            clock.now += delay
+
+        async def job(tick, skipped):
+            calls.append((tick, skipped))
+            clock.now += 25 if len(calls) == 1 else 1
+
+        with mock.patch("dbot.schedule.time.time", lambda: clock.now), mock.patch("dbot.schedule.asyncio.sleep", sleep):
+            await scheduler.run(job, until=lambda: len(calls) == 3)
+
+        assert calls == [(1000, []), (1030, [1010, 1020]), (1040, [])]
+
+    async def test__run__overrun_with_coalesce__skipped_ticks_passed_to_job(self, monitoring):
+        scheduler = FixedRateScheduler(interval=10, monitoring=monitoring, coalesce=True)
+        clock = mock.Mock(now=1000.0)
+        calls = []
+
+        async def sleep(delay):
+            clock.now += delay
+
+        async def job(tick, skipped):
+            calls.append((tick, skipped))
+            clock.now += 35 if len(calls) == 1 else 1
+
+        with mock.patch("dbot.schedule.time.time", lambda: clock.now), mock.patch("dbot.schedule.asyncio.sleep", sleep):
+            await scheduler.run(job, until=lambda: len(calls) == 2)
+
+        assert calls == [(1000, []), (1030, [1010, 1020])]
+
+    async def test__run__overrun_with_coalesce__missed_ticks_run_once_immediately(self, monitoring):
+        scheduler = FixedRateScheduler(interval=10, monitoring=monitoring, coalesce=True)
+        clock = mock.Mock(now=1000.0)
+        ticks = []
+
+        async def sleep(delay):
+            clock.now += delay
+
+        async def job(tick, skipped):
+            ticks.append(clock.now)
+            clock.now += 25 if len(ticks) == 1 else 1
+
+        with mock.patch("dbot.schedule.time.time", lambda: clock.now), mock.patch("dbot.schedule.asyncio.sleep", sleep):
+            await scheduler.run(job, until=lambda: len(ticks) == 3)
+
+        assert ticks == [1000, 1025, 1030]
+        monitoring.fire_tick_overrun.assert_called_once_with(1)
+        monitoring.fire_tick_lag.assert_any_call(5)
@@ -1,12 +1,18 @@
+import asyncio
+import time
 from unittest import mock
 
 import pytest
 
+from dbot.cluster import ClusterMembership
 from dbot.connectors.router import NotificationRouter
+from dbot.dscrd.abstract import IDiscordClient
 from dbot.infrastructure.monitoring import Monitoring
+from dbot.model import User
 from dbot.model.channel import Channel
 from dbot.model.notifications import Notification
 from dbot.repository import Repository
+from dbot.schedule import AdaptivePollingSchedule, ChannelStagger
 from dbot.services import ActivityProcessingService
 
 
@@ -38,16 +44,247 @@ def service(repository, router, monitoring):
     )
 
 
+def _channel(channel_id: int, notifications: list[Notification]) -> mock.Mock:
+    channel = mock.Mock(spec=Channel)
+    channel.id = channel_id
+    channel.users = []
+    channel.generate_notifications.return_value = notifications
+    return channel
+
+
 class TestCaseService:
     async def test__process__no_errors__notification_send(self, service, repository, router):
         service.channels = {1}
 
         notification = Notification(channel_id=1)
-        channel = mock.Mock(spec=Channel)
-        channel.generate_notifications.return_value = [notification]
+        channel = _channel(1, [notification])
 
-        repository.get.return_value = channel
+        repository.get_many.return_value = [channel]
 
         await service.process()
 
         router.send.assert_called_once_with([notification])
+        repository.save_many.assert_called_once_with([channel])
+
+    async def test__process__router_failed__failed_channel_not_saved(self, service, repository, router):
+        service.channels = {1, 2}
+
+        first_channel = _channel(1, [Notification(channel_id=1)])
+        second_channel = _channel(2, [Notification(channel_id=2)])
+        repository.get_many.return_value = [first_channel, second_channel]
+        router.send.side_effect = [None, RuntimeError("failed")]
+
+        with pytest.raises(RuntimeError):
+            await service.process()
+
+        repository.save_many.assert_called_once_with([first_channel])
+
+    async def test__process_changed__not_monitored_channels__skipped(self, service, repository, router):
+        service.channels = {1}
+
+        channel = _channel(1, [])
+        repository.get_many.return_value = [channel]
+
+        await service.process_changed({1, 2})
+
+        repository.get_many.assert_called_once_with({1})
+        repository.save_many.assert_called_once_with([channel])
+
+    async def test__process_changed__no_monitored_channels__nothing_processed(self, service, repository, monitoring):
+        service.channels = {1}
+
+        await service.process_changed({2})
+
+        repository.get_many.assert_not_called()
+        monitoring.fire_changed_channels_processing.assert_not_called()
+
+    async def test__process__concurrency_limited__channels_processed_in_parallel(self, service, repository, router):
+        service.channels = {1, 2, 3}
+        service.concurrency = 2
+
+        in_progress = 0
+        max_in_progress = 0
+
+        async def send(notifications):
+            nonlocal in_progress, max_in_progress
+            in_progress += 1
+            max_in_progress = max(max_in_progress, in_progress)
+            await asyncio.sleep(0.01)
+            in_progress -= 1
+
+        channels = [_channel(channel_id, [Notification(channel_id=channel_id)]) for channel_id in (1, 2, 3)]
+        repository.get_many.return_value = channels
+        router.send.side_effect = send
+
+        await service.process()
+
+        assert router.send.call_count == 3
+        assert max_in_progress == 2
+        saved = [channel.id for call in repository.save_many.call_args_list for channel in call.args[0]]
+        assert sorted(saved) == [1, 2, 3]
+
+    async def test__process__concurrent_channel_failed__other_channels_processed_and_error_raised(
+        self, service, repository, router
+    ):
+        service.channels = {1, 2}
+        service.concurrency = 2
+
+        first_channel = _channel(1, [Notification(channel_id=1)])
+        second_channel = _channel(2, [Notification(channel_id=2)])
+        repository.get_many.return_value = [first_channel, second_channel]
+        router.send.side_effect = [RuntimeError("failed"), None]
+
+        with pytest.raises(RuntimeError):
+            await service.process()
+
+        repository.save_many.assert_called_once_with([second_channel])
+
+    async def test__process__cluster_membership__only_owned_channels_processed(self, service, repository):
+        service.channels = {1, 2}
+        service.membership = mock.Mock(spec=ClusterMembership)
+        service.membership.owned.return_value = {2}
+        repository.get_many.return_value = []
+
+        await service.process()
+
+        repository.get_many.assert_called_once_with({2})
+
+    async def test__process_changed__channel_owned_by_other_replica__skipped(self, service, repository):
+        service.channels = {1, 2}
+        service.membership = mock.Mock(spec=ClusterMembership)
+        service.membership.owns.side_effect = lambda channel_id: channel_id == 2
+        repository.get_many.return_value = []
+
+        await service.process_changed({1})
+
+        repository.get_many.assert_not_called()
+
+    async def test__process__adaptive_schedule__only_due_channels_processed(self, service, repository):
+        service.channels = {1, 2}
+        service.schedule = AdaptivePollingSchedule(min_interval=10, max_interval=60)
+        service.schedule.record(1, changed=False, now=time.monotonic())
+        repository.get_many.return_value = []
+
+        await service.process()
+
+        repository.get_many.assert_called_once_with({2})
+
+    async def test__process__adaptive_schedule__idle_channel_backed_off(self, service, repository, monitoring):
+        service.channels = {1, 2}
+        service.schedule = AdaptivePollingSchedule(min_interval=10, max_interval=60)
+        service.schedule.record(1, changed=False, now=time.monotonic() - 100)
+        service.schedule.record(2, changed=False, now=time.monotonic() - 100)
+        repository.get_many.return_value = [_channel(1, []), _channel(2, [Notification(channel_id=2)])]
+
+        await service.process()
+
+        assert service.schedule.intervals() == {20: 1, 10: 1}
+        monitoring.fire_polling_intervals.assert_called_once_with({20: 1, 10: 1})
+
+    async def test__process_changed__adaptive_schedule__channel_polled_fast_again(self, service, repository):
+        service.channels = {1}
+        service.schedule = AdaptivePollingSchedule(min_interval=10, max_interval=60)
+        service.schedule.record(1, changed=False, now=0)
+        service.schedule.record(1, changed=False, now=10)
+        repository.get_many.return_value = [_channel(1, [])]
+
+        await service.process_changed({1})
+
+        assert service.schedule.intervals() == {10: 1}
+
+    async def test__process__stagger__only_channels_of_tick_slot_processed(self, service, repository):
+        service.channels = set(range(10))
+        service.stagger = ChannelStagger(interval=10, slots=5)
+        repository.get_many.return_value = []
+
+        await service.process(tick=1004)
+
+        # tick 1004 is slot 2, channels 4 and 5 hash to it
+        repository.get_many.assert_called_once_with({4, 5})
+
+    async def test__process__stagger_skipped_ticks__channels_of_skipped_slots_processed(self, service, repository):
+        service.channels = set(range(10))
+        service.stagger = ChannelStagger(interval=10, slots=5)
+        repository.get_many.return_value = []
+
+        await service.process(tick=1008, skipped=[1004, 1006])
+
+        # slots 4, 2 and 3
+        repository.get_many.assert_called_once_with({0, 4, 5, 8})
+
+    async def test__process__sharded_client__only_local_channels_processed(self, service, repository):
+        service.channels = {1, 2}
+        discord_client = mock.Mock(spec=IDiscordClient)
+        discord_client.local_channels.return_value = {1}
+        service.register_client(discord_client)
+        repository.get_many.return_value = []
+
+        await service.process()
+
+        discord_client.local_channels.assert_called_once_with({1, 2})
+        repository.get_many.assert_called_once_with({1})
+
+    async def test__process_changed__other_channel_routing__processed_without_waiting(
+        self, service, repository, router
+    ):
+        service.channels = {1, 2}
+        release_other = asyncio.Event()
+        other_routing = asyncio.Event()
+
+        async def send(notifications):
+            if notifications[0].channel_id == 1:
+                other_routing.set()
+                await release_other.wait()
+
+        router.send.side_effect = send
+        repository.get_many.side_effect = lambda ids: [
+            _channel(channel_id, [Notification(channel_id=channel_id)]) for channel_id in sorted(ids)
+        ]
+
+        other = asyncio.create_task(service.process_changed({1}))
+        await other_routing.wait()
+        await asyncio.wait_for(service.process_changed({2}), 1)
+
+        assert not other.done()
+        release_other.set()
+        await other
+
+    async def test__process_changed__same_channel_in_progress__waits_for_it(self, service, repository, router):
+        service.channels = {1}
+        release = asyncio.Event()
+        routed = []
+
+        async def send(notifications):
+            routed.append(len(routed))
+            if len(routed) == 1:
+                await release.wait()
+
+        router.send.side_effect = send
+        repository.get_many.side_effect = lambda ids: [_channel(1, [Notification(channel_id=1)])]
+
+        first = asyncio.create_task(service.process_changed({1}))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(service.process_changed({1}))
+        await asyncio.sleep(0.01)
+
+        assert routed == [0]
+        release.set()
+        await asyncio.gather(first, second)
+        assert routed == [0, 1]
+
+    async def test__process__adaptive_schedule__idle_channel_members_changed__processed(self, service, repository):
+        service.channels = {1, 2}
+        service.schedule = AdaptivePollingSchedule(min_interval=10, max_interval=60)
+        service.schedule.record(1, changed=False, now=time.monotonic(), member_ids=frozenset({3}))
+        service.schedule.record(2, changed=False, now=time.monotonic(), member_ids=frozenset({3}))
+        discord_client = mock.Mock(spec=IDiscordClient)
+        discord_client.local_channels.side_effect = lambda channels: channels
+        discord_client.get_channel_members.side_effect = lambda channel_id: (
+            [User(id=3, username="a")] if channel_id == 1 else [User(id=3, username="a"), User(id=4, username="b")]
+        )
+        service.register_client(discord_client)
+        repository.get_many.return_value = []
+
+        await service.process()
+
+        repository.get_many.assert_called_once_with({2})